@@ -0,0 +1,133 @@
+"""
+Measures per-object memory and attribute-access cost of the story records.
+
+"before" rebuilds the previous __dict__-backed classes with a property per field and a list effect;
+"after" uses the slotted records from src/text.py and src/scene.py.
+
+Run from the repository root: python benchmarks/bench_records.py
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from scene import Scene  # noqa: E402
+from text import Dialogue, Interactive  # noqa: E402
+
+COUNT = 20_000
+EFFECT = [2, -3, 0, 3]
+
+
+class DictDialogue:
+    def __init__(self, speaker, text):
+        self._speaker = speaker
+        self._text = text
+
+    @property
+    def speaker(self):
+        return self._speaker
+
+    @property
+    def text(self):
+        return self._text
+
+
+class DictChoice:
+    def __init__(self, response, effect, scene_reference):
+        self._response = response
+        self._effect = effect
+        self._scene_reference = scene_reference
+
+    @property
+    def response(self):
+        return self._response
+
+    @property
+    def effect(self):
+        return self._effect
+
+    @property
+    def scene_reference(self):
+        return self._scene_reference
+
+
+class DictScene:
+    def __init__(self, scene_id, speakers, setting, dialogues, interactive):
+        self._scene_id = scene_id
+        self._speakers = speakers
+        self._setting = setting
+        self._dialogues = dialogues
+        self._interactive = interactive
+
+    @property
+    def setting(self):
+        return self._setting
+
+
+def bytes_per_object(build) -> float:
+    """Returns the memory allocated per object by build(COUNT)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build(COUNT)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / COUNT
+
+
+def ns_per_access(statement: str, namespace: dict) -> float:
+    timer = timeit.Timer(statement, globals=namespace)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(5, loops)) / loops * 1e9
+
+
+def build_choices_before(count):
+    # The JSON loader kept a fresh four-int list per choice
+    return [DictChoice("response", list(EFFECT), 2) for _ in range(count)]
+
+
+def build_choices_after(count):
+    effects = array("b")
+    choices = []
+    for _ in range(count):
+        offset = len(effects)
+        effects.extend(EFFECT)
+        choices.append(Interactive.Choice("response", effects, 2, offset))
+    return choices
+
+
+def main():
+    rows = [
+        ("Dialogue", lambda n: [DictDialogue("BABEMAX", "text") for _ in range(n)],
+         lambda n: [Dialogue("BABEMAX", "text") for _ in range(n)]),
+        ("Choice", build_choices_before, build_choices_after),
+        ("Scene", lambda n: [DictScene(1, ["BOSSP"], "cafe.jpg", [], None) for _ in range(n)],
+         lambda n: [Scene(1, ["BOSSP"], "cafe.jpg", [], None) for _ in range(n)]),
+    ]
+    print(f"{'record':<10}{'before B/obj':>14}{'after B/obj':>14}")
+    for name, before, after in rows:
+        print(f"{name:<10}{bytes_per_object(before):>14.1f}{bytes_per_object(after):>14.1f}")
+
+    namespace = {
+        "old_choice": build_choices_before(1)[0],
+        "new_choice": build_choices_after(1)[0],
+        "old_dialogue": DictDialogue("BABEMAX", "text"),
+        "new_dialogue": Dialogue("BABEMAX", "text"),
+    }
+    print()
+    print(f"{'access':<28}{'before ns':>12}{'after ns':>12}")
+    for label, old, new in [
+        ("choice.scene_reference", "old_choice.scene_reference", "new_choice.scene_reference"),
+        ("choice.effect[0]", "old_choice.effect[0]", "new_choice.effect[0]"),
+        ("dialogue.speaker", "old_dialogue.speaker", "new_dialogue.speaker"),
+        ("dialogue.text", "old_dialogue.text", "new_dialogue.text"),
+    ]:
+        print(f"{label:<28}{ns_per_access(old, namespace):>12.1f}{ns_per_access(new, namespace):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
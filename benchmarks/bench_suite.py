@@ -0,0 +1,293 @@
+"""
+Benchmark suite: cold start, story loading, scene transitions, rendering and scoring.
+
+Every benchmark reports the best time per operation over several repeats. Results are written as JSON and compared
+with a stored baseline. A benchmark fails the run when it is slower than its baseline by more than its tolerance
+and by more than the noise floor of its unit, so timer and scheduler jitter on sub-microsecond results cannot fail it.
+
+Rendering runs headless on SDL's dummy video driver. Cold start is timed in fresh interpreters, from process start
+to exit, so it includes the interpreter's own startup (reported as startup_python_ms).
+
+Run from the repository root:
+    python benchmarks/bench_suite.py [--output results.json] [--baseline benchmarks/baseline.json]
+                                     [--tolerance 0.5] [--update-baseline] [--quick] [--only NAME ...]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from game import Game  # noqa: E402
+from story import ENDING_SCENE_IDS, STORY_PATH, load_story  # noqa: E402
+from storygen import StoryShape, write_story  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SYNTHETIC_SIZES = (1_000, 10_000, 100_000)
+# Slowdowns at most this large, in the unit of the result name's suffix, are never counted as regressions
+NOISE_FLOORS = {"us": 0.5, "ms": 0.5}
+# Tolerances of benchmarks noisier than the default, by name prefix; process startup depends on the OS's file cache
+TOLERANCES = {"startup_": 1.0}
+# Programs timed in a fresh interpreter; the SDL ones compare the GUI's display and font init with pygame.init()
+STARTUP_PROGRAMS = {
+    "python": "pass",
+    "import_game": "import game",
+    "game_first_scene": "import game; game.Game().current_scene",
+    "import_server": "import server",
+    "import_gui": "import gui",
+    "sdl_display_font": "import pygame; pygame.display.init(); pygame.font.init()",
+    "sdl_pygame_init": "import pygame; pygame.init()",
+}
+
+
+def best_time(statement, number: int, repeat: int = 5) -> float:
+    """Returns the best seconds per call of statement over repeat runs of number calls."""
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number
+
+
+def bench_startup(results: dict, quick: bool) -> None:
+    environment = dict(os.environ, PYTHONPATH=SRC_DIR)
+
+    def run(program):
+        # Programs run from the repository root, like the entry points, so the story path resolves
+        subprocess.run([sys.executable, "-c", program], env=environment, cwd=os.path.join(SRC_DIR, ".."), check=True)
+
+    for name, program in STARTUP_PROGRAMS.items():
+        results[f"startup_{name}_ms"] = best_time(lambda: run(program), 1, 3 if quick else 7) * 1e3
+
+
+def bench_load(results: dict, quick: bool, workdir: str) -> None:
+    game = Game()
+    results["load_json_real_ms"] = best_time(lambda: game.load_scenes_from_json(STORY_PATH), 50) * 1e3
+
+    for size in SYNTHETIC_SIZES[:2] if quick else SYNTHETIC_SIZES:
+        path = os.path.join(workdir, f"story_{size}.json")
+        write_story(path, StoryShape(scenes=size, seed=0))
+        repeat = 3 if size >= 100_000 else 5
+        results[f"load_json_{size}_ms"] = best_time(lambda: game.load_scenes_from_json(path), 1, repeat) * 1e3
+
+
+def bench_transitions(results: dict) -> None:
+    story = load_story(STORY_PATH)
+    # A fixed mix of decisions; each playthrough restarts at the first scene once it reaches an ending
+    rng = random.Random(1)
+    decisions = [rng.randint(1, 3) for _ in range(10_000)]
+    first_scene_id = story.first_scene.scene_id
+    game = Game()
+
+    def play():
+        for decision in decisions:
+            scene = game.current_scene
+            if scene.scene_id in ENDING_SCENE_IDS:
+                game.current_scene_id = first_scene_id
+                scene = game.current_scene
+            game.process_scene(min(decision, len(scene.interactive.choices)))
+
+    # Several passes per repeat, so one preempted pass does not decide a per-operation result
+    results["process_scene_us"] = best_time(play, 5, 7) / len(decisions) * 1e6
+
+    choices = [choice for scene in story.scenes for choice in scene.interactive.choices]
+    sample = [choices[rng.randrange(len(choices))] for _ in range(10_000)]
+
+    def score():
+        for choice in sample:
+            game.update_scores(choice)
+
+    results["update_scores_us"] = best_time(score, 5, 7) / len(sample) * 1e6
+
+
+def bench_scoring(results: dict) -> None:
+    import numpy as np
+
+    from engine import Engine
+    from scoring import ScoreBatch
+
+    story = load_story(STORY_PATH)
+    rng = random.Random(2)
+    choices = [choice for scene in story.scenes for choice in scene.interactive.choices]
+    sample = [choices[rng.randrange(len(choices))] for _ in range(10_000)]
+    game = Game()
+
+    def score():
+        for choice in sample:
+            game.update_scores(choice)
+
+    # The same kind of update through Game and through a batch, per session update, so the two compare directly
+    results["scoring_game_update_us"] = best_time(score, 5, 7) / len(sample) * 1e6
+
+    sessions = 100_000
+    batch = ScoreBatch(sessions)
+    effects = np.array([list(sample[rng.randrange(len(sample))].effect) for _ in range(sessions)], dtype=np.int8)
+    results["scoring_batch_update_us"] = best_time(lambda: batch.apply(effects), 5, 7) / sessions * 1e6
+    results["scoring_batch_types_us"] = best_time(batch.type_counts, 5, 7) / sessions * 1e6
+
+    # Whole playthroughs, from the first scene to an ending, through Game and both Engine paths, per playthrough
+    scripts = []
+    for _ in range(10_000):
+        game, decisions = Game(), []
+        while game.get_current_scene_id() not in ENDING_SCENE_IDS:
+            decisions.append(rng.randint(1, len(game.current_scene.interactive.choices)))
+            game.process_scene(decisions[-1])
+        scripts.append(decisions)
+    first_scene_id = story.first_scene.scene_id
+
+    def play_games():
+        for decisions in scripts:
+            game.current_scene_id = first_scene_id
+            game.mb_score = [0, 0, 0, 0]
+            for decision in decisions:
+                game.process_scene(decision)
+
+    engine = Engine(story)
+    results["scoring_game_playthrough_us"] = best_time(play_games, 1, 5) / len(scripts) * 1e6
+    results["scoring_engine_play_batch_us"] = (
+        best_time(lambda: sum(1 for _ in engine.play_batch(scripts)), 1, 5) / len(scripts) * 1e6
+    )
+    results["scoring_engine_score_batch_us"] = best_time(lambda: engine.score_batch(scripts), 1, 5) / len(scripts) * 1e6
+
+
+def bench_rendering(results: dict) -> None:
+    import pygame
+
+    import gui
+    from dashboard import MyersBriggsDisplay
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((gui.screen_width, gui.screen_height))
+    gui.screen = screen
+    game = Game()
+    scene = game.current_scene
+    renderer = gui.SceneRenderer(screen)
+    lines = [dialogue.text_for(game.name) for dialogue in scene.dialogues]
+    options = [choice.response_for(game.name) for choice in scene.interactive.choices]
+    prompt = scene.interactive.prompt_for(game.name)
+
+    def dialogue_frames():
+        for line in lines:
+            renderer.show_dialogue(scene, line)
+            renderer.present()
+
+    def option_frames():
+        for selected in range(1, len(options) + 1):
+            renderer.show_options(scene, prompt, options, selected)
+            renderer.present()
+
+    # First frames build the cached layers and text; the steady state is what a player sees per key press
+    dialogue_frames()
+    option_frames()
+    results["render_dialogue_frame_ms"] = best_time(dialogue_frames, 20) / len(lines) * 1e3
+    results["render_options_frame_ms"] = best_time(option_frames, 20) / len(options) * 1e3
+
+    def cold_scene():
+        # A fresh renderer composites the scene layer again; decoded images stay in the asset cache
+        fresh = gui.SceneRenderer(screen)
+        fresh.show_dialogue(scene, lines[0])
+        fresh.present()
+
+    results["render_scene_cold_ms"] = best_time(cold_scene, 10) * 1e3
+
+    display = MyersBriggsDisplay(game)
+    display.draw((25, 20, 20))
+    results["render_dashboard_frame_ms"] = best_time(lambda: display.draw((25, 20, 20)), 20) * 1e3
+    pygame.quit()
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "load": bench_load,
+    "transitions": bench_transitions,
+    "scoring": bench_scoring,
+    "rendering": bench_rendering,
+}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, tolerances: dict = TOLERANCES) -> list[str]:
+    """
+    Returns a message for every result slower than its baseline by more than its tolerance and its noise floor.
+
+    Args:
+        results (dict): The results by name.
+        baseline (dict): The baseline results by name.
+        tolerance (float): Allowed slowdown as a fraction, ie. 0.5 for 50%.
+        tolerances (dict, optional): Tolerances replacing the default for names starting with each key.
+    """
+    regressions = []
+    for name, value in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        allowed = next((override for prefix, override in tolerances.items() if name.startswith(prefix)), tolerance)
+        floor = NOISE_FLOORS.get(name.rsplit("_", 1)[-1], 0.0)
+        if value > expected * (1 + allowed) and value - expected > floor:
+            regressions.append(f"{name}: {value:.4f} vs baseline {expected:.4f} (+{(value / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and check it against a baseline.")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown as a fraction (default 0.5)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--quick", action="store_true", help="skip the 10^5-scene story and time fewer cold starts")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, bench in BENCHMARKS.items():
+            if args.only is not None and name not in args.only:
+                continue
+            if bench is bench_load:
+                bench(results, args.quick, workdir)
+            elif bench is bench_startup:
+                bench(results, args.quick)
+            else:
+                bench(results)
+
+    for name, value in results.items():
+        print(f"{name:32} {value:10.4f}")
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if args.update_baseline:
+        if args.only is not None and os.path.exists(args.baseline):
+            # Keep the baseline of the benchmarks that did not run
+            with open(args.baseline, "r") as file:
+                report["results"] = {**json.load(file)["results"], **results}
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["results"]
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
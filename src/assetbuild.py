@@ -0,0 +1,182 @@
+"""
+Asset build stage: bakes every image under resources/images into raw, screen-sized pixel data.
+
+Backgrounds are cut to the 800x600 area that is actually shown and avatars are fitted to the avatar bounds. Each
+result is written as <content hash>.raw into the cache directory, next to a manifest.json that maps source paths to
+their baked file. At runtime BakedImageStore loads the raw pixels without decoding JPEG or PNG.
+
+Run from the repository root: python src/assetbuild.py
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+
+import pygame
+
+from assetpaths import AVATAR_PATHS, IMAGE_DIR
+
+CACHE_DIR = "resources/cache/images"
+MANIFEST_NAME = "manifest.json"
+SCREEN_SIZE = (800, 600)
+# The game fills the screen with white before blitting a background, so see-through background pixels show white
+BACKGROUND_FILL = (255, 255, 255)
+AVATAR_BOUNDS = (800, 300)
+# Bumped whenever the baking rules change, so old cache entries are not reused
+BUILD_VERSION = 2
+
+# magic, width, height, pixel format ("RGB " or "RGBA")
+RAW_HEADER = struct.Struct("<4sHH4s")
+RAW_MAGIC = b"MBIM"
+
+
+def _fit(surface: pygame.Surface, bounds: tuple[int, int]) -> pygame.Surface:
+    """Scales a surface down, keeping its aspect ratio, until it fits inside bounds."""
+    width, height = surface.get_size()
+    scale = min(bounds[0] / width, bounds[1] / height, 1.0)
+    if scale == 1.0:
+        return surface
+    return pygame.transform.smoothscale(surface, (round(width * scale), round(height * scale)))
+
+
+def flatten(surface: pygame.Surface, fill=BACKGROUND_FILL) -> pygame.Surface:
+    """
+    Returns an opaque surface showing an image blended over fill, the way it looks blitted onto the filled screen.
+
+    Surfaces without per-pixel alpha are returned as they are.
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return surface
+    flat = pygame.Surface(surface.get_size())
+    flat.fill(fill)
+    flat.blit(surface, (0, 0))
+    return flat
+
+
+def bake_image(source_path: str, avatar: bool) -> tuple[pygame.Surface, bytes]:
+    """
+    Normalizes one image the way the game draws it.
+
+    Args:
+        source_path (str): Path of the source image.
+        avatar (bool): Fit to the avatar bounds and keep alpha; otherwise crop to the screen the way a background is
+            blitted and blend it over the white fill.
+
+    Returns:
+        tuple[pygame.Surface, bytes]: The normalized surface and its raw file contents.
+    """
+    surface = pygame.image.load(source_path)
+    if avatar:
+        surface = _fit(surface, AVATAR_BOUNDS)
+        pixel_format = "RGBA"
+    else:
+        # Backgrounds are blitted at (0, 0), so anything beyond the screen is never seen
+        visible = surface.get_rect().clip(pygame.Rect((0, 0), SCREEN_SIZE))
+        surface = flatten(surface.subsurface(visible).copy())
+        pixel_format = "RGB"
+    width, height = surface.get_size()
+    header = RAW_HEADER.pack(RAW_MAGIC, width, height, pixel_format.ljust(4).encode("ascii"))
+    return surface, header + pygame.image.tobytes(surface, pixel_format)
+
+
+def build_assets(image_dir: str = None, cache_dir: str = CACHE_DIR) -> dict:
+    """
+    Bakes every image in image_dir into cache_dir and rewrites the manifest.
+
+    Files whose content hash is already in the cache are not baked again.
+
+    Args:
+        image_dir (str, optional): Directory of source images (defaults to 'resources/images').
+        cache_dir (str, optional): Directory for the baked files (defaults to 'resources/cache/images').
+
+    Returns:
+        dict: The manifest, mapping each source path to its baked file, size and source stat.
+    """
+    image_dir = IMAGE_DIR if image_dir is None else image_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    avatar_paths = {os.path.normpath(path) for path in AVATAR_PATHS.values()}
+    manifest = {}
+    for name in sorted(os.listdir(image_dir)):
+        source_path = f"{image_dir}/{name}"
+        if name.startswith(".") or not os.path.isfile(source_path):
+            continue
+        avatar = os.path.normpath(source_path) in avatar_paths
+        with open(source_path, "rb") as file:
+            digest = hashlib.sha1(file.read())
+        digest.update(f"v{BUILD_VERSION}:{'avatar' if avatar else 'background'}".encode("ascii"))
+        baked_name = f"{digest.hexdigest()}.raw"
+        baked_path = os.path.join(cache_dir, baked_name)
+        if not os.path.exists(baked_path):
+            _, data = bake_image(source_path, avatar)
+            with open(baked_path + ".tmp", "wb") as file:
+                file.write(data)
+            os.replace(baked_path + ".tmp", baked_path)
+
+        stat = os.stat(source_path)
+        manifest[source_path] = {
+            "file": baked_name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "version": BUILD_VERSION,
+        }
+
+    with open(os.path.join(cache_dir, MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=4)
+    return manifest
+
+
+class BakedImageStore:
+    """
+    Loads images from the baked cache when the cache is current for them.
+
+    An entry is only used while the source file still has the size and mtime recorded at build time, and was baked by
+    the current BUILD_VERSION, so an edited image or an outdated cache falls back to normal decoding until the build
+    is run again.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self._cache_dir = cache_dir
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def _entries(self) -> dict:
+        with self._lock:
+            if self._manifest is None:
+                try:
+                    with open(os.path.join(self._cache_dir, MANIFEST_NAME), "r") as file:
+                        self._manifest = json.load(file)
+                except (OSError, ValueError):
+                    self._manifest = {}
+            return self._manifest
+
+    def load(self, source_path: str):
+        """
+        Returns the baked surface of a source image, or None when it has no current baked entry.
+
+        Safe to call from prefetch threads; the surface is not yet in the display format.
+
+        Args:
+            source_path (str): Path of the source image, as used by the game.
+        """
+        entry = self._entries().get(source_path)
+        if entry is None or entry.get("version") != BUILD_VERSION:
+            return None
+        try:
+            stat = os.stat(source_path)
+            if stat.st_mtime_ns != entry["mtime_ns"] or stat.st_size != entry["size"]:
+                return None
+            with open(os.path.join(self._cache_dir, entry["file"]), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        magic, width, height, pixel_format = RAW_HEADER.unpack_from(data)
+        if magic != RAW_MAGIC:
+            return None
+        pixels = data[RAW_HEADER.size:]
+        return pygame.image.frombytes(pixels, (width, height), pixel_format.decode("ascii").strip())
+
+
+if __name__ == "__main__":
+    manifest = build_assets(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"baked {len(manifest)} images into {CACHE_DIR}")
@@ -0,0 +1,21 @@
+"""
+Locations of the game's images. Does not import pygame, so tools that only check a story (storygraph.py) can use them.
+"""
+
+IMAGE_DIR = "resources/images"
+TITLE_SCREEN_PATH = f"{IMAGE_DIR}/title_screen.jpeg"
+
+# Maps the speaker keys used in scene.json to their avatar images
+AVATAR_PATHS: dict[str, str] = {
+    "BOSSP": f"{IMAGE_DIR}/bossp.PNG",
+    "BABEMAX": f"{IMAGE_DIR}/babemax.PNG",
+    "BIRB": f"{IMAGE_DIR}/birb.PNG",
+    "CORNELIUS": f"{IMAGE_DIR}/cornelius.PNG",
+    "TUSK": f"{IMAGE_DIR}/tusk.PNG",
+    "LIZZI": f"{IMAGE_DIR}/lizzy.PNG",
+}
+
+
+def background_path(setting: str) -> str:
+    """Returns the image path of a scene setting."""
+    return f"{IMAGE_DIR}/{setting}"
@@ -0,0 +1,315 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from assetbuild import BakedImageStore, flatten
+from assetpaths import AVATAR_PATHS, IMAGE_DIR, TITLE_SCREEN_PATH, background_path  # noqa: F401
+
+
+def scene_assets(scene) -> list[tuple[str, bool, bool]]:
+    """
+    Returns the images a scene draws, as (path, alpha, flip) cache keys.
+
+    Args:
+        scene (Scene): The scene.
+    """
+    assets = [(background_path(scene.setting), False, False)]
+    for counter, speaker in enumerate(scene.speakers):
+        # enter_avatars mirrors every second avatar
+        assets.append((AVATAR_PATHS[speaker], True, counter % 2 == 1))
+    return assets
+
+
+class AssetCache:
+    """
+    Process-wide cache of decoded images, converted to the display's pixel format.
+
+    Surfaces are kept in least-recently-used order and evicted once their total
+    pixel memory exceeds the budget.
+    """
+
+    def __init__(self, budget_bytes: int = 64 * 1024 * 1024, baked: BakedImageStore = None):
+        """
+        Constructor for the asset cache
+
+        Args:
+            budget_bytes (int, optional): Maximum pixel memory held by cached surfaces (defaults to 64 MiB).
+            baked (BakedImageStore, optional): Pre-normalized images from assetbuild.py, preferred over decoding the source files.
+        """
+        self._baked = BakedImageStore() if baked is None else baked
+        self._surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self._budget_bytes = budget_bytes
+        self._used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def budget_bytes(self) -> int:
+        return self._budget_bytes
+
+    @budget_bytes.setter
+    def budget_bytes(self, value: int):
+        self._budget_bytes = value
+        self._evict()
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def get(self, path: str, alpha: bool = False, flip: bool = False) -> pygame.Surface:
+        """
+        Returns the decoded surface for an image, loading it from disk on a miss.
+
+        Args:
+            path (str): Path of the image file.
+            alpha (bool, optional): Keep per-pixel alpha (avatars) instead of an opaque surface (backgrounds). Opaque
+                surfaces of images with alpha are blended over the white screen fill once, here.
+            flip (bool, optional): Return the horizontally mirrored image.
+
+        Raises:
+            pygame.error: If the image cannot be loaded.
+        """
+        key = (path, alpha, flip)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if flip:
+            surface = pygame.transform.flip(self.get(path, alpha), True, False)
+        else:
+            surface = self._convert(self.decode(path), alpha)
+        self._store(key, surface)
+        return surface
+
+    def decode(self, path: str) -> pygame.Surface:
+        """
+        Reads an image without caching or converting it, from the baked cache when it is current. Safe to call from worker threads.
+
+        Raises:
+            pygame.error: If the image cannot be loaded.
+        """
+        surface = self._baked.load(path)
+        return pygame.image.load(path) if surface is None else surface
+
+    def preload_scene(self, scene) -> None:
+        """
+        Loads the background and avatars a scene references so its first frame does not touch the disk.
+
+        Args:
+            scene (Scene): The scene to preload.
+        """
+        for path, alpha, flip in scene_assets(scene):
+            self.get(path, alpha, flip)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._surfaces
+
+    def put_decoded(self, path: str, alpha: bool, surface: pygame.Surface) -> pygame.Surface:
+        """
+        Stores an image decoded elsewhere (ie. on a prefetch thread), converting it to the display format.
+
+        Must be called from the thread that owns the display.
+
+        Args:
+            path (str): Path of the image file.
+            alpha (bool): Keep per-pixel alpha instead of an opaque surface.
+            surface (pygame.Surface): The decoded image.
+        """
+        key = (path, alpha, False)
+        if key not in self._surfaces:
+            self._store(key, self._convert(surface, alpha))
+        return self._surfaces[key]
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions, entry count and memory use.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._surfaces),
+            "used_bytes": self._used_bytes,
+            "budget_bytes": self._budget_bytes,
+        }
+
+    def clear(self) -> None:
+        """Drops every cached surface (ie. after the display mode changes)."""
+        self._surfaces.clear()
+        self._used_bytes = 0
+
+    @staticmethod
+    def _convert(surface: pygame.Surface, alpha: bool) -> pygame.Surface:
+        if not alpha:
+            # An opaque convert() would turn see-through pixels black instead of showing the white fill behind them
+            surface = flatten(surface)
+        # convert() needs a display mode; headless callers keep the decoded format
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert_alpha() if alpha else surface.convert()
+
+    @staticmethod
+    def _surface_bytes(surface: pygame.Surface) -> int:
+        return surface.get_pitch() * surface.get_height()
+
+    def _store(self, key: tuple, surface: pygame.Surface) -> None:
+        self._surfaces[key] = surface
+        self._used_bytes += self._surface_bytes(surface)
+        self._evict(keep=key)
+
+    def _evict(self, keep: tuple = None) -> None:
+        while self._used_bytes > self._budget_bytes and len(self._surfaces) > 1:
+            key, surface = next(iter(self._surfaces.items()))
+            if key == keep:
+                break
+            del self._surfaces[key]
+            self._used_bytes -= self._surface_bytes(surface)
+            self.evictions += 1
+
+
+class AssetPrefetcher:
+    """
+    Decodes the images of the scenes a player can reach next on worker threads, while the current scene is shown.
+
+    Workers only read and decode files; surfaces are converted to the display format and put in the cache on the
+    render thread, when prefetch_next or ensure_scene collects them. Only the successors of the current scene are kept
+    in flight, so decoded surfaces never pile up outside the cache's byte budget.
+    """
+
+    def __init__(self, cache: AssetCache, max_workers: int = 2):
+        """
+        Constructor for the prefetcher
+
+        Args:
+            cache (AssetCache): The cache finished images are handed to.
+            max_workers (int, optional): Number of decode threads (defaults to 2).
+        """
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asset-prefetch")
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stalls = 0
+        self.misses = 0
+        self.dropped = 0
+        self.stall_ms = 0.0
+
+    def prefetch_scene(self, scene) -> None:
+        """Starts decoding every image of a scene that is neither cached nor already being decoded."""
+        for path, alpha, _ in scene_assets(scene):
+            key = (path, alpha)
+            with self._lock:
+                if (path, alpha, False) in self._cache or key in self._pending:
+                    continue
+                self._pending[key] = self._executor.submit(self._cache.decode, path)
+
+    def prefetch_next(self, story, scene) -> None:
+        """
+        Starts decoding the images of every scene a choice of the given scene leads to, from the render thread.
+
+        Decodes for images no successor uses are cancelled (or dropped, if already running), and finished ones are
+        moved into the cache, where they count against its byte budget.
+
+        Args:
+            story (Story): The story the scene belongs to.
+            scene (Scene): The scene the player is in.
+        """
+        successors = [
+            story.scene_by_id(choice.scene_reference)
+            for choice in scene.interactive.choices
+            if choice.scene_reference in story.index
+        ]
+        wanted = {(path, alpha) for successor in successors for path, alpha, _ in scene_assets(successor)}
+        finished = []
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if key not in wanted:
+                    future.cancel()
+                    del self._pending[key]
+                    self.dropped += 1
+                elif future.done():
+                    finished.append((key, self._pending.pop(key)))
+        for (path, alpha), future in finished:
+            try:
+                self._cache.put_decoded(path, alpha, future.result())
+            except (pygame.error, FileNotFoundError):
+                # Left out of the cache, so ensure_scene loads it again and reports the error
+                pass
+        for successor in successors:
+            self.prefetch_scene(successor)
+
+    def ensure_scene(self, scene) -> None:
+        """
+        Makes every image of a scene available in the cache, from the render thread.
+
+        An image already cached or decoded counts as a hit, one still decoding is waited for and counts as a stall, and
+        one never prefetched, or whose decode failed, is loaded synchronously and counts as a miss.
+
+        Raises:
+            pygame.error: If an image cannot be decoded.
+            FileNotFoundError: If an image file is missing.
+        """
+        for path, alpha, flip in scene_assets(scene):
+            if (path, alpha, flip) in self._cache:
+                self.hits += 1
+                continue
+            with self._lock:
+                future = self._pending.pop((path, alpha), None)
+            if future is not None:
+                done = future.done()
+                started = time.perf_counter()
+                try:
+                    surface = future.result()
+                except (pygame.error, FileNotFoundError):
+                    # Counted as a miss below; the synchronous load raises the error again on the render thread
+                    future = None
+                else:
+                    if done:
+                        self.hits += 1
+                    else:
+                        self.stalls += 1
+                        self.stall_ms += (time.perf_counter() - started) * 1000
+                    self._cache.put_decoded(path, alpha, surface)
+            if future is None:
+                if (path, alpha, False) in self._cache:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            self._cache.get(path, alpha, flip)
+
+    def stats(self) -> dict:
+        """
+        Returns the prefetch counters.
+
+        Returns:
+            dict: Hits, stalls, misses, total time stalled, decodes dropped as stale and the number in flight.
+        """
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "hits": self.hits,
+            "stalls": self.stalls,
+            "misses": self.misses,
+            "stall_ms": self.stall_ms,
+            "dropped": self.dropped,
+            "pending": pending,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by every renderer in the process
+asset_cache = AssetCache()
@@ -1,88 +1,120 @@
 import sys
+import numpy as np
 from game import Game
+from engine import mbti_type
+from loop import LoopDriver
+from textlayout import fonts
+from instrument import profiler
 import pygame
 
+# Gradient bars of the spectrums, rendered once per color and shared by every display
+_gradients: dict[tuple, pygame.Surface] = {}
+
+
+def gradient_bar(end_color, start_color=(68, 85, 90), size=(601, 100)) -> pygame.Surface:
+    """
+    Returns a bar fading from start_color at the top to end_color at the bottom, rendered once per color.
+
+    Args:
+        end_color (tuple[int, int, int]): Bright color at the bottom of the bar.
+        start_color (tuple[int, int, int], optional): Dark shade at the top of the bar.
+        size (tuple[int, int], optional): Width and height of the bar.
+    """
+    key = (tuple(end_color), tuple(start_color), size)
+    bar = _gradients.get(key)
+    if bar is None:
+        width, height = size
+        start = np.array(start_color, dtype=np.float64)
+        ratios = np.arange(height, dtype=np.float64)[:, None] / height
+        # One color per row, truncated like the per-line draw calls this replaces
+        rows = (start + ratios * (np.array(end_color) - start)).astype(np.uint8)
+        bar = pygame.Surface(size)
+        pygame.surfarray.blit_array(bar, np.broadcast_to(rows[None, :, :], (width, height, 3)))
+        bar = _gradients[key] = bar
+    return bar
+
+
 class MyersBriggsDisplay:
-    def __init__(self, game):
-        pygame.init()
+    # position, label and color of each spectrum, in mb_score order
+    SPECTRUMS = (
+        (100, "Introverted - Extroverted", (255, 99, 71)),
+        (200, "Sensing - Intuition", (123, 104, 238)),
+        (300, "Thinking - Feeling", (60, 179, 113)),
+        (400, "Judging - Perceiving", (255, 165, 0)),
+    )
+
+    def __init__(self, game, driver=None):
+        pygame.display.init()
+        pygame.font.init()
         self.game = game
+        self.driver = LoopDriver() if driver is None else driver
         self.screen = pygame.display.set_mode((800, 600))
         pygame.display.set_caption("Detective Incognito Revealed!")
-        self.font = pygame.font.SysFont('Comic Sans MS', 30)
+        self.font = fonts.get('Comic Sans MS', 30, sysfont=True)
         self.running = True
+        # Background, title, gradient bars and result text; none of them change while the display is open
+        self._static_layer = None
+        self._labels: dict[tuple, pygame.Surface] = {}
 
     def getMBTI(self) -> str:
-        result = ''
-        mbti = game.mb_score
-        
-        # Introversion (I) or Extroversion (E)
-        if mbti[0] > 0:
-            result += "E"
-        else:
-            result += "I"
-        
-        # Sensing (S) or Intuition (N)
-        if mbti[1] > 0:
-            result += "N"
-        else:
-            result += "S"
-        
-        # Thinking (T) or Feeling (F)
-        if mbti[2] > 0:
-            result += "T"
-        else:
-            result += "F"
-        
-        # Judging (J) or Perceiving (P)
-        if mbti[3] > 0:
-            result += "J"
-        else:
-            result += "P"
-        
-        return result
+        return mbti_type(self.game.mb_score)
             
-    def draw_spectrum(self, position, score, text, color):
-        # Gradient background for spectrum
-        start_color = (68, 85, 90)  # Dark shade
-        end_color = color  # Bright color for the spectrum
-        for i, ratio in enumerate(range(100)):
-            pygame.draw.line(self.screen, 
-                             [start_color[j] + ((float(i) / 100) * (end_color[j] - start_color[j])) for j in range(3)],
-                             (100, position + ratio), (700, position + ratio), 1)
-
+    def draw_indicator(self, position, score, text):
         # Score Indicator
         pygame.draw.circle(self.screen, (0, 255, 0), (int(400 + (score * 30)), position + 50), 15)
-        score_text = self.font.render(f"{text}: {score}", True, (255, 255, 255))
+        key = (text, score)
+        score_text = self._labels.get(key)
+        if score_text is None:
+            score_text = self._labels[key] = self.font.render(f"{text}: {score}", True, (255, 255, 255))
         self.screen.blit(score_text, (10, position - 10))
 
     def run(self):
         background_color = (25, 20, 20)
+        needs_redraw = True
         while self.running:
-            for event in pygame.event.get():
+            if needs_redraw:
+                self.draw(background_color)
+                needs_redraw = False
+
+            # The results screen is static, so this blocks until something happens
+            for event in self.driver.events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    needs_redraw = True
 
-            self.screen.fill(background_color)
-            mbti_result = self.getMBTI()
-            
-            title_text = self.font.render("Detective Incognito Revealed!", True, (0, 206, 209))
-            self.screen.blit(title_text, (200, 20))
-
-            # Drawing spectrums with different colors
-            self.draw_spectrum(100, self.game.ie_score, "Introverted - Extroverted", (255, 99, 71))
-            self.draw_spectrum(200, self.game.sn_score, "Sensing - Intuition", (123, 104, 238))
-            self.draw_spectrum(300, self.game.ft_score, "Thinking - Feeling", (60, 179, 113))
-            self.draw_spectrum(400, self.game.pj_score, "Judging - Perceiving", (255, 165, 0))
-            
-            # Display MBTI result in large text at the bottom
-            mbti_font = pygame.font.SysFont('Comic Sans MS', 48)  # Larger font size for MBTI result
-            result_text = mbti_font.render(mbti_result, True, (255, 215, 0))  # Gold color for emphasis
-            result_rect = result_text.get_rect(center=(400, 550))  # Positioning at the bottom center
-            self.screen.blit(result_text, result_rect)
+    def draw(self, background_color):
+        if self._static_layer is None:
+            self._static_layer = self.render_static_layer(background_color)
+        self.screen.blit(self._static_layer, (0, 0))
 
+        # Only the indicators and their labels are drawn over the cached layer
+        for (position, text, _), score in zip(self.SPECTRUMS, self.game.mb_score):
+            self.draw_indicator(position, score, text)
+
+        with profiler.span("pygame.display.flip"):
             pygame.display.flip()
 
+    def render_static_layer(self, background_color) -> pygame.Surface:
+        layer = pygame.Surface(self.screen.get_size()).convert()
+        layer.fill(background_color)
+        mbti_result = self.getMBTI()
+
+        title_text = self.font.render("Detective Incognito Revealed!", True, (0, 206, 209))
+        layer.blit(title_text, (200, 20))
+
+        # Drawing spectrums with different colors
+        for position, _, color in self.SPECTRUMS:
+            layer.blit(gradient_bar(color), (100, position))
+
+        # Display MBTI result in large text at the bottom
+        mbti_font = fonts.get('Comic Sans MS', 48, sysfont=True)  # Larger font size for MBTI result
+        result_text = mbti_font.render(mbti_result, True, (255, 215, 0))  # Gold color for emphasis
+        result_rect = result_text.get_rect(center=(400, 550))  # Positioning at the bottom center
+        layer.blit(result_text, result_rect)
+        return layer
+
 # Example usage
 if __name__ == "__main__":
     game = Game(ie_score=5, sn_score=-3, tf_score=2, jp_score=-7, name="Detective")
@@ -0,0 +1,242 @@
+"""
+Headless story engine for scripted playthroughs. Does not import pygame and does no I/O while playing.
+"""
+
+from array import array
+
+from story import STORY_PATH, Story, load_story
+from storygraph import adjacency_path, read_adjacency
+
+SCORE_MIN = -10
+SCORE_MAX = 10
+
+
+def apply_effect(score: int, effect: int) -> int:
+    """
+    Adds a choice effect to one score axis, clamping at the ends of the scale the way Game.update_scores does.
+
+    Args:
+        score (int): The current score on the axis.
+        effect (int): The effect of the choice on the axis.
+    """
+    total = score + effect
+    if effect > 0 and total > SCORE_MAX:
+        return SCORE_MAX
+    if effect < 0 and total < SCORE_MIN:
+        return SCORE_MIN
+    return total
+
+
+def mbti_type(mb_score) -> str:
+    """
+    Returns the four-letter Myers-Briggs type of a score; a score of exactly 0 counts as the first letter of the pair.
+
+    Args:
+        mb_score (Sequence[int]): The [ie, sn, ft, pj] scores.
+    """
+    return (
+        ("E" if mb_score[0] > 0 else "I")
+        + ("N" if mb_score[1] > 0 else "S")
+        + ("T" if mb_score[2] > 0 else "F")
+        + ("J" if mb_score[3] > 0 else "P")
+    )
+
+
+MBTI_TYPES = tuple(a + b + c + d for a in "IE" for b in "SN" for c in "FT" for d in "PJ")
+
+
+class PlayResult:
+    """
+    Outcome of one scripted playthrough.
+
+    Args:
+        mb_score (tuple[int, int, int, int]): Final [ie, sn, ft, pj] scores.
+        path (tuple[int, ...]): Scene IDs visited, starting with the first scene (empty when paths are not recorded).
+    """
+
+    __slots__ = ("mb_score", "path")
+
+    def __init__(self, mb_score: tuple[int, int, int, int], path: tuple[int, ...]):
+        self.mb_score = mb_score
+        self.path = path
+
+    def __repr__(self):
+        return f"PlayResult(mb_score={list(self.mb_score)}, path={list(self.path)})"
+
+
+class StoryTable:
+    """
+    A Story flattened into integer arrays so a transition is a few list lookups.
+
+    Scenes are addressed by slot (their position in the story). Choice targets are resolved from scene IDs to
+    slots once, up front; a choice pointing at a scene the story does not have gets target -1. When storygraph.py has
+    compiled a current adjacency table for the story file, the arrays are loaded from it instead of walking every
+    scene.
+    """
+
+    def __init__(self, story: Story):
+        """
+        Builds the transition table of a story.
+
+        Args:
+            story (Story): The story to flatten.
+        """
+        self._index = story.index
+        graph = read_adjacency(adjacency_path(story.path), story.path)
+        if graph is not None:
+            self.scene_ids = graph.scene_ids
+            self.choice_start = graph.choice_start
+            effects = graph.effects
+            self.effects = [tuple(effects[offset:offset + 4]) for offset in range(0, len(effects), 4)]
+            self.targets = graph.targets
+            return
+
+        scenes = story.scenes
+        self.scene_ids = array("i", (scene.scene_id for scene in scenes))
+
+        # choices of slot s are choice_start[s] .. choice_start[s + 1] - 1
+        self.choice_start = array("i", [0])
+        self.effects: list[tuple[int, int, int, int]] = []
+        self.targets = array("i")
+        for scene in scenes:
+            for choice in scene.interactive.choices:
+                self.effects.append(tuple(choice.effect))
+                target = choice.scene_reference
+                self.targets.append(self._index.slot(target) if target in self._index else -1)
+            self.choice_start.append(len(self.targets))
+
+    def slot_of(self, scene_id: int) -> int:
+        """
+        Returns the slot of a scene ID.
+
+        Raises:
+            KeyError: If the story has no such scene.
+        """
+        return self._index.slot(scene_id)
+
+    def choice_count(self, slot: int) -> int:
+        return self.choice_start[slot + 1] - self.choice_start[slot]
+
+
+class Engine:
+    """
+    Plays scripted sequences of decisions against a story without a Game, a display or any printing.
+    """
+
+    def __init__(self, story: Story = None):
+        """
+        Constructor for the engine
+
+        Args:
+            story (Story, optional): The story to play (defaults to the shared story loaded from 'resources/scene.json').
+        """
+        self._story = load_story(STORY_PATH) if story is None else story
+        self._table = StoryTable(self._story)
+
+    @classmethod
+    def for_game(cls, game) -> "Engine":
+        """Returns an engine over the story a Game session is playing."""
+        return cls(game.story)
+
+    @property
+    def story(self) -> Story:
+        return self._story
+
+    @property
+    def table(self) -> StoryTable:
+        return self._table
+
+    def play(self, decisions, start_scene_id: int = None, start_scores=(0, 0, 0, 0), record_path: bool = True) -> PlayResult:
+        """
+        Plays one sequence of decisions.
+
+        Args:
+            decisions (Iterable[int]): Player decisions, 1-based like Game.process_scene.
+            start_scene_id (int, optional): Scene to start in (defaults to the first scene of the story).
+            start_scores (Sequence[int], optional): Starting [ie, sn, ft, pj] scores (defaults to all 0).
+            record_path (bool, optional): Keep the visited scene IDs in the result (defaults to True).
+
+        Raises:
+            ValueError: If a decision is not a choice of the current scene, or leads to a scene the story does not have.
+        """
+        table = self._table
+        scene_ids = table.scene_ids
+        choice_start = table.choice_start
+        effects = table.effects
+        targets = table.targets
+
+        slot = 0 if start_scene_id is None else table.slot_of(start_scene_id)
+        ie, sn, ft, pj = start_scores
+        path = [scene_ids[slot]] if record_path else None
+
+        for decision in decisions:
+            first = choice_start[slot]
+            if not 1 <= decision <= choice_start[slot + 1] - first:
+                raise ValueError(f"scene {scene_ids[slot]} has no choice {decision}")
+            choice = first + decision - 1
+            e_ie, e_sn, e_ft, e_pj = effects[choice]
+            ie = apply_effect(ie, e_ie)
+            sn = apply_effect(sn, e_sn)
+            ft = apply_effect(ft, e_ft)
+            pj = apply_effect(pj, e_pj)
+            if targets[choice] < 0:
+                raise ValueError(f"scene {scene_ids[slot]} choice {decision} leads to a missing scene")
+            slot = targets[choice]
+            if record_path:
+                path.append(scene_ids[slot])
+
+        return PlayResult((ie, sn, ft, pj), tuple(path) if record_path else ())
+
+    def play_game(self, game, decisions, record_path: bool = True) -> PlayResult:
+        """
+        Plays decisions from a Game session's current scene and scores, without modifying the session.
+
+        Args:
+            game (Game): The session to start from.
+            decisions (Iterable[int]): Player decisions, 1-based like Game.process_scene.
+            record_path (bool, optional): Keep the visited scene IDs in the result (defaults to True).
+        """
+        return self.play(decisions, game.get_current_scene_id(), tuple(game.mb_score), record_path)
+
+    def play_batch(self, scripts, start_scene_id: int = None, start_scores=(0, 0, 0, 0), record_path: bool = False):
+        """
+        Plays many sequences of decisions, yielding one result per sequence.
+
+        Paths are not recorded by default since batch runs usually only need the final scores.
+
+        Args:
+            scripts (Iterable[Iterable[int]]): The decision sequences to play.
+            start_scene_id (int, optional): Scene every playthrough starts in (defaults to the first scene).
+            start_scores (Sequence[int], optional): Starting [ie, sn, ft, pj] scores (defaults to all 0).
+            record_path (bool, optional): Keep the visited scene IDs in each result (defaults to False).
+
+        Yields:
+            PlayResult: The outcome of each script, in order.
+        """
+        play = self.play
+        for decisions in scripts:
+            yield play(decisions, start_scene_id, start_scores, record_path)
+
+    def score_batch(self, scripts, start_scene_id: int = None, start_scores=(0, 0, 0, 0)):
+        """
+        Plays many sequences of decisions and returns only their final scores, vectorized with NumPy.
+
+        Every script advances one decision per step, so a batch of a million short scripts costs a few dozen array
+        operations rather than a million Python loops. Use play_batch when paths are needed.
+
+        Args:
+            scripts (Sequence[Sequence[int]]): The decision sequences to play.
+            start_scene_id (int, optional): Scene every playthrough starts in (defaults to the first scene).
+            start_scores (Sequence[int], optional): Starting [ie, sn, ft, pj] scores (defaults to all 0).
+
+        Returns:
+            scoring.ScoreBatch: The final scores, one row per script in order.
+
+        Raises:
+            ValueError: If a decision is not a choice of its scene, or leads to a scene the story does not have.
+        """
+        # Imported here because scoring imports this module
+        from scoring import play_scores
+
+        slot = 0 if start_scene_id is None else self._table.slot_of(start_scene_id)
+        return play_scores(self._table, scripts, slot, start_scores)
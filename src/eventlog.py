@@ -0,0 +1,409 @@
+"""
+Choice log: every decision passed to Game.process_scene, recorded as an event in an append-only file.
+
+File layout: a FILE_HEADER (magic, format version, base sequence), then EVENT records:
+
+    session_id  u32
+    scene_id    i32 scene the decision was made in
+    choice      u8  1-based decision; START_CHOICE marks a new session and END_CHOICE an ended one
+    name_length u16 length of the UTF-8 player name following a START_CHOICE event, 0 otherwise
+    timestamp   f64 seconds since the epoch
+
+Events are numbered in order, starting at the base sequence. Since process_scene is deterministic, replay() rebuilds
+every session's scores and current scene from a snapshot (see snapshot.py) plus the events after it. Compaction folds
+the log into that snapshot and starts a new, empty log, so replay only ever reads the events since the last
+compaction. A snapshot records how many events it holds, so a crash between writing the snapshot and truncating the
+log does not apply any event twice.
+
+ChoiceLog compacts on a background thread, so the decision that crosses compact_every does not wait for a full replay.
+Sessions without a start event (from version 1 logs, which are still read) replay with the default name.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import Engine
+from snapshot import read_snapshot, write_snapshot
+from story import STORY_PATH, load_story
+
+MAGIC = b"MBCL"
+VERSION = 2
+# Version 1 events have zero bytes where name_length is, so they read as version 2 events without a name
+READ_VERSIONS = (1, 2)
+FILE_HEADER = struct.Struct("<4sHxxQ")
+EVENT = struct.Struct("<IiBxHd")
+END_CHOICE = 0
+START_CHOICE = 255
+
+logger = logging.getLogger(__name__)
+
+
+class SessionState:
+    """
+    A session as rebuilt by replay.
+
+    Args:
+        scene_id (int): The current scene.
+        mb_score (tuple[int, int, int, int]): The [ie, sn, ft, pj] scores.
+        name (str): The player name.
+    """
+
+    __slots__ = ("scene_id", "mb_score", "name")
+
+    def __init__(self, scene_id: int, mb_score: tuple[int, int, int, int], name: str):
+        self.scene_id = scene_id
+        self.mb_score = mb_score
+        self.name = name
+
+    def __repr__(self):
+        return f"SessionState(scene_id={self.scene_id}, mb_score={list(self.mb_score)}, name={self.name!r})"
+
+
+def _read_log(path: str) -> tuple[int, bytes]:
+    """Returns the base sequence of a log file and the data after its header; (0, b"") when it does not exist."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return 0, b""
+    if len(data) < FILE_HEADER.size:
+        return 0, b""
+    magic, version, base = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a choice log file")
+    if version not in READ_VERSIONS:
+        raise ValueError(f"choice log format version {version}, expected one of {READ_VERSIONS}")
+    return base, data[FILE_HEADER.size:]
+
+
+def _parse_events(events: bytes):
+    """
+    Yields (end, session_id, scene_id, choice, timestamp, name) for every complete event, where end is the offset
+    just past the event and name is None except for start events. A torn last event from a crash is ignored.
+    """
+    offset = 0
+    while offset + EVENT.size <= len(events):
+        session_id, scene_id, choice, name_length, timestamp = EVENT.unpack_from(events, offset)
+        end = offset + EVENT.size + name_length
+        if end > len(events):
+            return
+        name = events[offset + EVENT.size:end].decode("utf-8") if choice == START_CHOICE else None
+        yield end, session_id, scene_id, choice, timestamp, name
+        offset = end
+
+
+def encode_event(session_id: int, scene_id: int, choice: int, timestamp: float, name: str = None) -> bytes:
+    """
+    Encodes one event; name is only stored for start events.
+
+    Raises:
+        ValueError: If a field does not fit its slot.
+    """
+    name_bytes = b"" if name is None else name.encode("utf-8")
+    try:
+        return EVENT.pack(session_id, scene_id, choice, len(name_bytes), timestamp) + name_bytes
+    except struct.error as e:
+        raise ValueError(f"session {session_id} cannot be logged: {e}") from e
+
+
+def read_events(path: str, until: int = None):
+    """
+    Yields (sequence, session_id, scene_id, choice, timestamp, name) for every complete event of a log file; name is
+    the player name of a start event and None for the others.
+
+    Args:
+        path (str): The choice log.
+        until (int, optional): Stop before the event with this sequence number.
+
+    Raises:
+        ValueError: If the file is not a choice log or has an unsupported version.
+    """
+    base, events = _read_log(path)
+    for sequence, (_, session_id, scene_id, choice, timestamp, name) in enumerate(_parse_events(events), base):
+        if until is not None and sequence >= until:
+            return
+        yield sequence, session_id, scene_id, choice, timestamp, name
+
+
+def replay(
+    log_path: str, snapshot_path: str = None, story_path: str = STORY_PATH, session_ids=None, until: int = None
+) -> dict[int, SessionState]:
+    """
+    Rebuilds sessions from a snapshot and the choice log written after it.
+
+    Args:
+        log_path (str): The choice log.
+        snapshot_path (str, optional): Snapshot the log was compacted into; without one every session starts fresh.
+        story_path (str, optional): Story the sessions play (defaults to 'resources/scene.json').
+        session_ids (Iterable[int], optional): Only rebuild these sessions (defaults to all of them).
+        until (int, optional): Only apply the events before this sequence number (defaults to all of them).
+
+    Returns:
+        dict[int, SessionState]: The live sessions by session ID.
+
+    Raises:
+        ValueError: If an event is not a valid decision in the scene the replayed session is in.
+    """
+    wanted = None if session_ids is None else set(session_ids)
+    applied, saved = read_snapshot(snapshot_path) if snapshot_path is not None else (0, {})
+
+    # Decisions of each session, in log order, with the scene each was recorded in
+    decisions: dict[int, list[int]] = {}
+    recorded_scenes: dict[int, list[int]] = {}
+    ended = set()
+    # Names of the sessions started in the log; they start over from the first scene
+    started: dict[int, str] = {}
+    for sequence, session_id, scene_id, choice, _, name in read_events(log_path, until):
+        if sequence < applied or (wanted is not None and session_id not in wanted):
+            continue
+        if choice == END_CHOICE or choice == START_CHOICE:
+            decisions.pop(session_id, None)
+            recorded_scenes.pop(session_id, None)
+            if choice == START_CHOICE:
+                ended.discard(session_id)
+                started[session_id] = name
+            else:
+                ended.add(session_id)
+                started.pop(session_id, None)
+            continue
+        ended.discard(session_id)
+        decisions.setdefault(session_id, []).append(choice)
+        recorded_scenes.setdefault(session_id, []).append(scene_id)
+
+    story = load_story(story_path)
+    engine = Engine(story)
+    first_scene_id = story.first_scene.scene_id if story.first_scene else None
+
+    states = {}
+    for session_id, (scene_id, scores, name) in saved.items():
+        if session_id not in ended and (wanted is None or session_id in wanted):
+            states[session_id] = SessionState(scene_id, tuple(scores), name)
+    for session_id, name in started.items():
+        states[session_id] = SessionState(first_scene_id, (0, 0, 0, 0), name)
+
+    for session_id, session_decisions in decisions.items():
+        state = states.get(session_id)
+        if state is None:
+            state = states[session_id] = SessionState(first_scene_id, (0, 0, 0, 0), "MC")
+        result = engine.play(session_decisions, state.scene_id, state.mb_score)
+        # path[i] is the scene decision i was made in; a mismatch means events are missing or out of order
+        if list(result.path[:-1]) != recorded_scenes[session_id]:
+            raise ValueError(f"session {session_id}: logged scenes do not follow the story")
+        state.scene_id = result.path[-1]
+        state.mb_score = result.mb_score
+    return states
+
+
+class ChoiceLog:
+    """
+    Appends decision events to a choice log, compacting it into a snapshot every compact_every events.
+
+    Compaction runs on a background thread: it replays the events up to a sequence number while new events keep being
+    appended, writes the snapshot, then starts a new log holding only the events recorded meanwhile. A failed
+    compaction is logged and tried again after another compact_every events.
+    """
+
+    def __init__(self, path: str, snapshot_path: str = None, story_path: str = STORY_PATH, compact_every: int = 100_000):
+        """
+        Opens a choice log for appending, creating it or cutting off a torn last event left by a crash. A new log is
+        numbered on from the snapshot's sequence.
+
+        Args:
+            path (str): The choice log.
+            snapshot_path (str, optional): Snapshot to compact into (defaults to path + '.snapshot').
+            story_path (str, optional): Story the logged sessions play (defaults to 'resources/scene.json').
+            compact_every (int, optional): Events after which the log is compacted; 0 never compacts automatically (defaults to 100,000).
+
+        Raises:
+            ValueError: If the log ends before the events already folded into the snapshot, so new events would be
+                numbered as already applied.
+        """
+        self._path = path
+        self._snapshot_path = path + ".snapshot" if snapshot_path is None else snapshot_path
+        self._story_path = story_path
+        self._compact_every = compact_every
+
+        base, data = _read_log(path)
+        events = 0
+        size = 0
+        for size, *_ in _parse_events(data):
+            events += 1
+        applied, _ = read_snapshot(self._snapshot_path)
+        if os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER.size:
+            # The log may start before the snapshot (a crash between compacting and truncating), but must reach it
+            if base + events < applied:
+                raise ValueError(
+                    f"choice log {path} ends at event {base + events}, before the {applied} events already in "
+                    f"snapshot {self._snapshot_path}"
+                )
+            self._file = open(path, "r+b", buffering=1 << 16)
+            # Version 2 can hold everything version 1 did, so an older log is upgraded in place
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, base))
+            self._file.truncate(FILE_HEADER.size + size)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            # A new log continues after the snapshot; starting at 0 would number new events as already applied
+            base = applied
+            self._file = self._create(path, base)
+        self._base = base
+        self._events = events
+        # Bytes of events after the header
+        self._size = size
+
+        # Guards the file and the counters above against the compaction thread
+        self._lock = threading.Lock()
+        # Only one compaction at a time, background or not
+        self._compact_lock = threading.Lock()
+        self._executor = None
+        self._compaction = None
+        self._next_compaction = compact_every
+
+    @staticmethod
+    def _create(path: str, base: int):
+        file = open(path, "wb", buffering=1 << 16)
+        file.write(FILE_HEADER.pack(MAGIC, VERSION, base))
+        return file
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def snapshot_path(self) -> str:
+        return self._snapshot_path
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number the next event will get."""
+        return self._base + self._events
+
+    def _append(self, event: bytes) -> None:
+        with self._lock:
+            self._file.write(event)
+            self._events += 1
+            self._size += len(event)
+            due = self._compact_every and self._events >= self._next_compaction and self._compaction is None
+            if due:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="choice-log-compaction")
+                self._compaction = self._executor.submit(self.compact)
+        if due:
+            self._compaction.add_done_callback(self._compacted)
+
+    def _compacted(self, future) -> None:
+        error = future.exception()
+        with self._lock:
+            self._compaction = None
+            if error is not None:
+                # Backs off instead of retrying on every event
+                self._next_compaction = self._events + self._compact_every
+        if error is not None:
+            logger.error("choice log compaction failed; retrying after %d more events", self._compact_every,
+                         exc_info=error)
+
+    def start(self, session_id: int, scene_id: int, name: str, timestamp: float = None) -> None:
+        """
+        Appends the start of a session with its player name, so replay restores the name.
+
+        Raises:
+            ValueError: If the name is longer than 65,535 bytes.
+        """
+        self._append(encode_event(session_id, scene_id, START_CHOICE, time.time() if timestamp is None else timestamp, name))
+
+    def record(self, session_id: int, scene_id: int, choice: int, timestamp: float = None) -> None:
+        """
+        Appends one decision. Cheap enough to call on every process_scene: one struct pack into a buffered file.
+
+        Args:
+            session_id (int): The session deciding.
+            scene_id (int): The scene the decision is made in, before process_scene moves on.
+            choice (int): The 1-based decision.
+            timestamp (float, optional): When it was made (defaults to now).
+
+        Raises:
+            ValueError: If a field does not fit its slot; nothing is appended.
+        """
+        self._append(encode_event(session_id, scene_id, choice, time.time() if timestamp is None else timestamp))
+
+    def end(self, session_id: int, scene_id: int, timestamp: float = None) -> None:
+        """Appends the end of a session, so it is not rebuilt by replay."""
+        self.record(session_id, scene_id, END_CHOICE, timestamp)
+
+    def replay(self, session_ids=None) -> dict[int, SessionState]:
+        """Rebuilds sessions from the snapshot and this log; see replay()."""
+        # Not while a compaction swaps the snapshot and the log, which must be read as a matching pair
+        with self._compact_lock:
+            with self._lock:
+                self._file.flush()
+            return replay(self._path, self._snapshot_path, self._story_path, session_ids)
+
+    def compact(self) -> int:
+        """
+        Folds every event logged so far into the snapshot and starts a new log after it. Events may keep being
+        recorded from other threads meanwhile; they are carried over to the new log.
+
+        Returns:
+            int: Number of live sessions in the snapshot.
+        """
+        with self._compact_lock:
+            with self._lock:
+                self._file.flush()
+                sequence = self.sequence
+                folded_size = self._size
+
+            # The slow part, replay and fsync, runs without blocking record()
+            states = replay(self._path, self._snapshot_path, self._story_path, until=sequence)
+            write_snapshot(
+                self._snapshot_path,
+                {session_id: (state.scene_id, state.mb_score, state.name) for session_id, state in states.items()},
+                sequence,
+            )
+
+            with self._lock:
+                self._file.flush()
+                with open(self._path, "rb") as file:
+                    file.seek(FILE_HEADER.size + folded_size)
+                    carried = file.read(self._size - folded_size)
+                with self._create(self._path + ".tmp", sequence) as file:
+                    file.write(carried)
+                self._file.close()
+                os.replace(self._path + ".tmp", self._path)
+                self._file = open(self._path, "ab", buffering=1 << 16)
+                self._events -= sequence - self._base
+                self._base = sequence
+                self._size = len(carried)
+                self._next_compaction = self._compact_every
+            return len(states)
+
+    def wait_for_compaction(self) -> None:
+        """Blocks until a background compaction in progress has finished; a failure was already logged."""
+        compaction = self._compaction
+        if compaction is not None:
+            try:
+                compaction.result()
+            except Exception:
+                pass
+
+    def flush(self, sync: bool = False) -> None:
+        """Writes buffered events to the file, and to disk when sync is set."""
+        with self._lock:
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self.wait_for_compaction()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.flush(sync=True)
+        self._file.close()
+
+    def __enter__(self) -> "ChoiceLog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,7 +1,14 @@
-import json
+import logging
 from abc import ABC
 from scene import Scene
-from text import Dialogue, Interactive
+from text import Dialogue, Interactive, fill_name, tokenize
+from instrument import profiler
+from story import STORY_PATH, Story, load_scenes, load_scenes_from_json, load_story
+
+logger = logging.getLogger(__name__)
+
+# Placeholder for the scene ID of a Game whose story has not been loaded yet
+_FIRST_SCENE = object()
 
 
 class Game:
@@ -16,6 +23,7 @@ class Game:
         tf_score: int = 0,
         jp_score: int = 0,
         name: str = "MC",
+        story_path: str = STORY_PATH,
     ):
         """
         Constructor for game logic
@@ -26,6 +34,7 @@ class Game:
             ft_score (int, optional): Feeling vs. Thinking score on a scale of (-10, 10), where -10 is more Feeling and 10 is more Thinking.
             pj_score (int, optional): Perceiving vs. Judging score on a scale of (-10, 10), where -10 is more Perceiving and 10 is more Judging .
             name (str, optional): Name of the Main Character (defaults to 'MC')
+            story_path (str, optional): Path to the story, either scene.json or a compiled story from scenebin.py (defaults to 'resources/scene.json')
 
         """
         self._name = name
@@ -34,9 +43,11 @@ class Game:
         self._ft_score = tf_score
         self._pj_score = jp_score
 
-        # scenes (dict[int, Scene]): Dictionary mapping scene IDs to Scene objects, representing all possible scenes in the game.
-        self.scenes = self.load_scenes_from_json("resources/scene.json")
-        self.current_scene = self.scenes[0] if self.scenes else None
+        # story (Story): The scenes of the game, shared with every other session reading the same file. Loaded on
+        # first use, so creating a Game (ie. to restore a saved session) does not touch the story file.
+        self._story_path = story_path
+        self._story = None
+        self._current_scene_id = _FIRST_SCENE
 
         # mb_score (list[int]): Myers-Briggs score, a list of integers consisting of ie, sn, ft, and pj scores.
         self.mb_score = [ie_score, sn_score, tf_score, jp_score]
@@ -82,13 +93,55 @@ class Game:
     def pj_score(self, value: int):
         self._pj_score = value
 
+    @property
+    def story(self) -> Story:
+        if self._story is None:
+            self._story = load_story(self._story_path)
+        return self._story
+
+    @property
+    def scenes(self):
+        return self.story.scenes
+
+    @property
+    def current_scene_id(self) -> int:
+        if self._current_scene_id is _FIRST_SCENE:
+            first_scene = self.story.first_scene
+            self._current_scene_id = first_scene.scene_id if first_scene else None
+        return self._current_scene_id
+
+    @current_scene_id.setter
+    def current_scene_id(self, value: int):
+        self._current_scene_id = value
+
     @property
     def current_scene(self) -> Scene:
-        return self._current_scene
+        # Reads the attributes directly once loaded; this runs on every transition
+        scene_id = self._current_scene_id
+        if scene_id is _FIRST_SCENE:
+            scene_id = self.current_scene_id
+        if scene_id is None:
+            return None
+        story = self._story
+        if story is None:
+            story = self.story
+        return story.scene_by_id(scene_id)
 
     @current_scene.setter
     def current_scene(self, value: Scene):
-        self._current_scene = value
+        self._current_scene_id = value.scene_id
+
+    def load_scenes(self, story_path):
+        """
+        Loads the scenes of a story, reading compiled stories lazily.
+
+        Args:
+            story_path (str): Path to a JSON story or a compiled binary story.
+
+        Returns:
+            list[Scene] | CompiledStory: The scenes in story order.
+        """
+        return load_scenes(story_path)
 
     def load_scenes_from_json(self, json_file_path) -> list[Scene]:
         """
@@ -97,69 +150,26 @@ class Game:
         Args:
             json_file_path (str): Path to the JSON file.
         """
-        with open(json_file_path, "r") as file:
-            scenes_data = json.load(file)
-
-        scenes_list = []
-
-        for scene_data in scenes_data:
-            # Construct Dialogue objects for each dialogue entry in the scene
-            dialogues = []
-            for dialogue in scene_data["dialogues"]:
-                speaker = dialogue["speaker"]
-                text = dialogue["text"]
-
-                dialogues.append(Dialogue(speaker, text))
-
-            # Construct Interactive.Choice objects for each choice in the interactive entry
-            choices = []
-
-            for choice in scene_data["interactive"]["choices"]:
-                response = choice["response"]
-                effect = choice["effect"]
-                scene_reference = choice["sceneReference"]
-
-                choices.append(Interactive.Choice(response, effect, scene_reference))
-
-            # Construct the Interactive object (uses choices)
-            interactive_speaker = scene_data["interactive"]["speaker"]
-            interactive_prompt = scene_data["interactive"]["prompt"]
-
-            interactive = Interactive(interactive_speaker, interactive_prompt, choices)
-
-            # Initialize the Scene object
-            scene_id = scene_data["scene_id"]
-            scene_speakers = scene_data["speakers"].split(",")
-            scene_setting = scene_data["setting"]
-
-            scene = Scene(
-                scene_id, scene_speakers, scene_setting, dialogues, interactive
-            )
-
-            scenes_list.append(scene)
-
-        return scenes_list
+        return load_scenes_from_json(json_file_path)
 
+    @staticmethod
     def replace_name_in_json(json_data, new_name):
         """
-        Replaces all instances of [Name] or [NAME] in the JSON data with the specified new_name.
+        Replaces all instances of [Name] or [NAME] in the JSON data with the specified new_name, in place.
+
+        The loaders do not use this: story text is tokenized once at load time and filled in per line as it is shown
+        (see Dialogue.text_for). This remains for callers that hold raw scene.json data.
 
         Args:
             json_data (list): The JSON data loaded into Python as a list or dict.
             new_name (str): The new name to replace [Name] or [NAME] with.
         """
-        if isinstance(json_data, dict):
-            for key, value in json_data.items():
-                if isinstance(value, str):
-                    json_data[key] = value.replace("[Name]", new_name).replace(
-                        "[NAME]", new_name
-                    )
-                elif isinstance(value, (dict, list)):
-                    replace_name_in_json(value, new_name)
-        elif isinstance(json_data, list):
-            for item in json_data:
-                if isinstance(item, (dict, list)):
-                    replace_name_in_json(item, new_name)
+        items = json_data.items() if isinstance(json_data, dict) else enumerate(json_data)
+        for key, value in items:
+            if isinstance(value, str):
+                json_data[key] = fill_name(tokenize(value), new_name)
+            elif isinstance(value, (dict, list)):
+                Game.replace_name_in_json(value, new_name)
 
     def get_current_scene_id(self) -> int:
         """
@@ -169,7 +179,7 @@ class Game:
             int: Scene id number.
         """
 
-        return self.current_scene.scene_id
+        return self.current_scene_id
 
     def update_scores(self, player_choice: Interactive.Choice) -> None:
         """
@@ -213,6 +223,7 @@ class Game:
         self.mb_score = [self._ie_score, self._sn_score, self._ft_score, self._pj_score]
 
     # NOTE: This method may be the culprit of issues
+    @profiler.timed("Game.process_scene")
     def process_scene(self, player_decision: int) -> None:
         """
         Updates the current scene in the game based on the player decision (usually 1-4). Updates the player scores with the effect of the choice and then changes the scene to the new scene of the choice reference.
@@ -224,10 +235,11 @@ class Game:
         #     print(scene)
         # the choice the player chooses in the current scene (Choice object)
         player_choice = self.current_scene.interactive.choices[player_decision - 1]
-        print(player_choice)
         self.update_scores(player_choice)
-        print(self.mb_score)
-        # change the current scene to the new scene (-1 bc list index)
-        print(player_choice.scene_reference - 1)
-        self.current_scene = self.scenes[player_choice.scene_reference]
-        print(self.current_scene)
+        # change the current scene to the new scene (sceneReference is a scene id, not a list index)
+        self.current_scene_id = player_choice.scene_reference
+        # Guarded, since the arguments would be built (and the next scene decoded) even with debug logging off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s", player_choice)
+            logger.debug("%s", self.mb_score)
+            logger.debug("%s", self.current_scene)
@@ -1,12 +1,22 @@
 import pygame
+import argparse
 import sys
-import textwrap
+from collections import OrderedDict
 from game import Game, Scene
+from story import ENDING_SCENE_IDS
 from text import Dialogue, Interactive
+from dashboard import MyersBriggsDisplay
+from loop import LoopDriver
+from assets import AssetPrefetcher, asset_cache, background_path, AVATAR_PATHS, TITLE_SCREEN_PATH
+from textlayout import fonts, text_layouts
+from instrument import IDLE_SPAN, profiler
 
 screen_width = 800
 screen_height = 600
 
+# Frame rate cap while something on screen is animating
+FPS_CAP = 30
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -14,55 +24,57 @@ LIGHT_PINK = (255, 204, 255)
 PURPLE = (178, 102, 255)  # Color for the border
 LIGHT_BLUE = (173, 216, 230)  # Highlight color
 
-def load_image(image_path):
-    """Load an image from the specified file path."""
+def load_image(image_path, alpha=False, flip=False):
+    """Load an image from the specified file path, reusing the decoded surface from the asset cache."""
     try:
-        image = pygame.image.load(image_path)
-        return image
-    except pygame.error as e:
+        return asset_cache.get(image_path, alpha, flip)
+    except (pygame.error, FileNotFoundError) as e:
         print(f'Error loading image: {e}')
         sys.exit(1)
 
-def enter_background(background_name: str):
-    background_image_path = f"resources/images/{background_name}"
-    background_image = pygame.image.load(background_image_path)
-    screen.blit(background_image, (0, 0))
+def ensure_scene_images(prefetcher, scene):
+    """Make the images of a scene available through the prefetcher, exiting like load_image when one cannot load."""
+    try:
+        prefetcher.ensure_scene(scene)
+    except (pygame.error, FileNotFoundError) as e:
+        print(f'Error loading image: {e}')
+        sys.exit(1)
 
-def show_title_screen():
-    title_screen = pygame.image.load("resources/images/title_screen.jpeg")
+@profiler.timed("enter_background")
+def enter_background(background_name: str, surface=None):
+    target = screen if surface is None else surface
+    background_image = load_image(background_path(background_name))
+    target.blit(background_image, (0, 0))
+
+def show_title_screen(surface=None):
+    target = screen if surface is None else surface
+    title_screen = load_image(TITLE_SCREEN_PATH)
     image_x = (screen_width - title_screen.get_width()) // 2
     image_y = (screen_height - title_screen.get_height()) // 2
-    screen.blit(title_screen, (image_x, image_y))
-
-def enter_avatars(character_list: list[str]):
-    avatar_dict: dict[str, str] = {"BOSSP": "resources/images/bossp.PNG",
-                                   "BABEMAX": "resources/images/babemax.PNG",
-                                   "BIRB": "resources/images/birb.PNG",
-                                   "CORNELIUS": "resources/images/cornelius.PNG",
-                                   "TUSK": "resources/images/tusk.PNG",
-                                   "LIZZI": "resources/images/lizzy.PNG"}
+    target.blit(title_screen, (image_x, image_y))
 
-    avatar_url_list = [avatar_dict[x] for x in character_list]
+@profiler.timed("enter_avatars")
+def enter_avatars(character_list: list[str], surface=None):
+    target = screen if surface is None else surface
+    # Every second avatar is mirrored so the characters face each other
+    avatars = [load_image(AVATAR_PATHS[x], alpha=True, flip=counter % 2 == 1)
+               for counter, x in enumerate(character_list)]
 
     # Define padding between avatars
     padding = 20  # This value can be adjusted as needed
 
     # Calculate the total width all avatars will occupy including padding
-    total_avatar_width = sum(load_image(avatar_dict[x]).get_width() for x in character_list) + padding * (len(character_list) - 1)
+    total_avatar_width = sum(avatar.get_width() for avatar in avatars) + padding * (len(character_list) - 1)
 
     # Calculate starting x position
     starting_x = (screen_width - total_avatar_width) // 2
 
     current_x = starting_x  # Initialize current_x to starting_x
-    for counter, avatar_path in enumerate(avatar_url_list):
-        avatar = load_image(avatar_path)
-        if counter % 2 == 1:
-            avatar = pygame.transform.flip(avatar, True, False)
-
+    for avatar in avatars:
         # Image_y remains the same because we are only adjusting horizontal spacing
         image_y = screen_height - avatar.get_height()  # Vertical position
 
-        screen.blit(avatar, (current_x, image_y))
+        target.blit(avatar, (current_x, image_y))
 
         # Update current_x for the next avatar, including padding
         current_x += avatar.get_width() + padding
@@ -70,17 +82,14 @@ def enter_avatars(character_list: list[str]):
 
 def draw_text_wrapped(surface, text, pos, font, max_width, color):
     """Draws text on a surface, wrapping words to stay within a specified width."""
-    words = textwrap.wrap(text, width=max_width)
-    x, y = pos
-    for word in words:
-        word_surface = font.render(word, True, color)
-        surface.blit(word_surface, (x, y))
-        y += font.get_linesize()  # Move to the next line
+    # Lines are rendered once and reused from the layout cache
+    text_layouts.wrap_chars(text, font, max_width, color).blit(surface, pos)
 
+@profiler.timed("draw_dialogue_box")
 def draw_dialogue_box(screen, text):
-    """Draws a dialogue box at the bottom of the screen with the given text and a border."""
+    """Draws a dialogue box at the bottom of the screen with the given text and a border, and returns the area it covers."""
 
-    font = pygame.font.Font(None, 27)
+    font = fonts.get(None, 27)
     # Dialogue box dimensions and position
     box_height = 100
     box_y = screen_height - box_height
@@ -113,29 +122,22 @@ def draw_dialogue_box(screen, text):
     # Render and blit the wrapped text onto the screen
     draw_text_wrapped(screen, text, (text_x, text_y), font, 80, BLACK)  # 60 characters, adjust as needed
 
+    return pygame.Rect(0, outer_box_y, screen_width, screen_height - outer_box_y)
+
 
 def draw_text_wrapped_2(surface, text, pos, font, max_width, color, bg_color=None):
     """Draws text on a surface, wrapping words to stay within a specified width, and returns the height of the drawn text."""
-    words = text.split(' ')  # Split the text by spaces to find words
-    space_width, line_height = font.size(' ')  # Width of a space and the height of a line of text.
-    x, initial_y = pos
-    y = initial_y
-    for word in words:
-        word_surface = font.render(word, True, color, bg_color)
-        word_width, word_height = word_surface.get_size()
-        if x + word_width > max_width:
-            x = pos[0]  # Reset x to start of line.
-            y += line_height  # Start on new line.
-        surface.blit(word_surface, (x, y))
-        x += word_width + space_width  # Move x to start of next word.
+    layout = text_layouts.wrap_words(text, font, pos[0], max_width, color, bg_color)
+    layout.blit(surface, pos)
 
     # Return the total height of the rendered text
-    return y + line_height - initial_y
+    return layout.height
 
 
+@profiler.timed("draw_dialogue_box_with_options")
 def draw_dialogue_box_with_options(screen, prompt, options, selected_option):
-    """Draws a dialogue box with a prompt, multiple choice options, and a border."""
-    font = pygame.font.Font(None, 25)
+    """Draws a dialogue box with a prompt, multiple choice options, and a border, and returns the area it covers."""
+    font = fonts.get(None, 25)
     # Define colors
     BLACK = (0, 0, 0)
     PURPLE = (128, 0, 128)
@@ -167,88 +169,124 @@ def draw_dialogue_box_with_options(screen, prompt, options, selected_option):
                                           screen_width - 40, BLACK, option_bg_color)
         option_start_y += option_height + option_padding
 
-
-class MyersBriggsDisplay:
-    def __init__(self, game):
-        pygame.init()
-        self.game = game
-        self.screen = pygame.display.set_mode((800, 600))
-        pygame.display.set_caption("Detective Incognito Revealed!")
-        self.font = pygame.font.SysFont('Comic Sans MS', 30)
-        self.running = True
-
-    def getMBTI(self) -> str:
-        result = ''
-        mbti = game.mb_score
-
-        # Introversion (I) or Extroversion (E)
-        if mbti[0] > 0:
-            result += "E"
-        else:
-            result += "I"
-
-        # Sensing (S) or Intuition (N)
-        if mbti[1] > 0:
-            result += "N"
-        else:
-            result += "S"
-
-        # Thinking (T) or Feeling (F)
-        if mbti[2] > 0:
-            result += "T"
-        else:
-            result += "F"
-
-        # Judging (J) or Perceiving (P)
-        if mbti[3] > 0:
-            result += "J"
-        else:
-            result += "P"
-
-        return result
-
-    def draw_spectrum(self, position, score, text, color):
-        # Gradient background for spectrum
-        start_color = (68, 85, 90)  # Dark shade
-        end_color = color  # Bright color for the spectrum
-        for i, ratio in enumerate(range(100)):
-            pygame.draw.line(self.screen,
-                             [start_color[j] + ((float(i) / 100) * (end_color[j] - start_color[j])) for j in range(3)],
-                             (100, position + ratio), (700, position + ratio), 1)
-
-        # Score Indicator
-        pygame.draw.circle(self.screen, (0, 255, 0), (int(400 + (score * 30)), position + 50), 15)
-        score_text = self.font.render(f"{text}: {score}", True, (255, 255, 255))
-        self.screen.blit(score_text, (10, position - 10))
-
-    def run(self):
-        background_color = (25, 20, 20)
-        while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-
-            self.screen.fill(background_color)
-            mbti_result = self.getMBTI()
-
-            title_text = self.font.render("Detective Incognito Revealed!", True, (0, 206, 209))
-            self.screen.blit(title_text, (200, 20))
-
-            # Drawing spectrums with different colors
-            self.draw_spectrum(100, self.game.ie_score, "Introverted - Extroverted", (255, 99, 71))
-            self.draw_spectrum(200, self.game.sn_score, "Sensing - Intuition", (123, 104, 238))
-            self.draw_spectrum(300, self.game.ft_score, "Thinking - Feeling", (60, 179, 113))
-            self.draw_spectrum(400, self.game.pj_score, "Judging - Perceiving", (255, 165, 0))
-
-            # Display MBTI result in large text at the bottom
-            mbti_font = pygame.font.SysFont('Comic Sans MS', 48)  # Larger font size for MBTI result
-            result_text = mbti_font.render(mbti_result, True, (255, 215, 0))  # Gold color for emphasis
-            result_rect = result_text.get_rect(center=(400, 550))  # Positioning at the bottom center
-            self.screen.blit(result_text, result_rect)
-
-            pygame.display.flip()
-
+    return pygame.Rect(0, box_y - border_thickness, screen_width, screen_height - box_y + border_thickness)
+
+
+class SceneRenderer:
+    """
+    Retained render layer for the title, dialogue and choice screens.
+
+    The background and avatars of a scene are composited once into an off-screen layer. Afterwards only the
+    dialogue box region is restored from that layer and redrawn, and only the changed areas are pushed to the display.
+    """
+
+    def __init__(self, surface, max_layers: int = 8):
+        """
+        Constructor for the scene renderer
+
+        Args:
+            surface (pygame.Surface): The display surface to draw on.
+            max_layers (int, optional): Number of composited scene layers to keep (defaults to 8).
+        """
+        self.surface = surface
+        self._max_layers = max_layers
+        self._layers: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self._shown_key = None
+        self._box_rect = None
+        self._dirty: list[pygame.Rect] = []
+
+    def scene_layer(self, scene: Scene) -> pygame.Surface:
+        """
+        Returns the composited background and avatar layer of a scene, building it on first use.
+
+        Args:
+            scene (Scene): The scene to composite.
+        """
+        key = (scene.setting, tuple(scene.speakers))
+        layer = self._layers.get(key)
+        if layer is not None:
+            self._layers.move_to_end(key)
+            return layer
+
+        layer = pygame.Surface(self.surface.get_size()).convert()
+        layer.fill(WHITE)
+        enter_background(scene.setting, layer)
+        enter_avatars(scene.speakers, layer)
+        self._layers[key] = layer
+        if len(self._layers) > self._max_layers:
+            self._layers.popitem(last=False)
+        return layer
+
+    def invalidate(self) -> None:
+        """Forces a full redraw on the next frame (ie. after the window was exposed)."""
+        self._shown_key = None
+
+    def show_title(self) -> None:
+        if self._shown_key != "title":
+            self.surface.fill(WHITE)
+            show_title_screen(self.surface)
+            self._full_redraw("title")
+
+    def show_dialogue(self, scene: Scene, text: str) -> None:
+        """Draws a scene with a line of dialogue, redrawing only the dialogue box if the scene is already shown."""
+        self._prepare_scene(scene)
+        self._box_rect = draw_dialogue_box(self.surface, text)
+        self._dirty.append(self._box_rect)
+
+    def show_options(self, scene: Scene, prompt: str, options: list[str], selected_option: int) -> None:
+        """Draws a scene with its choices, redrawing only the dialogue box if the scene is already shown."""
+        self._prepare_scene(scene)
+        self._box_rect = draw_dialogue_box_with_options(self.surface, prompt, options, selected_option)
+        self._dirty.append(self._box_rect)
+
+    def add_dirty(self, rect: pygame.Rect) -> None:
+        """Marks an area drawn outside the renderer (ie. the profiling overlay) to be pushed by the next present()."""
+        self._dirty.append(rect)
+
+    def present(self) -> None:
+        """Pushes the changed areas to the display."""
+        if self._dirty:
+            with profiler.span("pygame.display.update"):
+                pygame.display.update(self._dirty)
+            self._dirty = []
+
+    def _full_redraw(self, key) -> None:
+        self._shown_key = key
+        self._box_rect = None
+        self._dirty = [self.surface.get_rect()]
+
+    def _prepare_scene(self, scene: Scene) -> None:
+        key = (scene.setting, tuple(scene.speakers))
+        layer = self.scene_layer(scene)
+        if key != self._shown_key:
+            self.surface.blit(layer, (0, 0))
+            self._full_redraw(key)
+        elif self._box_rect is not None:
+            # Restore what was under the previous dialogue box
+            self.surface.blit(layer, self._box_rect, self._box_rect)
+            self._dirty.append(self._box_rect)
+
+def draw_profile_overlay(surface, summary: dict, max_spans: int = 8):
+    """
+    Draws the frame time and the per-frame cost of the slowest spans in the top-left corner, and returns the area it covers.
+
+    Args:
+        surface (pygame.Surface): The surface to draw on.
+        summary (dict): A profiler summary (see Profiler.summary).
+        max_spans (int, optional): Number of spans listed (defaults to 8).
+    """
+    font = fonts.get(None, 18)
+    lines = [f"frame {summary['frame_ms']:6.2f} ms  ({summary['frames']} frames)"]
+    for name, (calls, ms) in list(summary["spans"].items())[:max_spans]:
+        lines.append(f"{ms:6.2f} ms  x{calls:<4.1f} {name}")
+
+    line_height = font.get_linesize()
+    # A fixed-size opaque panel, so each frame fully covers the previous overlay
+    rect = pygame.Rect(0, 0, 320, line_height * (max_spans + 1) + 8)
+    pygame.draw.rect(surface, BLACK, rect)
+    for number, line in enumerate(lines):
+        surface.blit(font.render(line, True, WHITE), (4, 4 + number * line_height))
+    return rect
 
 
 if __name__ == "__main__":
@@ -256,11 +294,22 @@ if __name__ == "__main__":
         This code runs when this specific file is run
     '''
 
-    #Initialization
-    pygame.init()
+    parser = argparse.ArgumentParser(description="Play Mood Mystery.")
+    parser.add_argument("--profile", action="store_true", help="time the hot paths and show them in an overlay")
+    parser.add_argument("--trace", default=None, help="write the recorded spans to this Chrome trace file on exit")
+    args = parser.parse_args()
+    profiler.enabled = args.profile or args.trace is not None
+
+    #Initialization: only the SDL subsystems the game uses, not pygame.init() (audio, joystick, ...)
+    pygame.display.init()
+    pygame.font.init()
     screen = pygame.display.set_mode((screen_width, screen_height))
     pygame.display.set_caption('Mood Mystery')
     game = Game()
+    # Decodes the images of the scenes the player can reach next while they read the current one
+    prefetcher = AssetPrefetcher(asset_cache)
+    ensure_scene_images(prefetcher, game.current_scene)
+    prefetcher.prefetch_next(game.story, game.current_scene)
 
     #title screen check
     title_screen_check = 0
@@ -274,44 +323,55 @@ if __name__ == "__main__":
 
     #Variable scene content
     curr_scene, curr_dialogues, curr_interactive = update_scene()
-    print("1")
-    print(curr_scene)
     #Counters
     dialogue_progress_counter = 0
 
     #Selected integer answer
     selected_answer = 1
 
+    # Retained render layer; only redraws what changed since the last frame
+    renderer = SceneRenderer(screen)
+    driver = LoopDriver(fps=FPS_CAP)
+    needs_redraw = True
+
     # Main game loop
     running = True
     while running:
-        # Fill the screen with a color to clear it
-        screen.fill(WHITE)  # Change the RGB values if you want a different background color
-
-        if title_screen_check == 0:
-            show_title_screen()
-            pygame.display.flip()
-        elif display_screen_check == 1:
-            display = MyersBriggsDisplay(game)
-            display.run()
-        else:
-            enter_background(curr_scene.setting)
-            enter_avatars(curr_scene.speakers)
-            #if there is still dialogue remaining
-            if dialogue_progress_counter <= len(curr_dialogues) -1:
-                draw_dialogue_box(screen, curr_dialogues[dialogue_progress_counter].text)
+        if needs_redraw:
+            if title_screen_check == 0:
+                with profiler.frame():
+                    renderer.show_title()
+                    renderer.present()
+            elif display_screen_check == 1:
+                display = MyersBriggsDisplay(game, driver)
+                display.run()
             else:
-                choices_list = curr_interactive.choices
-                text_list = [choices_list[x].response for x in range(len(choices_list))]
-                draw_dialogue_box_with_options(screen, curr_interactive.prompt, text_list,selected_answer)
-            # Update the display
-            pygame.display.flip()
-
-        for event in pygame.event.get():
+                with profiler.frame():
+                    #if there is still dialogue remaining
+                    if dialogue_progress_counter <= len(curr_dialogues) -1:
+                        renderer.show_dialogue(curr_scene, curr_dialogues[dialogue_progress_counter].text_for(game.name))
+                    else:
+                        choices_list = curr_interactive.choices
+                        text_list = [choices_list[x].response_for(game.name) for x in range(len(choices_list))]
+                        renderer.show_options(curr_scene, curr_interactive.prompt_for(game.name), text_list, selected_answer)
+                    if args.profile:
+                        renderer.add_dirty(draw_profile_overlay(screen, profiler.summary()))
+                    # Update the changed areas of the display
+                    renderer.present()
+            needs_redraw = False
+
+        # Blocks until the next event while nothing is animating
+        with profiler.span(IDLE_SPAN):
+            events = driver.events()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+                needs_redraw = True
             # Check for KEYDOWN event; KEYUP is when the key is released
             elif event.type == pygame.KEYDOWN:
+                needs_redraw = True
                 #change selected number
                 if event.key == pygame.K_1 and len(curr_interactive.choices) >= 1:
                     selected_answer = 1
@@ -324,7 +384,7 @@ if __name__ == "__main__":
                 if event.key == pygame.K_RETURN:
                     if title_screen_check == 0:
                         title_screen_check += 1
-                    elif curr_scene.scene_id == 19 or curr_scene.scene_id == 20:
+                    elif curr_scene.scene_id in ENDING_SCENE_IDS:
                         display_screen_check = 1
                     elif dialogue_progress_counter <= len(curr_dialogues) - 1:
                         dialogue_progress_counter += 1
@@ -333,8 +393,13 @@ if __name__ == "__main__":
                         game.process_scene(selected_answer)
                         #update scene stuff
                         curr_scene, curr_dialogues, curr_interactive = update_scene()
+                        ensure_scene_images(prefetcher, curr_scene)
+                        prefetcher.prefetch_next(game.story, curr_scene)
                         selected_answer = 1
                         dialogue_progress_counter = 0
 
     # Quit Pygame
+    if args.trace is not None:
+        profiler.export_chrome_trace(args.trace)
+    prefetcher.shutdown()
     pygame.quit()
@@ -0,0 +1,227 @@
+"""
+Hot-path instrumentation: named timing spans recorded into a fixed-size ring buffer.
+
+Instrumentation is off by default. A function wrapped with profiler.timed then costs one flag check per call, and
+profiler.span returns a shared do-nothing context manager. Once enabled, each span stores its name ID, start and
+duration in preallocated arrays, overwriting the oldest spans when the buffer is full.
+
+profiler.frame() times the drawing of one frame, so time spent waiting for input between frames is not counted as
+frame time; summary() aggregates the spans of the last frames for the on-screen overlay, and export_chrome_trace()
+writes the buffer as a Chrome trace (open it in chrome://tracing or Perfetto).
+
+Does not import pygame, so the game logic can be instrumented too.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from array import array
+
+FRAME_SPAN = "frame"
+# Time spent blocked on the event queue between frames
+IDLE_SPAN = "idle"
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_profiler", "_name_id", "_start")
+
+    def __init__(self, profiler: "Profiler", name_id: int):
+        self._profiler = profiler
+        self._name_id = name_id
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name_id, self._start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """
+    Ring buffer of timing spans.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        """
+        Constructor for the profiler
+
+        Args:
+            capacity (int, optional): Number of spans kept before the oldest are overwritten (defaults to 65,536).
+        """
+        self.enabled = False
+        self._capacity = capacity
+        self._name_of: list[str] = []
+        self._id_of: dict[str, int] = {}
+        self._names = array("H", [0]) * capacity
+        self._starts = array("q", [0]) * capacity
+        self._durations = array("q", [0]) * capacity
+        # Total spans ever recorded; the next one goes to slot _recorded % capacity
+        self._recorded = 0
+        self._epoch = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._frame_id = self.name_id(FRAME_SPAN)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return min(self._recorded, self._capacity)
+
+    def name_id(self, name: str) -> int:
+        """Returns the ID of a span name, registering it on first use."""
+        name_id = self._id_of.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._id_of.get(name)
+                if name_id is None:
+                    self._name_of.append(name)
+                    name_id = self._id_of[name] = len(self._name_of) - 1
+        return name_id
+
+    def record(self, name_id: int, start_ns: int, end_ns: int) -> None:
+        """Stores one finished span. Safe to call from any thread, ie. the asset prefetch workers."""
+        # Claiming the slot and filling it happen together, so spans from two threads never share a slot
+        with self._lock:
+            slot = self._recorded % self._capacity
+            self._names[slot] = name_id
+            self._starts[slot] = start_ns
+            self._durations[slot] = end_ns - start_ns
+            self._recorded += 1
+
+    def span(self, name: str):
+        """
+        Returns a context manager timing its block as the named span; it does nothing while the profiler is disabled.
+
+        Args:
+            name (str): The span name.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self.name_id(name))
+
+    def timed(self, name: str):
+        """
+        Decorator timing every call of a function as the named span.
+
+        Args:
+            name (str): The span name.
+        """
+        name_id = self.name_id(name)
+
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name_id, start, time.perf_counter_ns())
+
+            return wrapper
+
+        return decorate
+
+    def frame(self):
+        """
+        Returns a context manager timing its block as one frame, from the start of drawing to the end of the display
+        update; it does nothing while the profiler is disabled.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._frame_id)
+
+    def spans(self):
+        """Yields (name, start_ns, duration_ns) for every span in the buffer, oldest first."""
+        first = max(0, self._recorded - self._capacity)
+        for position in range(first, self._recorded):
+            slot = position % self._capacity
+            yield self._name_of[self._names[slot]], self._starts[slot], self._durations[slot]
+
+    def summary(self, frames: int = 30) -> dict:
+        """
+        Aggregates the spans of the last frames.
+
+        Args:
+            frames (int, optional): Number of frames to average over (defaults to 30).
+
+        Returns:
+            dict: 'frame_ms' (average frame time), 'frames', and 'spans' mapping each span name to its
+                (calls per frame, milliseconds per frame).
+        """
+        oldest = max(0, self._recorded - self._capacity)
+        names, starts, durations, capacity = self._names, self._starts, self._durations, self._capacity
+
+        # Newest first. A frame span is recorded after the spans it contains, so a span is counted toward the frame
+        # span last seen when it started inside it; spans between frames (ie. idle waits) and spans recorded after
+        # the newest frame are skipped
+        totals: dict[int, list] = {}
+        frame_ns = 0
+        seen_frames = 0
+        frame_start = 0
+        for position in range(self._recorded - 1, oldest - 1, -1):
+            slot = position % capacity
+            name_id = names[slot]
+            if name_id == self._frame_id:
+                if seen_frames == frames:
+                    break
+                seen_frames += 1
+                frame_ns += durations[slot]
+                frame_start = starts[slot]
+            elif seen_frames and starts[slot] >= frame_start:
+                entry = totals.setdefault(name_id, [0, 0])
+                entry[0] += 1
+                entry[1] += durations[slot]
+
+        divisor = max(seen_frames, 1)
+        return {
+            "frames": seen_frames,
+            "frame_ms": frame_ns / divisor / 1e6,
+            "spans": {
+                self._name_of[name_id]: (calls / divisor, total_ns / divisor / 1e6)
+                for name_id, (calls, total_ns) in sorted(totals.items(), key=lambda item: -item[1][1])
+            },
+        }
+
+    def export_chrome_trace(self, path: str) -> int:
+        """
+        Writes the buffer as a Chrome trace file of complete ('X') events.
+
+        Returns:
+            int: Number of events written.
+        """
+        pid = os.getpid()
+        events = [
+            {"name": name, "ph": "X", "ts": (start - self._epoch) / 1000, "dur": duration / 1000, "pid": pid, "tid": 0}
+            for name, start, duration in self.spans()
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return len(events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recorded = 0
+
+
+# Shared by every instrumented module in the process
+profiler = Profiler()
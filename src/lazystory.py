@@ -0,0 +1,223 @@
+"""
+Lazy loading of large JSON stories.
+
+The first open scans the file once for the byte span, scene ID and choice references of every scene, without decoding
+any of them, and saves that offset index next to the story as a sidecar file. Later opens read the sidecar instead, as
+long as the story's size and mtime still match it. A Scene is only decoded when it is indexed (ie. when Game.current_scene moves to
+it or the prefetcher looks ahead to it), and only a bounded number of decoded scenes are kept.
+
+Sidecar layout: an INDEX_HEADER (magic, version, source mtime, source size, scene count, reference count), then the
+scene IDs as i32, the offsets as i64, the lengths as u32, the start of each scene's references as i32 (one more entry
+than scenes) and the references as i32, each as one array.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+from scene import Scene, scene_from_json
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"MBSX"
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct("<4sHxxqQII")
+
+# Skips to the next string (matched whole, so brackets inside text do not count), opening bracket or closing bracket;
+# lastindex tells which of the three it is
+_TOKEN = re.compile(rb'[^"\[\]{}]*(?:("[^"\\]*(?:\\.[^"\\]*)*")|([\[{])|[\]}])', re.DOTALL)
+_STRING, _OPEN = 1, 2
+_SCENE_ID_KEY = b'"scene_id"'
+_REFERENCE_KEY = b'"sceneReference"'
+_SCENE_ID_VALUE = re.compile(rb"\s*:\s*(-?\d+)")
+# Depth of the keys of a scene object, and of a choice object in interactive.choices
+_SCENE_DEPTH = 2
+_CHOICE_DEPTH = 5
+
+
+def scan_scene_offsets(buffer) -> tuple[array, array, array, array, array]:
+    """
+    Finds every scene of a scene.json array without decoding the scenes.
+
+    Args:
+        buffer (bytes | mmap.mmap): The story file contents.
+
+    Returns:
+        tuple[array, array, array, array, array]: The scene ID, byte offset and byte length of every scene, in story
+            order; then reference_start and references, where the sceneReference of each choice of slot s is in
+            references[reference_start[s]:reference_start[s + 1]].
+
+    Raises:
+        ValueError: If the file is not an array of scene objects with integer scene IDs.
+    """
+    scene_ids = array("i")
+    offsets = array("q")
+    lengths = array("I")
+    reference_start = array("i", [0])
+    references = array("i")
+
+    depth = 0
+    start = 0
+    scene_id = None
+    for token in _TOKEN.finditer(buffer):
+        kind = token.lastindex
+        if kind == _STRING:
+            # Only the scene_id key directly inside a scene object, and sceneReference inside a choice, matter
+            if depth == _SCENE_DEPTH and token.group(_STRING) == _SCENE_ID_KEY:
+                value = _SCENE_ID_VALUE.match(buffer, token.end())
+                if value is not None:
+                    scene_id = int(value.group(1))
+            elif depth == _CHOICE_DEPTH and token.group(_STRING) == _REFERENCE_KEY:
+                value = _SCENE_ID_VALUE.match(buffer, token.end())
+                if value is not None:
+                    references.append(int(value.group(1)))
+        elif kind == _OPEN:
+            if depth == 1:
+                if token.group(_OPEN) != b"{":
+                    raise ValueError(f"story entry {len(offsets)} is not a scene object")
+                start = token.start(_OPEN)
+                scene_id = None
+            elif depth == 0 and token.group(_OPEN) != b"[":
+                raise ValueError("a story must be a JSON array of scenes")
+            depth += 1
+        elif kind is None:
+            depth -= 1
+            if depth == 1:
+                if scene_id is None:
+                    raise ValueError(f"scene at byte {start} has no integer scene_id")
+                scene_ids.append(scene_id)
+                offsets.append(start)
+                lengths.append(token.end() - start)
+                reference_start.append(len(references))
+    return scene_ids, offsets, lengths, reference_start, references
+
+
+def _read_index(index_path: str, stat: os.stat_result):
+    try:
+        with open(index_path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) < INDEX_HEADER.size:
+        return None
+    magic, version, mtime_ns, size, count, reference_count = INDEX_HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+        return None
+
+    columns = (array("i"), array("q"), array("I"), array("i"), array("i"))
+    offset = INDEX_HEADER.size
+    for column, length in zip(columns, (count, count, count, count + 1, reference_count)):
+        end = offset + length * column.itemsize
+        if end > len(data):
+            return None
+        column.frombytes(data[offset:end])
+        offset = end
+    return columns
+
+
+def _write_index(index_path: str, stat: os.stat_result, columns) -> None:
+    header = INDEX_HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, stat.st_mtime_ns, stat.st_size, len(columns[0]), len(columns[4])
+    )
+    try:
+        with open(index_path + ".tmp", "wb") as file:
+            file.write(header)
+            for column in columns:
+                column.tofile(file)
+        os.replace(index_path + ".tmp", index_path)
+    except OSError:
+        # The sidecar only saves the scan next time; a read-only story directory still loads
+        pass
+
+
+class LazyJsonStory:
+    """
+    Read-only, list-like view of a JSON story that decodes scenes on demand.
+
+    The file is memory-mapped; decoded scenes are kept in least-recently-used order, at most cache_size of them.
+    """
+
+    def __init__(self, path: str, cache_size: int = 256, index_path: str = None):
+        """
+        Opens a JSON story, reading or building its offset index.
+
+        Args:
+            path (str): Path to the JSON story.
+            cache_size (int, optional): Number of decoded scenes kept (defaults to 256).
+            index_path (str, optional): Sidecar index file (defaults to path + '.idx').
+
+        Raises:
+            ValueError: If the file is not an array of scene objects with integer scene IDs.
+        """
+        self._path = path
+        self._cache_size = cache_size
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+        index_path = path + INDEX_SUFFIX if index_path is None else index_path
+        columns = _read_index(index_path, stat)
+        if columns is None:
+            columns = scan_scene_offsets(self._buffer)
+            _write_index(index_path, stat, columns)
+        self._scene_ids, self._offsets, self._lengths, self._reference_start, self._references = columns
+
+        self._scenes: OrderedDict[int, Scene] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._scene_ids)
+
+    def __getitem__(self, index: int) -> Scene:
+        if index < 0:
+            index += len(self._scene_ids)
+        if not 0 <= index < len(self._scene_ids):
+            raise IndexError("scene index out of range")
+        with self._lock:
+            scene = self._scenes.get(index)
+            if scene is not None:
+                self._scenes.move_to_end(index)
+                self.hits += 1
+                return scene
+        # Decoded outside the lock; two threads racing on one scene both build it and one copy is kept
+        scene = self._read_scene(index)
+        with self._lock:
+            self.misses += 1
+            self._scenes[index] = scene
+            while len(self._scenes) > self._cache_size:
+                self._scenes.popitem(last=False)
+        return scene
+
+    def __iter__(self):
+        for index in range(len(self._scene_ids)):
+            yield self[index]
+
+    def __bool__(self) -> bool:
+        return len(self._scene_ids) > 0
+
+    def scene_id_at(self, index: int) -> int:
+        """Returns the scene ID stored at a position without decoding the Scene."""
+        return self._scene_ids[index]
+
+    def references_at(self, index: int) -> array:
+        """Returns the scene references of the choices at a position, in order, without decoding the Scene."""
+        return self._references[self._reference_start[index]:self._reference_start[index + 1]]
+
+    @property
+    def cached_scenes(self) -> int:
+        return len(self._scenes)
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def _read_scene(self, index: int) -> Scene:
+        start = self._offsets[index]
+        scene_data = json.loads(self._buffer[start:start + self._lengths[index]])
+        return scene_from_json(scene_data, array("b"))
@@ -0,0 +1,127 @@
+"""
+Load generator for the game server: plays many sessions to an ending with random choices and reports latency and
+throughput.
+
+Run from the repository root:
+    python src/loadclient.py --local --sessions 2000 --connections 50
+or against a running server:
+    python src/loadclient.py --port 7878 --sessions 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT, GameServer, percentile
+from story import STORY_PATH
+
+
+class Connection:
+    """
+    One client connection that sends a request and waits for its response line.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "Connection":
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def request(self, latencies: dict, **request) -> dict:
+        """Sends a request and returns the response, recording the round trip in latencies[op]."""
+        started = time.perf_counter()
+        self._writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        response = json.loads(await self._reader.readline())
+        latencies.setdefault(request["op"], []).append((time.perf_counter() - started) * 1e6)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def play_session(connection: Connection, latencies: dict, rng: random.Random) -> str:
+    """Plays one session from start to an ending and returns the final type."""
+    session = (await connection.request(latencies, op="start", name="Load"))["session"]
+    ending = False
+    while not ending:
+        while "prompt" not in (response := await connection.request(latencies, op="advance", session=session)):
+            pass
+        choice = rng.randint(1, len(response["choices"]))
+        ending = (await connection.request(latencies, op="choose", session=session, choice=choice))["ending"]
+    result = await connection.request(latencies, op="result", session=session)
+    await connection.request(latencies, op="end", session=session)
+    return result["type"]
+
+
+async def run_load(host: str, port: int, sessions: int, connections: int, seed: int) -> dict:
+    """
+    Plays sessions over several connections in parallel.
+
+    Returns:
+        dict: Sessions per second, client round-trip percentiles per op and the server's own stats.
+    """
+    latencies: dict[str, list[float]] = {}
+    remaining = iter(range(sessions))
+
+    async def worker(index: int) -> None:
+        rng = random.Random(seed + index)
+        connection = await Connection.open(host, port)
+        try:
+            for _ in remaining:
+                await play_session(connection, latencies, rng)
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    connection = await Connection.open(host, port)
+    server_stats = await connection.request({}, op="stats")
+    await connection.close()
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "sessions_per_s": sessions / elapsed,
+        "round_trip_us": {
+            op: {"p50": percentile(samples, 0.50), "p99": percentile(samples, 0.99), "count": len(samples)}
+            for op, samples in latencies.items()
+        },
+        "server": server_stats,
+    }
+
+
+async def run_local(sessions: int, connections: int, seed: int, story_path: str) -> dict:
+    """Starts a server in this process on a free port and runs the load against it."""
+    game_server = GameServer(story_path)
+    server = await asyncio.start_server(game_server.serve_client, DEFAULT_HOST, 0, limit=1 << 20)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await run_load(DEFAULT_HOST, port, sessions, connections, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate load against the Mood Mystery game server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local", action="store_true", help="start a server in this process instead of connecting to one")
+    parser.add_argument("--story", default=STORY_PATH, help="story for the --local server")
+    args = parser.parse_args()
+
+    if args.local:
+        report = asyncio.run(run_local(args.sessions, args.connections, args.seed, args.story))
+    else:
+        report = asyncio.run(run_load(args.host, args.port, args.sessions, args.connections, args.seed))
+    print(json.dumps(report, indent=4))
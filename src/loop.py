@@ -0,0 +1,95 @@
+import pygame
+
+
+class LoopDriver:
+    """
+    Paces a pygame loop: caps the frame rate while an animation is running, blocks on the event queue while
+    the screen is idle, and steps the running animations on a fixed timestep.
+    """
+
+    def __init__(
+        self,
+        fps: int = 30,
+        idle_timeout_ms: int = 1000,
+        update_step_ms: float = 1000 / 60,
+        max_updates_per_frame: int = 5,
+    ):
+        """
+        Constructor for the loop driver
+
+        Args:
+            fps (int, optional): Frame rate cap while animating (defaults to 30).
+            idle_timeout_ms (int, optional): Longest time to block on the event queue while idle (defaults to 1000).
+            update_step_ms (float, optional): Length of one fixed update step in milliseconds (defaults to 60 steps a second).
+            max_updates_per_frame (int, optional): Cap on catch-up steps after a slow frame, so the loop cannot spiral (defaults to 5).
+        """
+        self._fps = fps
+        self._idle_timeout_ms = idle_timeout_ms
+        self._update_step_ms = update_step_ms
+        self._max_updates_per_frame = max_updates_per_frame
+        self._clock = pygame.time.Clock()
+        self._accumulator_ms = 0.0
+        self._updates = []
+
+    @property
+    def fps(self) -> int:
+        return self._fps
+
+    @fps.setter
+    def fps(self, value: int):
+        self._fps = value
+
+    @property
+    def animating(self) -> bool:
+        """Whether an animation is running, which switches the loop from blocking to the FPS cap."""
+        return bool(self._updates)
+
+    @property
+    def frame_time_ms(self) -> int:
+        """Time taken by the last frame, including the time spent waiting."""
+        return self._clock.get_time()
+
+    def add_update(self, update) -> None:
+        """
+        Starts an animation, stepped on the fixed timestep until it reports that it has finished.
+
+        Args:
+            update (Callable[[float], bool]): Called with the step length in milliseconds, once per elapsed step.
+                Returns True while the animation is still running.
+        """
+        if not self._updates:
+            # Start timing from now, not from the last (possibly long) idle wait
+            self._clock.tick()
+            self._accumulator_ms = 0.0
+        self._updates.append(update)
+
+    def events(self) -> list[pygame.event.Event]:
+        """
+        Waits for the next frame and returns its events.
+
+        While an animation is running this sleeps to the FPS cap, polls the queue and steps the animations.
+        Otherwise it blocks until an event arrives or the idle timeout passes, so a static screen costs no CPU.
+
+        Returns:
+            list[pygame.event.Event]: The events of this frame (possibly empty after an idle timeout).
+        """
+        if self.animating:
+            self._clock.tick(self._fps)
+            events = pygame.event.get()
+            self._run_updates(self._clock.get_time())
+        else:
+            first = pygame.event.wait(self._idle_timeout_ms)
+            events = ([first] if first.type != pygame.NOEVENT else []) + pygame.event.get()
+            self._clock.tick()
+        return events
+
+    def _run_updates(self, elapsed_ms: float) -> None:
+        self._accumulator_ms += elapsed_ms
+        steps = 0
+        while self._updates and self._accumulator_ms >= self._update_step_ms and steps < self._max_updates_per_frame:
+            self._updates = [update for update in self._updates if update(self._update_step_ms)]
+            self._accumulator_ms -= self._update_step_ms
+            steps += 1
+        if steps == self._max_updates_per_frame or not self._updates:
+            # Behind by more than the cap, or idle from now on: there is no time left to catch up on
+            self._accumulator_ms = 0.0
@@ -0,0 +1,146 @@
+"""
+Enumerates every playthrough of a story and reports the reachable endings, final scores and Myers-Briggs types.
+
+Paths are counted with dynamic programming memoized on (scene, score vector): two paths that reach the same scene
+with the same clamped scores share all their continuations, so each such state is expanded once.
+
+Run from the repository root: python src/paths.py [story_path]
+"""
+
+import sys
+from collections import Counter
+
+from engine import MBTI_TYPES, StoryTable, apply_effect, mbti_type
+from story import ENDING_SCENE_IDS, STORY_PATH, Story, load_story
+
+
+class PathReport:
+    """
+    Result of enumerating every path of a story.
+
+    Args:
+        outcomes (Counter[tuple[int, tuple[int, int, int, int]]]): Path counts per (ending scene ID, final scores).
+        states (int): Number of distinct (scene, scores) states expanded.
+    """
+
+    def __init__(self, outcomes: Counter, states: int):
+        self.outcomes = outcomes
+        self.states = states
+
+    @property
+    def total_paths(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def endings(self) -> Counter:
+        """Path counts per ending scene ID."""
+        counts = Counter()
+        for (ending, _), count in self.outcomes.items():
+            counts[ending] += count
+        return counts
+
+    @property
+    def scores(self) -> Counter:
+        """Path counts per final [ie, sn, ft, pj] score."""
+        counts = Counter()
+        for (_, scores), count in self.outcomes.items():
+            counts[scores] += count
+        return counts
+
+    @property
+    def types(self) -> dict[str, int]:
+        """Path counts for each of the 16 types, including the unreachable ones at 0."""
+        counts = dict.fromkeys(MBTI_TYPES, 0)
+        for (_, scores), count in self.outcomes.items():
+            counts[mbti_type(scores)] += count
+        return counts
+
+    def __str__(self):
+        lines = [f"paths: {self.total_paths}  states expanded: {self.states}", "endings:"]
+        lines += [f"  scene {ending}: {count}" for ending, count in sorted(self.endings.items())]
+        lines.append("types:")
+        lines += [
+            f"  {mbti}: {count}" if count else f"  {mbti}: unreachable" for mbti, count in self.types.items()
+        ]
+        return "\n".join(lines)
+
+
+def enumerate_paths(story: Story, start_scene_id: int = None, start_scores=(0, 0, 0, 0), ending_scene_ids=ENDING_SCENE_IDS) -> PathReport:
+    """
+    Counts every path from a start scene to an ending, grouped by ending and final scores.
+
+    A path stops at an ending scene, or at a scene without choices. The graph left after cutting at the endings must be
+    acyclic, since a cycle would allow infinitely many paths.
+
+    Args:
+        story (Story): The story to enumerate.
+        start_scene_id (int, optional): Scene to start in (defaults to the first scene of the story).
+        start_scores (Sequence[int], optional): Starting [ie, sn, ft, pj] scores (defaults to all 0).
+        ending_scene_ids (Iterable[int], optional): Scenes that end the game (defaults to ENDING_SCENE_IDS).
+
+    Raises:
+        ValueError: If a path runs into a cycle or a choice leads to a scene the story does not have.
+    """
+    table = StoryTable(story)
+    scene_ids = table.scene_ids
+    choice_start = table.choice_start
+    effects = table.effects
+    targets = table.targets
+    known_ids = set(scene_ids)
+    endings = {table.slot_of(scene_id) for scene_id in ending_scene_ids if scene_id in known_ids}
+
+    start_slot = 0 if start_scene_id is None else table.slot_of(start_scene_id)
+    start = (start_slot, tuple(start_scores))
+
+    # memo[state] is a Counter of (ending scene ID, final scores) -> number of paths from state
+    memo: dict[tuple, Counter] = {}
+    on_stack: set[tuple] = set()
+    # Iterative post-order walk so long stories do not hit the recursion limit
+    stack = [(start, False)]
+    while stack:
+        state, expanded = stack.pop()
+        slot, scores = state
+        if expanded:
+            on_stack.discard(state)
+            outcomes = Counter()
+            for child in _children(slot, scores, choice_start, effects, targets):
+                outcomes.update(memo[child])
+            memo[state] = outcomes
+            continue
+        if state in memo:
+            continue
+
+        first, last = choice_start[slot], choice_start[slot + 1]
+        if slot in endings or first == last:
+            memo[state] = Counter({(scene_ids[slot], scores): 1})
+            continue
+
+        for choice in range(first, last):
+            if targets[choice] < 0:
+                raise ValueError(f"scene {scene_ids[slot]} choice {choice - first + 1} leads to a missing scene")
+
+        on_stack.add(state)
+        stack.append((state, True))
+        for child in _children(slot, scores, choice_start, effects, targets):
+            if child in on_stack:
+                raise ValueError(f"scene {scene_ids[slot]} leads back to scene {scene_ids[child[0]]} in a cycle")
+            if child not in memo:
+                stack.append((child, False))
+
+    return PathReport(memo[start], len(memo))
+
+
+def _children(slot, scores, choice_start, effects, targets):
+    ie, sn, ft, pj = scores
+    for choice in range(choice_start[slot], choice_start[slot + 1]):
+        e_ie, e_sn, e_ft, e_pj = effects[choice]
+        yield targets[choice], (
+            apply_effect(ie, e_ie),
+            apply_effect(sn, e_sn),
+            apply_effect(ft, e_ft),
+            apply_effect(pj, e_pj),
+        )
+
+
+if __name__ == "__main__":
+    print(enumerate_paths(load_story(sys.argv[1] if len(sys.argv) > 1 else STORY_PATH)))
@@ -1,3 +1,6 @@
+import sys
+from array import array
+
 from text import Dialogue
 from text import Interactive
 
@@ -7,6 +10,8 @@ class Scene:
     Class to represent a scene, including both dialogues and an interactive section.
     """
 
+    __slots__ = ("_scene_id", "_speakers", "_setting", "_dialogues", "_interactive")
+
     def __init__(
         self,
         scene_id: int,
@@ -24,52 +29,83 @@ class Scene:
             interactive (Interactive): An Interactive object representing the scene's choice-based interactive segment.
         """
         self._scene_id = scene_id
-        self._speakers = speakers
-        self._setting = setting
-        self._dialogues = dialogues
+        # Interned so every scene naming the same speaker or image shares one string
+        self._speakers = tuple(sys.intern(speaker) for speaker in speakers)
+        self._setting = sys.intern(setting)
+        self._dialogues = tuple(dialogues)
         self._interactive = interactive
 
     @property
     def scene_id(self) -> int:
         return self._scene_id
 
-    @scene_id.setter
-    def scene_id(self, value: int):
-        self._scene_id = value
-
     @property
-    def speakers(self) -> list[str]:
+    def speakers(self) -> tuple[str, ...]:
         return self._speakers
 
-    @speakers.setter
-    def speakers(self, value: list[str]):
-        self._speakers = value
-
     @property
     def setting(self) -> str:
         return self._setting
 
-    @setting.setter
-    def setting(self, value: str):
-        self._setting = value
-
     @property
-    def dialogues(self) -> list[Dialogue]:
+    def dialogues(self) -> tuple[Dialogue, ...]:
         return self._dialogues
 
-    @dialogues.setter
-    def dialogues(self, value: list[Dialogue]):
-        self._dialogues = value
-
     @property
     def interactive(self) -> Interactive:
         return self._interactive
 
-    @interactive.setter
-    def interactive(self, value: Interactive):
-        self._interactive = value
-        
     def __str__(self):
             dialogues_str = ", ".join([str(dialogue) for dialogue in self._dialogues])
             interactive_str = str(self._interactive)
-            return f"Scene ID: {self._scene_id}\nSpeakers: {', '.join(self._speakers)}\nSetting: {self._setting}\nDialogues: {dialogues_str}\nInteractive: {interactive_str}"
\ No newline at end of file
+            return f"Scene ID: {self._scene_id}\nSpeakers: {', '.join(self._speakers)}\nSetting: {self._setting}\nDialogues: {dialogues_str}\nInteractive: {interactive_str}"
+
+
+def scene_from_json(scene_data: dict, effects: array) -> Scene:
+    """
+    Builds one Scene from its scene.json entry.
+
+    Args:
+        scene_data (dict): The decoded scene entry.
+        effects (array): int8 block the choice effects are appended to, shared by the scenes built together.
+
+    Raises:
+        ValueError: If a choice's effect is not four integers in [-128, 127].
+    """
+    # Construct Dialogue objects for each dialogue entry in the scene
+    dialogues = []
+    for dialogue in scene_data["dialogues"]:
+        speaker = dialogue["speaker"]
+        text = dialogue["text"]
+
+        dialogues.append(Dialogue(speaker, text))
+
+    # Construct Interactive.Choice objects for each choice in the interactive entry
+    choices = []
+
+    for number, choice in enumerate(scene_data["interactive"]["choices"], 1):
+        response = choice["response"]
+        scene_reference = choice["sceneReference"]
+
+        # Every choice takes exactly four slots of the shared block, or the offsets of all later choices would shift
+        effect = choice["effect"]
+        if len(effect) != 4 or not all(isinstance(x, int) and -128 <= x <= 127 for x in effect):
+            raise ValueError(
+                f"scene {scene_data['scene_id']} choice {number}: effect must be four integers in [-128, 127]"
+            )
+        offset = len(effects)
+        effects.extend(effect)
+        choices.append(Interactive.Choice(response, effects, scene_reference, offset))
+
+    # Construct the Interactive object (uses choices)
+    interactive_speaker = scene_data["interactive"]["speaker"]
+    interactive_prompt = scene_data["interactive"]["prompt"]
+
+    interactive = Interactive(interactive_speaker, interactive_prompt, choices)
+
+    # Initialize the Scene object
+    scene_id = scene_data["scene_id"]
+    scene_speakers = scene_data["speakers"].split(",")
+    scene_setting = scene_data["setting"]
+
+    return Scene(scene_id, scene_speakers, scene_setting, dialogues, interactive)
@@ -0,0 +1,436 @@
+"""
+Compiled binary scene graph format.
+
+Layout (all integers little-endian):
+
+    header      magic "MBSG", version, scene/dialogue/choice/string counts, table offsets
+    strings     (string_count + 1) u32 offsets into a UTF-8 blob, then the blob
+    scenes      fixed-width SCENE_RECORD per scene, in story order
+    dialogues   fixed-width DIALOGUE_RECORD, grouped by scene
+    choices     fixed-width CHOICE_RECORD, grouped by scene
+    scene IDs   the scene IDs as i32 in ascending order, then the slot (position in the story) of each as i32
+
+Strings are deduplicated, so repeated speakers and settings are stored once. The loader maps the file and only
+decodes the records of a scene when that scene is first accessed; scene IDs are looked up by binary search over the
+scene ID table, so opening a story reads nothing but the header.
+"""
+
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+from scene import Scene
+from text import Dialogue, Interactive
+
+MAGIC = b"MBSG"
+VERSION = 2
+# Version 1 files have no scene ID table; one is built in memory on the first lookup
+READ_VERSIONS = (1, 2)
+
+# magic, version, scene/dialogue/choice/string counts, string/scene/dialogue/choice/scene ID table offsets
+HEADER = struct.Struct("<4sHxxIIIIIIIII")
+# The version 1 header, without the scene ID table offset
+HEADER_V1 = struct.Struct("<4sHxxIIIIIIII")
+# scene_id, speakers, setting, interactive speaker, prompt, first dialogue, dialogue count, first choice, choice count
+SCENE_RECORD = struct.Struct("<iIIIIIIII")
+# speaker, text
+DIALOGUE_RECORD = struct.Struct("<II")
+# response, effect (ie, sn, ft, pj), scene reference
+CHOICE_RECORD = struct.Struct("<I4bi")
+OFFSET = struct.Struct("<I")
+SCENE_ID = struct.Struct("<i")
+
+
+def validate_scene(scene_data: dict, position: int) -> None:
+    """
+    Checks that one scene has the fields and value ranges the binary format can hold.
+
+    Args:
+        scene_data (dict): The scene as loaded from scene.json.
+        position (int): Its position in the story, used in messages when it has no scene_id.
+
+    Raises:
+        ValueError: If the scene is malformed.
+    """
+    where = f"scene #{position}"
+    try:
+        scene_id = scene_data["scene_id"]
+        where = f"scene {scene_id}"
+        if not isinstance(scene_id, int):
+            raise ValueError(f"{where}: scene_id must be an integer")
+
+        for field in ("speakers", "setting"):
+            if not isinstance(scene_data[field], str):
+                raise ValueError(f"{where}: {field} must be a string")
+        for dialogue in scene_data["dialogues"]:
+            if not isinstance(dialogue["speaker"], str) or not isinstance(dialogue["text"], str):
+                raise ValueError(f"{where}: dialogue speaker and text must be strings")
+
+        interactive = scene_data["interactive"]
+        if not isinstance(interactive["speaker"], str) or not isinstance(interactive["prompt"], str):
+            raise ValueError(f"{where}: interactive speaker and prompt must be strings")
+        for choice in interactive["choices"]:
+            effect = choice["effect"]
+            if len(effect) != 4 or not all(isinstance(x, int) and -128 <= x <= 127 for x in effect):
+                raise ValueError(f"{where}: effect must be four integers in [-128, 127]")
+            if not isinstance(choice["sceneReference"], int):
+                raise ValueError(f"{where}: sceneReference must be an integer")
+            if not isinstance(choice["response"], str):
+                raise ValueError(f"{where}: choice response must be a string")
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"{where}: missing or malformed field {e}") from e
+
+
+def validate_story(scenes_data: list[dict], ending_scene_ids=()) -> None:
+    """
+    Checks that story JSON has the fields and value ranges the binary format can hold, and that choices outside the
+    ending scenes lead to scenes of the story.
+
+    Args:
+        scenes_data (list[dict]): The story as loaded from scene.json.
+        ending_scene_ids (Iterable[int], optional): Scenes whose choices are never followed.
+
+    Raises:
+        ValueError: If a scene is malformed, a scene ID is repeated or a choice references a missing scene.
+    """
+    if not isinstance(scenes_data, list):
+        raise ValueError("story must be a list of scenes")
+
+    seen_ids = set()
+    for position, scene_data in enumerate(scenes_data):
+        validate_scene(scene_data, position)
+        scene_id = scene_data["scene_id"]
+        if scene_id in seen_ids:
+            raise ValueError(f"scene {scene_id}: duplicate scene_id")
+        seen_ids.add(scene_id)
+
+    for scene_data in scenes_data:
+        if scene_data["scene_id"] in ending_scene_ids:
+            continue
+        for number, choice in enumerate(scene_data["interactive"]["choices"], 1):
+            if choice["sceneReference"] not in seen_ids:
+                raise ValueError(
+                    f"scene {scene_data['scene_id']} choice {number} references missing scene {choice['sceneReference']}"
+                )
+
+
+def compile_story(scenes_data: list[dict], ending_scene_ids=()) -> bytes:
+    """
+    Validates a story and serializes it to the binary scene graph format.
+
+    Args:
+        scenes_data (list[dict]): The story as loaded from scene.json.
+        ending_scene_ids (Iterable[int], optional): Scenes whose choices are not checked for missing references.
+
+    Returns:
+        bytes: The compiled story.
+    """
+    validate_story(scenes_data, ending_scene_ids)
+
+    strings: dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    scene_records = bytearray()
+    dialogue_records = bytearray()
+    choice_records = bytearray()
+    dialogue_count = 0
+    choice_count = 0
+    for scene_data in scenes_data:
+        interactive = scene_data["interactive"]
+        scene_records += SCENE_RECORD.pack(
+            scene_data["scene_id"],
+            intern(scene_data["speakers"]),
+            intern(scene_data["setting"]),
+            intern(interactive["speaker"]),
+            intern(interactive["prompt"]),
+            dialogue_count,
+            len(scene_data["dialogues"]),
+            choice_count,
+            len(interactive["choices"]),
+        )
+        for dialogue in scene_data["dialogues"]:
+            dialogue_records += DIALOGUE_RECORD.pack(intern(dialogue["speaker"]), intern(dialogue["text"]))
+        for choice in interactive["choices"]:
+            choice_records += CHOICE_RECORD.pack(intern(choice["response"]), *choice["effect"], choice["sceneReference"])
+        dialogue_count += len(scene_data["dialogues"])
+        choice_count += len(interactive["choices"])
+
+    order = sorted(range(len(scenes_data)), key=lambda slot: scenes_data[slot]["scene_id"])
+    id_table = array("i", (scenes_data[slot]["scene_id"] for slot in order))
+    id_table.extend(order)
+    if sys.byteorder != "little":
+        id_table.byteswap()
+
+    blob = bytearray()
+    string_offsets = bytearray()
+    for value in strings:
+        string_offsets += OFFSET.pack(len(blob))
+        blob += value.encode("utf-8")
+    string_offsets += OFFSET.pack(len(blob))
+
+    string_table_offset = HEADER.size
+    scene_table_offset = string_table_offset + len(string_offsets) + len(blob)
+    dialogue_table_offset = scene_table_offset + len(scene_records)
+    choice_table_offset = dialogue_table_offset + len(dialogue_records)
+    id_table_offset = choice_table_offset + len(choice_records)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(scenes_data),
+        dialogue_count,
+        choice_count,
+        len(strings),
+        string_table_offset,
+        scene_table_offset,
+        dialogue_table_offset,
+        choice_table_offset,
+        id_table_offset,
+    )
+    return b"".join(
+        (header, string_offsets, blob, scene_records, dialogue_records, choice_records, id_table.tobytes())
+    )
+
+
+def compile_story_file(json_file_path: str, output_path: str) -> None:
+    """
+    Compiles a scene.json file into a binary story file.
+
+    Args:
+        json_file_path (str): Path to the JSON story.
+        output_path (str): Path of the binary file to write.
+    """
+    # Imported here because story imports this module
+    from story import ENDING_SCENE_IDS
+
+    with open(json_file_path, "r") as file:
+        scenes_data = json.load(file)
+    with open(output_path, "wb") as file:
+        file.write(compile_story(scenes_data, ENDING_SCENE_IDS))
+
+
+def is_compiled_story(path: str) -> bool:
+    """Returns whether the file at path starts with the binary story magic."""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class CompiledSceneIndex:
+    """
+    Map from scene IDs to slots, answered by binary search over the scene ID table of a compiled story.
+
+    Has the lookups of story.SceneIndex, without reading every scene ID up front.
+    """
+
+    def __init__(self, story: "CompiledStory"):
+        """
+        Constructor for the index of a compiled story
+
+        Args:
+            story (CompiledStory): The story whose scene ID table is searched.
+        """
+        self._story = story
+        self._count = len(story)
+        self._table = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def slot(self, scene_id: int) -> int:
+        """
+        Returns the slot of a scene ID.
+
+        Raises:
+            KeyError: If no scene has this ID.
+        """
+        table, offset = self._id_table()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if SCENE_ID.unpack_from(table, offset + middle * SCENE_ID.size)[0] < scene_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and SCENE_ID.unpack_from(table, offset + low * SCENE_ID.size)[0] == scene_id:
+            return SCENE_ID.unpack_from(table, offset + (self._count + low) * SCENE_ID.size)[0]
+        raise KeyError(scene_id)
+
+    def __contains__(self, scene_id: int) -> bool:
+        try:
+            self.slot(scene_id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _id_table(self):
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._table, self._offset = self._story.id_table()
+        return self._table, self._offset
+
+
+class CompiledStory:
+    """
+    Read-only, list-like view of a compiled story file.
+
+    The file is memory-mapped and a Scene is only built the first time its position is indexed, so opening a
+    story costs the same regardless of its size. Built scenes are kept in least-recently-used order, at most
+    cache_size of them.
+    """
+
+    def __init__(self, path: str, cache_size: int = 256):
+        """
+        Opens a compiled story.
+
+        Args:
+            path (str): Path to the binary story file.
+            cache_size (int, optional): Number of built scenes kept (defaults to 256).
+
+        Raises:
+            ValueError: If the file is not a compiled story or has an unsupported version.
+        """
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from("<4sH", self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled story")
+        if version not in READ_VERSIONS:
+            raise ValueError(f"{path} has story format version {version}, expected one of {READ_VERSIONS}")
+        if version == 1:
+            fields = HEADER_V1.unpack_from(self._buffer, 0) + (None,)
+        else:
+            fields = HEADER.unpack_from(self._buffer, 0)
+        (
+            _,
+            _,
+            self._scene_count,
+            self._dialogue_count,
+            self._choice_count,
+            self._string_count,
+            self._string_table_offset,
+            self._scene_table_offset,
+            self._dialogue_table_offset,
+            self._choice_table_offset,
+            self._id_table_offset,
+        ) = fields
+
+        self._blob_offset = self._string_table_offset + OFFSET.size * (self._string_count + 1)
+        self._cache_size = cache_size
+        self._scenes: OrderedDict[int, Scene] = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = CompiledSceneIndex(self)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._scene_count
+
+    def __getitem__(self, index: int) -> Scene:
+        if index < 0:
+            index += self._scene_count
+        if not 0 <= index < self._scene_count:
+            raise IndexError("scene index out of range")
+        with self._lock:
+            scene = self._scenes.get(index)
+            if scene is not None:
+                self._scenes.move_to_end(index)
+                self.hits += 1
+                return scene
+        # Built outside the lock; two threads racing on one scene both build it and one copy is kept
+        scene = self._read_scene(index)
+        with self._lock:
+            self.misses += 1
+            self._scenes[index] = scene
+            while len(self._scenes) > self._cache_size:
+                self._scenes.popitem(last=False)
+        return scene
+
+    def __iter__(self):
+        for index in range(self._scene_count):
+            yield self[index]
+
+    def __bool__(self) -> bool:
+        return self._scene_count > 0
+
+    @property
+    def index(self) -> CompiledSceneIndex:
+        return self._index
+
+    @property
+    def cached_scenes(self) -> int:
+        return len(self._scenes)
+
+    def scene_id_at(self, index: int) -> int:
+        """Returns the scene ID stored at a position without building the Scene."""
+        return SCENE_ID.unpack_from(self._buffer, self._scene_table_offset + index * SCENE_RECORD.size)[0]
+
+    def id_table(self):
+        """
+        Returns the scene ID table as (buffer, offset): the IDs in ascending order, then the slot of each.
+
+        Version 1 files have no table, so it is built from the scene records.
+        """
+        if self._id_table_offset is not None:
+            return self._buffer, self._id_table_offset
+        order = sorted(range(self._scene_count), key=self.scene_id_at)
+        table = array("i", (self.scene_id_at(slot) for slot in order))
+        table.extend(order)
+        if sys.byteorder != "little":
+            table.byteswap()
+        return table.tobytes(), 0
+
+    def string(self, string_id: int) -> str:
+        """Decodes one entry of the string table."""
+        start, end = struct.unpack_from("<II", self._buffer, self._string_table_offset + string_id * OFFSET.size)
+        return self._buffer[self._blob_offset + start:self._blob_offset + end].decode("utf-8")
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def _read_scene(self, index: int) -> Scene:
+        (
+            scene_id,
+            speakers,
+            setting,
+            interactive_speaker,
+            prompt,
+            dialogue_start,
+            dialogue_count,
+            choice_start,
+            choice_count,
+        ) = SCENE_RECORD.unpack_from(self._buffer, self._scene_table_offset + index * SCENE_RECORD.size)
+
+        dialogues = []
+        for offset in range(dialogue_start, dialogue_start + dialogue_count):
+            speaker, text = DIALOGUE_RECORD.unpack_from(
+                self._buffer, self._dialogue_table_offset + offset * DIALOGUE_RECORD.size
+            )
+            dialogues.append(Dialogue(self.string(speaker), self.string(text)))
+
+        choices = []
+        effects = array("b")
+        for offset in range(choice_start, choice_start + choice_count):
+            response, ie, sn, ft, pj, scene_reference = CHOICE_RECORD.unpack_from(
+                self._buffer, self._choice_table_offset + offset * CHOICE_RECORD.size
+            )
+            effects.extend((ie, sn, ft, pj))
+            choices.append(Interactive.Choice(self.string(response), effects, scene_reference, len(effects) - 4))
+
+        interactive = Interactive(self.string(interactive_speaker), self.string(prompt), choices)
+        return Scene(scene_id, self.string(speakers).split(","), self.string(setting), dialogues, interactive)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python src/scenebin.py <scene.json> <scene.bin>")
+        sys.exit(2)
+    compile_story_file(sys.argv[1], sys.argv[2])
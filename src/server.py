@@ -0,0 +1,320 @@
+"""
+Asyncio game server: hosts many Game sessions in one process over a JSON-lines socket protocol.
+
+Every request and response is one JSON object per line. Requests carry an "op":
+
+    {"op": "start", "name": "Detective"}          -> {"ok": true, "session": 1, "scene": 1}
+    {"op": "advance", "session": 1}               -> the next dialogue line, or the prompt and choices once the
+                                                     scene's dialogue is done
+    {"op": "choose", "session": 1, "choice": 2}   -> {"ok": true, "scene": 30, "ending": false}
+    {"op": "result", "session": 1}                -> {"ok": true, "mb_score": [...], "type": "ESTJ"}
+    {"op": "end", "session": 1}                   -> {"ok": true}
+    {"op": "stats"}                               -> session count and process_scene latency percentiles
+
+Failures answer {"ok": false, "error": "..."}. All sessions share the one Story loaded from the story file.
+
+With --snapshot PATH the server restores the sessions saved in PATH at startup and checkpoints every session to it
+periodically (see snapshot.py). With --choice-log PATH every decision is also appended to a choice log for audit and
+replay (see eventlog.py).
+
+Run from the repository root:
+    python src/server.py [--host HOST] [--port PORT] [--story PATH] [--snapshot PATH] [--choice-log PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+
+from engine import mbti_type
+from eventlog import ChoiceLog
+from game import Game
+from snapshot import MAX_NAME_BYTES, SnapshotWriter, compact, load_sessions, read_next_session
+from story import ENDING_SCENE_IDS, STORY_PATH, load_story
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, fraction: float) -> float:
+    """Returns the value below which the given fraction of the samples fall (nearest rank)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def int_field(request: dict, key: str) -> int:
+    """
+    Returns an integer field of a request.
+
+    Raises:
+        KeyError: If the field is missing.
+        TypeError: If it is not a JSON integer (true and false are rejected, though Python counts them as ints).
+    """
+    value = request[key]
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError(f"{key} must be an integer")
+    return value
+
+
+class Session:
+    """
+    State of one hosted playthrough: the Game and how far the player has read into the current scene.
+    """
+
+    __slots__ = ("game", "dialogue_index")
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.dialogue_index = 0
+
+
+class GameServer:
+    """
+    Holds the hosted sessions and answers protocol requests.
+    """
+
+    def __init__(self, story_path: str = STORY_PATH, latency_samples: int = 100_000, choice_log: ChoiceLog = None):
+        """
+        Constructor for the server
+
+        Args:
+            story_path (str, optional): Story every session plays (defaults to 'resources/scene.json').
+            latency_samples (int, optional): Number of recent process_scene timings kept for percentiles (defaults to 100,000).
+            choice_log (ChoiceLog, optional): Log every decision and session end is appended to.
+        """
+        self._story_path = story_path
+        self._choice_log = choice_log
+        # Loaded once here; every Game below gets the same shared Story
+        self._story = load_story(story_path)
+        self._sessions: dict[int, Session] = {}
+        self._next_session = 1
+        # Session IDs changed or ended since the last checkpoint
+        self._dirty: set[int] = set()
+        self._ended: set[int] = set()
+        self._process_scene_us = deque(maxlen=latency_samples)
+        self._choices = 0
+        self._started = time.perf_counter()
+
+    @property
+    def sessions(self) -> dict[int, Session]:
+        return self._sessions
+
+    def handle(self, request: dict) -> dict:
+        """
+        Answers one protocol request.
+
+        Args:
+            request (dict): The decoded request line.
+        """
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "bad request: expected a JSON object"}
+        handler = self._handlers.get(request.get("op"))
+        if handler is None:
+            return {"ok": False, "error": f"unknown op {request.get('op')!r}"}
+        try:
+            return handler(self, request)
+        except KeyError as e:
+            return {"ok": False, "error": f"unknown session or missing field {e}"}
+        except (IndexError, ValueError, TypeError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def _start(self, request: dict) -> dict:
+        name = request.get("name", "MC")
+        if not isinstance(name, str):
+            raise TypeError("name must be a string")
+        # Checked here, since a name the snapshot cannot hold would fail every later checkpoint
+        if len(name.encode("utf-8")) > MAX_NAME_BYTES:
+            raise ValueError(f"name is longer than {MAX_NAME_BYTES} bytes")
+        game = Game(name=name, story_path=self._story_path)
+        session_id = self._next_session
+        self._next_session += 1
+        self._sessions[session_id] = Session(game)
+        self._dirty.add(session_id)
+        if self._choice_log is not None:
+            self._choice_log.start(session_id, game.get_current_scene_id(), name)
+        return {"ok": True, "session": session_id, "scene": game.get_current_scene_id()}
+
+    def _advance(self, request: dict) -> dict:
+        session = self._sessions[int_field(request, "session")]
+        game = session.game
+        scene = game.current_scene
+        if session.dialogue_index < len(scene.dialogues):
+            dialogue = scene.dialogues[session.dialogue_index]
+            session.dialogue_index += 1
+            return {"ok": True, "speaker": dialogue.speaker, "text": dialogue.text_for(game.name)}
+        interactive = scene.interactive
+        return {
+            "ok": True,
+            "speaker": interactive.speaker,
+            "prompt": interactive.prompt_for(game.name),
+            "choices": [choice.response_for(game.name) for choice in interactive.choices],
+        }
+
+    def _choose(self, request: dict) -> dict:
+        session_id = int_field(request, "session")
+        session = self._sessions[session_id]
+        game = session.game
+        choice = int_field(request, "choice")
+        if game.get_current_scene_id() in ENDING_SCENE_IDS:
+            raise ValueError("the game has ended")
+        if not 1 <= choice <= len(game.current_scene.interactive.choices):
+            raise ValueError(f"scene {game.get_current_scene_id()} has no choice {choice}")
+
+        if self._choice_log is not None:
+            self._choice_log.record(session_id, game.get_current_scene_id(), choice)
+        started = time.perf_counter()
+        game.process_scene(choice)
+        self._process_scene_us.append((time.perf_counter() - started) * 1e6)
+        self._choices += 1
+        self._dirty.add(session_id)
+
+        session.dialogue_index = 0
+        scene_id = game.get_current_scene_id()
+        return {"ok": True, "scene": scene_id, "ending": scene_id in ENDING_SCENE_IDS}
+
+    def _result(self, request: dict) -> dict:
+        game = self._sessions[int_field(request, "session")].game
+        return {"ok": True, "mb_score": list(game.mb_score), "type": mbti_type(game.mb_score)}
+
+    def _end(self, request: dict) -> dict:
+        session_id = int_field(request, "session")
+        session = self._sessions.pop(session_id)
+        if self._choice_log is not None:
+            self._choice_log.end(session_id, session.game.get_current_scene_id())
+        self._dirty.discard(session_id)
+        self._ended.add(session_id)
+        return {"ok": True}
+
+    def _stats(self, request: dict) -> dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "ok": True,
+            "sessions": len(self._sessions),
+            "started_sessions": self._next_session - 1,
+            "choices": self._choices,
+            "choices_per_s": self._choices / elapsed if elapsed else 0.0,
+            "process_scene_p50_us": percentile(self._process_scene_us, 0.50),
+            "process_scene_p99_us": percentile(self._process_scene_us, 0.99),
+        }
+
+    def restore(self, snapshot_path: str) -> int:
+        """
+        Adds the sessions saved in a snapshot file; their dialogue position restarts at the top of the scene. New
+        sessions get IDs above every one the snapshot has seen, including sessions that had already ended.
+
+        Returns:
+            int: Number of sessions restored.
+        """
+        games = load_sessions(snapshot_path, self._story_path)
+        for session_id, game in games.items():
+            self._sessions[session_id] = Session(game)
+        self._next_session = max(self._next_session, max(games, default=0) + 1, read_next_session(snapshot_path))
+        return len(games)
+
+    def checkpoint(self, writer: SnapshotWriter) -> int:
+        """
+        Appends the sessions changed since the last checkpoint to a snapshot, and drop records for ended ones.
+
+        Returns:
+            int: Number of records written.
+        """
+        dirty = [(session_id, self._sessions[session_id].game) for session_id in self._dirty if session_id in self._sessions]
+        failed = writer.save_many(dirty)
+        # A session that cannot be encoded is skipped until it changes again, instead of failing every checkpoint
+        for session_id, error in failed:
+            logger.error("session %d was not checkpointed: %s", session_id, error)
+        for session_id in self._ended:
+            writer.drop(session_id)
+        writer.set_next_session(self._next_session)
+        writer.flush()
+        # Cleared only once flushed, so sessions are written again by the next checkpoint if the write failed
+        written = len(dirty) - len(failed) + len(self._ended)
+        self._dirty.clear()
+        self._ended.clear()
+        return written
+
+    async def checkpoint_forever(self, writer: SnapshotWriter, interval_s: float = 5.0) -> None:
+        """Checkpoints to a snapshot every interval_s seconds. A failed checkpoint is logged and retried next time."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                self.checkpoint(writer)
+            except Exception:
+                logger.exception("checkpoint failed")
+
+    _handlers = {
+        "start": _start,
+        "advance": _advance,
+        "choose": _choose,
+        "result": _result,
+        "end": _end,
+        "stats": _stats,
+    }
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers requests from one connection until it closes. Sessions outlive their connection."""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # A line over the stream limit; readline has already discarded it
+                    response = {"ok": False, "error": f"bad request: {e}"}
+                else:
+                    if not line:
+                        break
+                    try:
+                        response = self.handle(json.loads(line))
+                    except ValueError as e:
+                        # Invalid JSON, or bytes that are not UTF-8 (UnicodeDecodeError)
+                        response = {"ok": False, "error": f"bad request: {e}"}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, snapshot_path: str = None) -> None:
+        if snapshot_path is None:
+            server = await asyncio.start_server(self.serve_client, host, port, limit=1 << 20)
+            async with server:
+                await server.serve_forever()
+            return
+
+        # Restored before accepting connections, so new sessions never reuse a saved session ID
+        self.restore(snapshot_path)
+        compact(snapshot_path)
+        with SnapshotWriter(snapshot_path) as writer:
+            checkpoints = asyncio.create_task(self.checkpoint_forever(writer))
+            try:
+                server = await asyncio.start_server(self.serve_client, host, port, limit=1 << 20)
+                async with server:
+                    await server.serve_forever()
+            finally:
+                checkpoints.cancel()
+                self.checkpoint(writer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host Mood Mystery sessions over JSON lines.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--story", default=STORY_PATH)
+    parser.add_argument("--snapshot", default=None, help="file to restore sessions from and checkpoint them to")
+    parser.add_argument("--choice-log", default=None, help="file every decision is appended to")
+    args = parser.parse_args()
+    choice_log = None if args.choice_log is None else ChoiceLog(args.choice_log, story_path=args.story)
+    try:
+        asyncio.run(GameServer(args.story, choice_log=choice_log).serve(args.host, args.port, args.snapshot))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if choice_log is not None:
+            choice_log.close()
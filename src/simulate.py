@@ -0,0 +1,433 @@
+"""
+Monte Carlo player simulator: plays many sessions through Game.process_scene under a choice policy and reports the
+distribution of the final scores and types, for tuning the effect vectors of a story.
+
+Policies pick each decision:
+
+    uniform  every choice of a scene is equally likely
+    axis     prefers the choices pushing one score axis toward a letter (ie. 'E'), uniform otherwise
+    replay   replays playthroughs recorded in a choice log (see eventlog.py), uniform once a recording runs out
+
+Runs are split into fixed-size shards, each with its own seed derived from the run seed and the shard number, and the
+shards are spread over a process pool. A worker loads the story and builds the policy once, plays its shards and
+sends back only the histograms, so the cost of a shard does not grow with the pool. The shards and their seeds do not
+depend on the number of workers, so the same seed gives the same histograms on any machine.
+
+Run from the repository root:
+    python src/simulate.py [--runs N] [--workers N] [--policy uniform|axis|replay] [--axis E] [--bias 0.75]
+                           [--log choices.log] [--seed S] [--shard-size N] [--max-steps N] [--story PATH]
+                           [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import MBTI_TYPES, SCORE_MAX, SCORE_MIN, mbti_type
+from eventlog import END_CHOICE, START_CHOICE, read_events
+from game import Game
+from scene import Scene
+from story import ENDING_SCENE_IDS, STORY_PATH, load_story
+
+# Score axis and direction of each letter, in mb_score order; see engine.mbti_type
+AXIS_LETTERS = {
+    "E": (0, 1), "I": (0, -1),
+    "N": (1, 1), "S": (1, -1),
+    "T": (2, 1), "F": (2, -1),
+    "J": (3, 1), "P": (3, -1),
+}
+
+
+class Policy(ABC):
+    """
+    Picks the decisions of simulated players.
+
+    A policy is built once per worker process and plays every playthrough of its shards, one after the other.
+    """
+
+    name = "policy"
+
+    def start(self, rng: random.Random) -> None:
+        """Called before each playthrough."""
+
+    @abstractmethod
+    def choose(self, scene: Scene, game: Game, rng: random.Random) -> int:
+        """
+        Returns the decision for the current scene, 1-based like Game.process_scene.
+
+        Args:
+            scene (Scene): The current scene.
+            game (Game): The session being played.
+            rng (random.Random): The shard's random generator; policies draw all their randomness from it.
+        """
+
+
+class UniformPolicy(Policy):
+    """
+    Picks every choice of a scene with equal probability.
+    """
+
+    name = "uniform"
+
+    def choose(self, scene: Scene, game: Game, rng: random.Random) -> int:
+        return rng.randrange(len(scene.interactive.choices)) + 1
+
+
+class AxisPolicy(Policy):
+    """
+    Prefers the choices that push one score axis furthest toward a letter.
+    """
+
+    name = "axis"
+
+    def __init__(self, letter: str, bias: float = 0.75):
+        """
+        Constructor for the axis policy
+
+        Args:
+            letter (str): One of the eight type letters, ie. 'E' to favor extroverted choices.
+            bias (float, optional): Chance of picking a favored choice; otherwise the pick is uniform (defaults to 0.75).
+
+        Raises:
+            ValueError: If the letter is not a type letter or bias is not in [0, 1].
+        """
+        if letter not in AXIS_LETTERS:
+            raise ValueError(f"letter must be one of {''.join(AXIS_LETTERS)}")
+        if not 0 <= bias <= 1:
+            raise ValueError("bias must be in [0, 1]")
+        self.letter = letter
+        self.bias = bias
+        self._axis, self._direction = AXIS_LETTERS[letter]
+        # Favored decisions of each scene, by scene ID, found on the first visit
+        self._favored: dict[int, tuple[int, ...]] = {}
+
+    def favored(self, scene: Scene) -> tuple[int, ...]:
+        """Returns the decisions of a scene with the largest effect toward the letter; ties are all favored."""
+        decisions = self._favored.get(scene.scene_id)
+        if decisions is None:
+            pulls = [choice.effect[self._axis] * self._direction for choice in scene.interactive.choices]
+            strongest = max(pulls)
+            decisions = self._favored[scene.scene_id] = tuple(
+                decision for decision, pull in enumerate(pulls, 1) if pull == strongest
+            )
+        return decisions
+
+    def choose(self, scene: Scene, game: Game, rng: random.Random) -> int:
+        if rng.random() < self.bias:
+            decisions = self.favored(scene)
+            return decisions[0] if len(decisions) == 1 else rng.choice(decisions)
+        return rng.randrange(len(scene.interactive.choices)) + 1
+
+
+class ReplayPolicy(Policy):
+    """
+    Replays recorded playthroughs, picking one at random per simulated player.
+
+    A recording that stops before an ending, or holds a decision the scene does not have, is finished by the fallback
+    policy.
+    """
+
+    name = "replay"
+
+    def __init__(self, recordings, fallback: Policy = None):
+        """
+        Constructor for the replay policy
+
+        Args:
+            recordings (Iterable[Sequence[int]]): Decision sequences, each played from the first scene.
+            fallback (Policy, optional): Policy once a recording runs out (defaults to UniformPolicy).
+
+        Raises:
+            ValueError: If there are no recordings.
+        """
+        self.recordings = [tuple(decisions) for decisions in recordings if decisions]
+        if not self.recordings:
+            raise ValueError("no recorded playthroughs to replay")
+        self.fallback = UniformPolicy() if fallback is None else fallback
+        self._decisions = ()
+        self._step = 0
+
+    @classmethod
+    def from_log(cls, log_path: str, story_path: str = STORY_PATH, fallback: Policy = None) -> "ReplayPolicy":
+        """
+        Builds a replay policy from the sessions of a choice log that were started in it, or whose first logged
+        decision was made in the first scene of the story. Sessions that started before the log was last compacted are
+        skipped.
+
+        Args:
+            log_path (str): The choice log.
+            story_path (str, optional): Story the log was recorded against (defaults to 'resources/scene.json').
+            fallback (Policy, optional): Policy once a recording runs out (defaults to UniformPolicy).
+        """
+        first_scene = load_story(story_path).first_scene
+        first_scene_id = first_scene.scene_id if first_scene else None
+        recordings = []
+        # Sessions being recorded; None for a session whose log starts mid-story
+        sessions: dict[int, list] = {}
+        for _, session_id, scene_id, choice, _, _ in read_events(log_path):
+            if choice == START_CHOICE:
+                decisions = sessions.pop(session_id, None)
+                if decisions:
+                    recordings.append(decisions)
+                sessions[session_id] = []
+                continue
+            if choice == END_CHOICE:
+                decisions = sessions.pop(session_id, None)
+                if decisions:
+                    recordings.append(decisions)
+                continue
+            if session_id not in sessions:
+                sessions[session_id] = [] if scene_id == first_scene_id else None
+            if sessions[session_id] is not None:
+                sessions[session_id].append(choice)
+        # Sessions still open when the log was written
+        recordings.extend(decisions for decisions in sessions.values() if decisions)
+        return cls(recordings, fallback)
+
+    def start(self, rng: random.Random) -> None:
+        self._decisions = rng.choice(self.recordings)
+        self._step = 0
+        self.fallback.start(rng)
+
+    def choose(self, scene: Scene, game: Game, rng: random.Random) -> int:
+        step = self._step
+        if step < len(self._decisions):
+            self._step = step + 1
+            decision = self._decisions[step]
+            if 1 <= decision <= len(scene.interactive.choices):
+                return decision
+            # The story changed since the recording; the rest of it no longer applies
+            self._decisions = ()
+        return self.fallback.choose(scene, game, rng)
+
+
+class Outcomes:
+    """
+    Histograms of the outcomes of many playthroughs. Shards are merged by adding their counts.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        # Playthroughs stopped at max_steps before reaching an ending
+        self.truncated = 0
+        self.steps = 0
+        # score_counts[axis][score - SCORE_MIN] is the number of playthroughs ending with that score on the axis
+        self.score_counts = [[0] * (SCORE_MAX - SCORE_MIN + 1) for _ in range(4)]
+        self.type_counts = dict.fromkeys(MBTI_TYPES, 0)
+        self.ending_counts = dict.fromkeys(ENDING_SCENE_IDS, 0)
+
+    def add(self, mb_score, steps: int, ending_scene_id: int = None) -> None:
+        """
+        Counts one playthrough.
+
+        Args:
+            mb_score (Sequence[int]): The final [ie, sn, ft, pj] scores.
+            steps (int): Number of decisions made.
+            ending_scene_id (int, optional): The ending reached; None for a truncated playthrough.
+        """
+        self.runs += 1
+        self.steps += steps
+        for counts, score in zip(self.score_counts, mb_score):
+            counts[score - SCORE_MIN] += 1
+        self.type_counts[mbti_type(mb_score)] += 1
+        if ending_scene_id is None:
+            self.truncated += 1
+        else:
+            self.ending_counts[ending_scene_id] = self.ending_counts.get(ending_scene_id, 0) + 1
+
+    def merge(self, other: "Outcomes") -> None:
+        """Adds the counts of another set of outcomes to these."""
+        self.runs += other.runs
+        self.truncated += other.truncated
+        self.steps += other.steps
+        for counts, other_counts in zip(self.score_counts, other.score_counts):
+            for position, count in enumerate(other_counts):
+                counts[position] += count
+        for mbti, count in other.type_counts.items():
+            self.type_counts[mbti] += count
+        for scene_id, count in other.ending_counts.items():
+            self.ending_counts[scene_id] = self.ending_counts.get(scene_id, 0) + count
+
+    def mean_scores(self) -> list[float]:
+        """Returns the mean final score of each axis."""
+        if not self.runs:
+            return [0.0] * 4
+        return [
+            sum(count * (position + SCORE_MIN) for position, count in enumerate(counts)) / self.runs
+            for counts in self.score_counts
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "truncated": self.truncated,
+            "mean_steps": self.steps / self.runs if self.runs else 0.0,
+            "mean_scores": self.mean_scores(),
+            "score_range": [SCORE_MIN, SCORE_MAX],
+            "score_counts": dict(zip(("ie", "sn", "ft", "pj"), self.score_counts)),
+            "type_counts": self.type_counts,
+            "ending_counts": self.ending_counts,
+        }
+
+
+def shard_seed(seed: int, shard: int) -> str:
+    """Returns the seed of a shard; string seeds are hashed by random.Random, so neighboring shards do not overlap."""
+    return f"{seed}/{shard}"
+
+
+def play(game: Game, policy: Policy, rng: random.Random, max_steps: int, outcomes: Outcomes) -> None:
+    """
+    Plays one session from its current scene to an ending, or for max_steps decisions, and counts the outcome.
+
+    Raises:
+        ValueError: If the session reaches a scene without choices that is not an ending.
+    """
+    policy.start(rng)
+    choose = policy.choose
+    scene = game.current_scene
+    steps = 0
+    while scene.scene_id not in ENDING_SCENE_IDS:
+        if steps == max_steps:
+            outcomes.add(game.mb_score, steps)
+            return
+        if not scene.interactive.choices:
+            # Policies pick among the choices, so a dead end that is not an ending has nothing to pick from
+            raise ValueError(f"scene {scene.scene_id} has no choices and is not an ending")
+        game.process_scene(choose(scene, game, rng))
+        steps += 1
+        scene = game.current_scene
+    outcomes.add(game.mb_score, steps, scene.scene_id)
+
+
+def simulate_shard(story_path: str, policy: Policy, runs: int, seed: str, max_steps: int) -> Outcomes:
+    """
+    Plays one shard of sessions, each in a fresh Game.
+
+    Args:
+        story_path (str): The story to play.
+        policy (Policy): Picks the decisions.
+        runs (int): Number of sessions.
+        seed (str): Seed of the shard, from shard_seed().
+        max_steps (int): Decisions after which a session that has not reached an ending is stopped.
+    """
+    rng = random.Random(seed)
+    outcomes = Outcomes()
+    for _ in range(runs):
+        play(Game(story_path=story_path), policy, rng, max_steps, outcomes)
+    return outcomes
+
+
+# Set in each worker process by _init_worker
+_worker_args = None
+
+
+def _init_worker(story_path: str, policy: Policy, max_steps: int) -> None:
+    global _worker_args
+    _worker_args = (story_path, policy, max_steps)
+    load_story(story_path)
+
+
+def _run_shard(shard: tuple[int, str]) -> Outcomes:
+    story_path, policy, max_steps = _worker_args
+    runs, seed = shard
+    return simulate_shard(story_path, policy, runs, seed, max_steps)
+
+
+def simulate(
+    runs: int,
+    policy: Policy = None,
+    workers: int = None,
+    seed: int = 0,
+    shard_size: int = 10_000,
+    max_steps: int = 1000,
+    story_path: str = STORY_PATH,
+) -> Outcomes:
+    """
+    Plays many sessions, sharded over a process pool, and merges their outcomes.
+
+    Args:
+        runs (int): Number of sessions.
+        policy (Policy, optional): Picks the decisions (defaults to UniformPolicy).
+        workers (int, optional): Worker processes (defaults to the number of CPUs); 1 plays in this process.
+        seed (int, optional): Seed of the run; each shard gets its own seed derived from it (defaults to 0).
+        shard_size (int, optional): Sessions per shard (defaults to 10,000).
+        max_steps (int, optional): Decisions after which a session that has not reached an ending is stopped, so
+            cyclic stories terminate (defaults to 1000).
+        story_path (str, optional): The story to play (defaults to 'resources/scene.json').
+
+    Raises:
+        ValueError: If workers or shard_size is less than 1, or a session reaches a scene without choices that is not
+            an ending.
+    """
+    policy = UniformPolicy() if policy is None else policy
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 1 or shard_size < 1:
+        raise ValueError("workers and shard_size must be at least 1")
+    shards = [
+        (min(shard_size, runs - start), shard_seed(seed, number))
+        for number, start in enumerate(range(0, runs, shard_size))
+    ]
+    # Fails here, not once per worker, on a missing or broken story
+    load_story(story_path)
+
+    total = Outcomes()
+    if workers == 1 or len(shards) <= 1:
+        for shard_runs, shard_seed_value in shards:
+            total.merge(simulate_shard(story_path, policy, shard_runs, shard_seed_value, max_steps))
+        return total
+
+    with ProcessPoolExecutor(
+        min(workers, len(shards)), initializer=_init_worker, initargs=(story_path, policy, max_steps)
+    ) as pool:
+        for outcomes in pool.map(_run_shard, shards):
+            total.merge(outcomes)
+    return total
+
+
+def positive_int(text: str) -> int:
+    """argparse type of options that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate players of a Mood Mystery story and report the outcomes.")
+    parser.add_argument("--runs", type=int, default=100_000)
+    parser.add_argument("--workers", type=positive_int, default=None, help="worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--policy", choices=("uniform", "axis", "replay"), default="uniform")
+    parser.add_argument("--axis", choices=sorted(AXIS_LETTERS), default="E", help="letter favored by --policy axis")
+    parser.add_argument("--bias", type=float, default=0.75, help="chance of a favored choice with --policy axis")
+    parser.add_argument("--log", default=None, help="choice log replayed by --policy replay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=positive_int, default=10_000)
+    parser.add_argument("--max-steps", type=positive_int, default=1000)
+    parser.add_argument("--story", default=STORY_PATH)
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.policy == "axis":
+        player_policy = AxisPolicy(args.axis, args.bias)
+    elif args.policy == "replay":
+        if args.log is None:
+            parser.error("--policy replay needs --log")
+        player_policy = ReplayPolicy.from_log(args.log, args.story)
+    else:
+        player_policy = UniformPolicy()
+
+    started = time.perf_counter()
+    result = simulate(args.runs, player_policy, args.workers, args.seed, args.shard_size, args.max_steps, args.story)
+    elapsed = time.perf_counter() - started
+
+    report = {"policy": player_policy.name, "seconds": elapsed, "runs_per_s": result.runs / elapsed}
+    report.update(result.to_dict())
+    text = json.dumps(report, indent=4)
+    print(text)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            file.write(text)
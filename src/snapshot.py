@@ -0,0 +1,292 @@
+"""
+Session snapshots: compact binary records of Game state in an append-only file.
+
+File layout: a FILE_HEADER (magic, format version, choice-log sequence, next session ID), then records. Each record
+is a fixed-size RECORD header followed by the UTF-8 player name:
+
+    crc32       of everything in the record after this field
+    session_id  u32
+    scene_id    i32 current scene
+    flags       u8, FLAG_DROPPED marks an ended session
+    scores      4 x i8 [ie, sn, ft, pj]
+    name_length u16
+
+A later record for a session replaces earlier ones, so checkpointing only appends. After a crash the file is read up
+to the last complete record with a valid checksum; the torn tail is cut off the next time it is opened for writing.
+compact() rewrites the file with only the latest record of each live session.
+
+The sequence in the header is the number of choice-log events already folded into the snapshot (see eventlog.py); it
+stays 0 for snapshots written by SnapshotWriter alone. The next session ID is the lowest ID never handed out, so a
+restored server does not reuse the IDs of sessions that ended before the snapshot; it is rewritten in place.
+"""
+
+import os
+import struct
+import zlib
+
+from game import Game
+from story import STORY_PATH
+
+MAGIC = b"MBSS"
+VERSION = 3
+FILE_HEADER = struct.Struct("<4sHxxQI")
+# Offset of the next session ID in FILE_HEADER
+NEXT_SESSION = struct.Struct("<I")
+NEXT_SESSION_OFFSET = FILE_HEADER.size - NEXT_SESSION.size
+RECORD = struct.Struct("<IIiB4bH")
+FLAG_DROPPED = 1
+# Longest player name a record holds, in UTF-8 bytes (name_length is a u16)
+MAX_NAME_BYTES = 0xFFFF
+
+
+def encode_record(session_id: int, scene_id: int, scores, name: str, flags: int = 0) -> bytes:
+    """
+    Encodes one record.
+
+    Args:
+        session_id (int): The session.
+        scene_id (int): Its current scene.
+        scores (Sequence[int]): Its [ie, sn, ft, pj] scores.
+        name (str): The player name.
+        flags (int, optional): Record flags, ie. FLAG_DROPPED (defaults to 0).
+
+    Raises:
+        ValueError: If a field does not fit its record slot, or the name is not a string.
+    """
+    if not isinstance(name, str):
+        raise ValueError(f"session {session_id} cannot be snapshotted: name is not a string")
+    name_bytes = name.encode("utf-8")
+    try:
+        body = RECORD.pack(0, session_id, scene_id, flags, *scores, len(name_bytes))[4:] + name_bytes
+    except struct.error as e:
+        raise ValueError(f"session {session_id} cannot be snapshotted: {e}") from e
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def encode_session(session_id: int, game: Game = None) -> bytes:
+    """
+    Encodes one session as a record; without a game the record marks the session as dropped.
+
+    Raises:
+        ValueError: If a score does not fit in an int8.
+    """
+    if game is None:
+        return encode_record(session_id, 0, (0, 0, 0, 0), "", FLAG_DROPPED)
+    return encode_record(session_id, game.get_current_scene_id(), game.mb_score, game.name)
+
+
+def _read_header(data: bytes) -> tuple[int, int]:
+    magic, version, sequence, next_session = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a session snapshot file")
+    if version != VERSION:
+        raise ValueError(f"snapshot format version {version}, expected {VERSION}")
+    return sequence, next_session
+
+
+def read_records(data: bytes):
+    """
+    Yields (session_id, scene_id, flags, scores, name) for every intact record, stopping at a torn or corrupt one.
+
+    The offset just past the last intact record is returned as the generator's value.
+
+    Raises:
+        ValueError: If the data is not a snapshot file or has an unsupported version.
+    """
+    if len(data) < FILE_HEADER.size:
+        return 0
+    _read_header(data)
+
+    offset = FILE_HEADER.size
+    while offset + RECORD.size <= len(data):
+        crc, session_id, scene_id, flags, ie, sn, ft, pj, name_length = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + name_length
+        if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+            break
+        name = data[offset + RECORD.size:end].decode("utf-8")
+        yield session_id, scene_id, flags, (ie, sn, ft, pj), name
+        offset = end
+    return offset
+
+
+def _latest_records(data: bytes) -> tuple[dict, int]:
+    latest = {}
+    records = read_records(data)
+    while True:
+        try:
+            session_id, scene_id, flags, scores, name = next(records)
+        except StopIteration as stop:
+            return latest, stop.value
+        if flags & FLAG_DROPPED:
+            latest.pop(session_id, None)
+        else:
+            latest[session_id] = (scene_id, scores, name)
+
+
+def read_snapshot(path: str) -> tuple[int, dict[int, tuple]]:
+    """
+    Reads the live sessions of a snapshot file without building Game objects.
+
+    Returns:
+        tuple[int, dict[int, tuple]]: The choice-log sequence of the file, and (scene_id, scores, name) by session
+            ID. (0, {}) when the file does not exist.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return 0, {}
+    if len(data) < FILE_HEADER.size:
+        return 0, {}
+    latest, _ = _latest_records(data)
+    return _read_header(data)[0], latest
+
+
+def read_next_session(path: str) -> int:
+    """
+    Returns the lowest session ID a snapshot file has never seen; 0 when the file does not exist or never recorded one.
+
+    Raises:
+        ValueError: If the file is not a snapshot file or has an unsupported version.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read(FILE_HEADER.size)
+    except FileNotFoundError:
+        return 0
+    if len(data) < FILE_HEADER.size:
+        return 0
+    return _read_header(data)[1]
+
+
+def write_snapshot(path: str, sessions: dict[int, tuple], sequence: int = 0, next_session: int = 0) -> None:
+    """
+    Writes a snapshot file holding one record per session, replacing any existing file atomically.
+
+    Args:
+        path (str): The snapshot file.
+        sessions (dict[int, tuple]): (scene_id, scores, name) by session ID, as returned by read_snapshot.
+        sequence (int, optional): Number of choice-log events folded into these sessions (defaults to 0).
+        next_session (int, optional): Lowest session ID never handed out (defaults to 0, not recorded).
+    """
+    parts = [FILE_HEADER.pack(MAGIC, VERSION, sequence, next_session)]
+    for session_id, (scene_id, scores, name) in sessions.items():
+        parts.append(encode_record(session_id, scene_id, scores, name))
+
+    with open(path + ".tmp", "wb") as file:
+        file.write(b"".join(parts))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def load_sessions(path: str, story_path: str = STORY_PATH) -> dict[int, Game]:
+    """
+    Restores every live session of a snapshot file.
+
+    Args:
+        path (str): The snapshot file.
+        story_path (str, optional): Story the sessions play (defaults to 'resources/scene.json').
+
+    Returns:
+        dict[int, Game]: The restored sessions by session ID; empty when the file does not exist.
+    """
+    _, latest = read_snapshot(path)
+    sessions = {}
+    for session_id, (scene_id, scores, name) in latest.items():
+        game = Game(*scores, name=name, story_path=story_path)
+        game.current_scene_id = scene_id
+        sessions[session_id] = game
+    return sessions
+
+
+class SnapshotWriter:
+    """
+    Appends session records to a snapshot file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens a snapshot file for appending, creating it or cutting off a torn tail left by a crash.
+
+        Args:
+            path (str): The snapshot file.
+        """
+        self._path = path
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                _, good_length = _latest_records(file.read())
+            self._file = open(path, "r+b")
+            self._file.truncate(max(good_length, FILE_HEADER.size))
+            if good_length < FILE_HEADER.size:
+                self._file.seek(0)
+                self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, 0))
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, 0))
+
+    def save(self, session_id: int, game: Game) -> None:
+        """Appends the current state of one session."""
+        self._file.write(encode_session(session_id, game))
+
+    def save_many(self, sessions) -> list[tuple[int, ValueError]]:
+        """
+        Appends the state of many sessions in one write. A session that cannot be encoded is skipped, so it does not
+        keep the others from being saved.
+
+        Args:
+            sessions (Iterable[tuple[int, Game]]): (session ID, game) pairs, ie. dict.items().
+
+        Returns:
+            list[tuple[int, ValueError]]: The skipped sessions and why they could not be encoded.
+        """
+        records = []
+        failed = []
+        for session_id, game in sessions:
+            try:
+                records.append(encode_session(session_id, game))
+            except ValueError as e:
+                failed.append((session_id, e))
+        self._file.write(b"".join(records))
+        return failed
+
+    def drop(self, session_id: int) -> None:
+        """Records that a session has ended, so it is not restored."""
+        self._file.write(encode_session(session_id))
+
+    def set_next_session(self, next_session: int) -> None:
+        """Rewrites the lowest session ID never handed out in the file header; records keep being appended."""
+        self._file.seek(NEXT_SESSION_OFFSET)
+        self._file.write(NEXT_SESSION.pack(next_session))
+        self._file.seek(0, os.SEEK_END)
+
+    def flush(self, sync: bool = True) -> None:
+        """Writes buffered records to the file, and to disk when sync is set."""
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def compact(path: str) -> int:
+    """
+    Rewrites a snapshot file with only the latest record of each live session, replacing it atomically.
+
+    Returns:
+        int: Number of sessions kept; 0 when the file does not exist.
+    """
+    if not os.path.exists(path):
+        return 0
+    sequence, latest = read_snapshot(path)
+    write_snapshot(path, latest, sequence, read_next_session(path))
+    return len(latest)
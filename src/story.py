@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+from array import array
+
+from scene import Scene, scene_from_json
+from lazystory import LazyJsonStory
+from scenebin import CompiledSceneIndex, CompiledStory, is_compiled_story
+
+STORY_PATH = "resources/scene.json"
+
+# JSON stories larger than this are opened through an offset index instead of decoded whole
+LAZY_JSON_BYTES = 1024 * 1024
+
+# Reaching one of these scenes ends the game and shows the results screen
+ENDING_SCENE_IDS = (19, 20)
+
+
+def load_scenes_from_json(json_file_path: str) -> list[Scene]:
+    """
+    Loads scenes from a JSON file and returns a list of fully initialized Scene objects.
+
+    Args:
+        json_file_path (str): Path to the JSON file.
+    """
+    with open(json_file_path, "r") as file:
+        scenes_data = json.load(file)
+
+    # The effects of every choice in the story, packed as int8 [ie, sn, ft, pj] quadruples
+    effects = array("b")
+    return [scene_from_json(scene_data, effects) for scene_data in scenes_data]
+
+
+def load_scenes(story_path: str):
+    """
+    Loads the scenes of a story, reading compiled stories and large JSON stories lazily.
+
+    Args:
+        story_path (str): Path to a JSON story or a compiled binary story.
+
+    Returns:
+        list[Scene] | CompiledStory | LazyJsonStory: The scenes in story order.
+    """
+    if is_compiled_story(story_path):
+        return CompiledStory(story_path)
+    if os.path.getsize(story_path) > LAZY_JSON_BYTES:
+        return LazyJsonStory(story_path)
+    return load_scenes_from_json(story_path)
+
+
+class SceneIndex:
+    """
+    Constant-time map from scene IDs to slots (positions in the story).
+
+    IDs are looked up in a dense array offset by the smallest ID; stories whose IDs are too sparse for that fall back
+    to a dict.
+    """
+
+    # A dense table may be at most this many times the scene count (plus slack for small stories)
+    MAX_DENSE_RATIO = 2
+    DENSE_SLACK = 64
+
+    def __init__(self, scene_ids):
+        """
+        Builds the index.
+
+        Args:
+            scene_ids (Sequence[int]): The scene ID of every slot, in story order.
+
+        Raises:
+            ValueError: If a scene ID appears more than once.
+        """
+        self._count = len(scene_ids)
+        self._base = min(scene_ids) if self._count else 0
+        span = max(scene_ids) - self._base + 1 if self._count else 0
+
+        if span <= self.MAX_DENSE_RATIO * self._count + self.DENSE_SLACK:
+            self._dense = array("i", [-1]) * span
+            self._sparse = None
+            for slot, scene_id in enumerate(scene_ids):
+                if self._dense[scene_id - self._base] != -1:
+                    raise ValueError(f"duplicate scene_id {scene_id}")
+                self._dense[scene_id - self._base] = slot
+        else:
+            self._dense = None
+            self._sparse = {}
+            for slot, scene_id in enumerate(scene_ids):
+                if self._sparse.setdefault(scene_id, slot) != slot:
+                    raise ValueError(f"duplicate scene_id {scene_id}")
+
+    def slot(self, scene_id: int) -> int:
+        """
+        Returns the slot of a scene ID.
+
+        Raises:
+            KeyError: If no scene has this ID.
+        """
+        if self._sparse is not None:
+            return self._sparse[scene_id]
+        offset = scene_id - self._base
+        if 0 <= offset < len(self._dense):
+            slot = self._dense[offset]
+            if slot >= 0:
+                return slot
+        raise KeyError(scene_id)
+
+    def __contains__(self, scene_id: int) -> bool:
+        try:
+            self.slot(scene_id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def check_references(scenes, index: SceneIndex, ending_scene_ids=ENDING_SCENE_IDS) -> None:
+    """
+    Checks that every choice outside the ending scenes leads to a scene of the story.
+
+    Choices of ending scenes are never followed, since reaching an ending shows the results screen.
+
+    Raises:
+        ValueError: If a choice references a missing scene.
+    """
+    _check_reference_lists(
+        ((scene.scene_id, [choice.scene_reference for choice in scene.interactive.choices]) for scene in scenes),
+        index,
+        ending_scene_ids,
+    )
+
+
+def check_indexed_references(scenes: LazyJsonStory, index: SceneIndex, ending_scene_ids=ENDING_SCENE_IDS) -> None:
+    """
+    check_references for a lazily loaded story, read from its offset index so no Scene is decoded.
+
+    Raises:
+        ValueError: If a choice references a missing scene.
+    """
+    _check_reference_lists(
+        ((scenes.scene_id_at(slot), scenes.references_at(slot)) for slot in range(len(scenes))),
+        index,
+        ending_scene_ids,
+    )
+
+
+def _check_reference_lists(scene_references, index, ending_scene_ids) -> None:
+    for scene_id, references in scene_references:
+        if scene_id in ending_scene_ids:
+            continue
+        for number, reference in enumerate(references, 1):
+            if reference not in index:
+                raise ValueError(f"scene {scene_id} choice {number} references missing scene {reference}")
+
+
+class Story:
+    """
+    The story data (scenes, dialogues and choices) shared by every Game session in the process.
+
+    A Story is never modified after loading; per-session state lives on Game.
+    """
+
+    def __init__(self, path: str, scenes):
+        """
+        Constructor for a loaded story
+
+        Args:
+            path (str): The file the story was loaded from.
+            scenes (list[Scene] | CompiledStory | LazyJsonStory): The scenes in story order.
+
+        Raises:
+            ValueError: If two scenes share an ID or a choice references a missing scene.
+        """
+        self._path = path
+        if isinstance(scenes, CompiledStory):
+            # Looked up in the file's scene ID table, so opening reads no scene records. References are not checked
+            # here, since that would decode every scene; compiled stories were checked when compiled
+            self._scenes = scenes
+            self._index = scenes.index
+        elif isinstance(scenes, LazyJsonStory):
+            # Read the IDs and references straight from the offset index so no Scene is decoded up front
+            self._scenes = scenes
+            self._index = SceneIndex([scenes.scene_id_at(slot) for slot in range(len(scenes))])
+            check_indexed_references(scenes, self._index)
+        else:
+            self._scenes = tuple(scenes)
+            self._index = SceneIndex([scene.scene_id for scene in self._scenes])
+            check_references(self._scenes, self._index)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def scenes(self):
+        return self._scenes
+
+    @property
+    def first_scene(self):
+        return self._scenes[0] if self._scenes else None
+
+    @property
+    def index(self) -> SceneIndex | CompiledSceneIndex:
+        return self._index
+
+    def slot_of(self, scene_id: int) -> int:
+        """
+        Returns the position of a scene in the story.
+
+        Raises:
+            KeyError: If the story has no such scene.
+        """
+        return self._index.slot(scene_id)
+
+    def scene_by_id(self, scene_id: int) -> Scene:
+        """
+        Returns the scene with the given scene ID.
+
+        Raises:
+            KeyError: If the story has no such scene.
+        """
+        return self._scenes[self._index.slot(scene_id)]
+
+
+_cache: dict[str, tuple[int, Story]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_story(story_path: str = STORY_PATH) -> Story:
+    """
+    Returns the shared Story for a file, loading it on first use and again whenever the file's mtime changes.
+
+    Args:
+        story_path (str, optional): Path to a JSON story or a compiled binary story (defaults to 'resources/scene.json').
+    """
+    key = os.path.abspath(story_path)
+    mtime = os.stat(key).st_mtime_ns
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        story = Story(story_path, load_scenes(story_path))
+        _cache[key] = (mtime, story)
+        return story
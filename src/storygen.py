@@ -0,0 +1,188 @@
+"""
+Synthetic story generator for scale testing.
+
+Writes stories in the scene.json schema, one scene at a time, so a file of any size is generated in constant memory.
+
+Scenes are laid out in story order. Every scene has at least one choice leading forward, and the last two positions
+hold the ending scenes (ENDING_SCENE_IDS), so every playthrough ends. The other scenes get the remaining IDs in
+order. The first choice of a scene always leads to the next one, so every scene is reachable. In the "cyclic" shape
+some of the other choices lead back to an earlier scene. Endings get a single choice back to the first scene, since
+their choices are never followed.
+
+Run from the repository root:
+    python src/storygen.py OUTPUT [--scenes N] [--branching MIN MAX] [--dialogues MIN MAX] [--words MIN MAX]
+                                  [--shape dag|cyclic] [--back-probability P] [--seed S]
+"""
+
+import argparse
+import json
+import random
+
+from story import ENDING_SCENE_IDS
+
+# Keys of assetpaths.AVATAR_PATHS and files in resources/images, so generated stories pass storygraph.py
+SPEAKERS = ("BOSSP", "BABEMAX", "BIRB", "CORNELIUS", "TUSK", "LIZZI")
+SETTINGS = ("cafe.jpg", "downtown_chicago.jpg", "jail.png", "manor.jpg", "police_station.png")
+SPEAKER_NAMES = {"BOSSP": "BOSS P", "BABEMAX": "Babe Max", "BIRB": "Birb", "CORNELIUS": "Cornelius",
+                 "TUSK": "Tusk", "LIZZI": "Lizzi"}
+WORDS = (
+    "the", "case", "detective", "night", "clue", "city", "alibi", "witness", "coffee", "motive", "stolen", "manor",
+    "police", "jail", "suspect", "quietly", "never", "again", "maybe", "truth", "lie", "door", "window", "secret",
+)
+SHAPES = ("dag", "cyclic")
+
+
+class StoryShape:
+    """
+    Parameters of a generated story.
+
+    Args:
+        scenes (int): Number of scenes, at least len(ENDING_SCENE_IDS) + 1.
+        branching (tuple[int, int]): Range of choices per scene.
+        dialogues (tuple[int, int]): Range of dialogue lines per scene.
+        words (tuple[int, int]): Range of words per dialogue line.
+        shape (str): 'dag' (choices only lead forward) or 'cyclic' (some lead back).
+        back_probability (float): Chance that a choice after the first leads back, in the cyclic shape.
+        seed (int): Seed of the generator; the same shape and seed give the same file.
+    """
+
+    def __init__(
+        self,
+        scenes: int = 1000,
+        branching: tuple[int, int] = (2, 3),
+        dialogues: tuple[int, int] = (2, 5),
+        words: tuple[int, int] = (6, 24),
+        shape: str = "dag",
+        back_probability: float = 0.2,
+        seed: int = 0,
+    ):
+        if scenes <= len(ENDING_SCENE_IDS):
+            raise ValueError(f"a story needs more than {len(ENDING_SCENE_IDS)} scenes")
+        if shape not in SHAPES:
+            raise ValueError(f"shape must be one of {SHAPES}")
+        if branching[0] < 1 or branching[0] > branching[1]:
+            raise ValueError("branching must be a range of at least one choice")
+        self.scenes = scenes
+        self.branching = branching
+        self.dialogues = dialogues
+        self.words = words
+        self.shape = shape
+        self.back_probability = back_probability
+        self.seed = seed
+
+
+def _scene_id_at(position: int, count: int) -> int:
+    """Returns the scene ID at a story position: the endings take the last positions, every other ID keeps its order."""
+    endings = len(ENDING_SCENE_IDS)
+    if position >= count - endings:
+        return ENDING_SCENE_IDS[position - (count - endings)]
+    scene_id = position + 1
+    # Skip over the ending IDs, which are taken by the last positions
+    for ending in sorted(ENDING_SCENE_IDS):
+        if scene_id >= ending:
+            scene_id += 1
+    return scene_id
+
+
+def _line(rng: random.Random, words: tuple[int, int]) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+    if rng.random() < 0.1:
+        text = f"[Name], {text}"
+    return text.capitalize() + "."
+
+
+def generate_scenes(shape: StoryShape):
+    """
+    Yields the scenes of a story as scene.json dicts, in story order.
+
+    Args:
+        shape (StoryShape): The story parameters.
+    """
+    rng = random.Random(shape.seed)
+    count = shape.scenes
+    first_ending = count - len(ENDING_SCENE_IDS)
+    for position in range(count):
+        speakers = rng.sample(SPEAKERS, rng.randint(1, 2))
+        if position >= first_ending:
+            targets = [_scene_id_at(0, count)]
+        else:
+            targets = []
+            for number in range(rng.randint(*shape.branching)):
+                if number == 0:
+                    # The next scene, so every scene is reachable
+                    target = position + 1
+                elif position + 1 == first_ending:
+                    # The last scene before the endings spreads its choices over them
+                    target = first_ending + number % len(ENDING_SCENE_IDS)
+                elif shape.shape == "cyclic" and rng.random() < shape.back_probability:
+                    target = rng.randrange(0, position + 1)
+                else:
+                    # Forward, at most a few scenes ahead so paths stay long
+                    target = min(position + rng.randint(1, 3), count - 1)
+                targets.append(_scene_id_at(target, count))
+
+        yield {
+            "scene_id": _scene_id_at(position, count),
+            "speakers": ",".join(speakers),
+            "setting": rng.choice(SETTINGS),
+            "dialogues": [
+                {"speaker": SPEAKER_NAMES[rng.choice(speakers)], "text": _line(rng, shape.words)}
+                for _ in range(rng.randint(*shape.dialogues))
+            ],
+            "interactive": {
+                "speaker": SPEAKER_NAMES[speakers[0]],
+                "prompt": _line(rng, shape.words).rstrip(".") + "?",
+                "choices": [
+                    {
+                        "response": _line(rng, (2, 8)),
+                        "effect": [rng.randint(-3, 3) for _ in range(4)],
+                        "sceneReference": target,
+                    }
+                    for target in targets
+                ],
+            },
+        }
+
+
+def write_story(path: str, shape: StoryShape) -> int:
+    """
+    Writes a generated story to a file, streaming one scene at a time.
+
+    Args:
+        path (str): The output file.
+        shape (StoryShape): The story parameters.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as file:
+        separator = "[\n"
+        for scene in generate_scenes(shape):
+            chunk = separator + json.dumps(scene)
+            file.write(chunk)
+            written += len(chunk)
+            separator = ",\n"
+        file.write("\n]\n")
+        written += 3
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic story in the scene.json schema.")
+    parser.add_argument("output")
+    parser.add_argument("--scenes", type=int, default=1000)
+    parser.add_argument("--branching", type=int, nargs=2, default=(2, 3), metavar=("MIN", "MAX"))
+    parser.add_argument("--dialogues", type=int, nargs=2, default=(2, 5), metavar=("MIN", "MAX"))
+    parser.add_argument("--words", type=int, nargs=2, default=(6, 24), metavar=("MIN", "MAX"))
+    parser.add_argument("--shape", choices=SHAPES, default="dag")
+    parser.add_argument("--back-probability", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    story_shape = StoryShape(
+        args.scenes, tuple(args.branching), tuple(args.dialogues), tuple(args.words), args.shape,
+        args.back_probability, args.seed,
+    )
+    size = write_story(args.output, story_shape)
+    print(f"wrote {args.scenes} scenes, {size / 1e6:.1f} MB, to {args.output}")
@@ -0,0 +1,388 @@
+"""
+Story compiler and validator.
+
+Loads a JSON story once, builds its scene graph as flat arrays and reports:
+
+    errors       malformed scenes, duplicate scene IDs, choices leading to missing scenes, speakers without an avatar,
+                 missing background or avatar images, and scenes outside the endings that have no choices
+    unreachable  scenes no playthrough from the first scene can reach
+    cycles       groups of scenes a player can loop through forever
+    trapped      scenes from which no ending can be reached
+
+Choices of the ending scenes are never followed (reaching one shows the results screen), so they are left out of the
+graph analysis. Every pass is linear in the number of scenes and choices.
+
+A story without errors gets its adjacency table written next to it as a sidecar (see ADJ_HEADER); StoryTable in
+engine.py loads it instead of walking every scene, as long as the story's size and mtime still match.
+
+Run from the repository root: python src/storygraph.py [story_path] [--adjacency PATH]
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+from array import array
+
+from assetpaths import AVATAR_PATHS, IMAGE_DIR
+from scenebin import validate_scene
+from story import ENDING_SCENE_IDS, STORY_PATH, SceneIndex
+
+ADJ_SUFFIX = ".adj"
+ADJ_MAGIC = b"MBAJ"
+ADJ_VERSION = 1
+# magic, version, source mtime, source size, scene count, choice count; then scene_ids i32[scenes],
+# choice_start i32[scenes + 1], targets i32[choices], effects i8[4 * choices]
+ADJ_HEADER = struct.Struct("<4sHxxqQII")
+
+
+class StoryGraph:
+    """
+    The scene graph of a story as flat arrays, addressed by slot (position in the story).
+
+    Args:
+        scene_ids (array): Scene ID of every slot.
+        choice_start (array): The choices of slot s are choice_start[s] .. choice_start[s + 1] - 1.
+        targets (array): Slot each choice leads to, or -1 for a scene the story does not have.
+        effects (array): The int8 [ie, sn, ft, pj] effect of every choice, four entries per choice.
+    """
+
+    def __init__(self, scene_ids: array, choice_start: array, targets: array, effects: array):
+        self.scene_ids = scene_ids
+        self.choice_start = choice_start
+        self.targets = targets
+        self.effects = effects
+
+    @classmethod
+    def from_json(cls, scenes_data: list[dict], index: SceneIndex) -> "StoryGraph":
+        """
+        Builds the graph of validated story JSON.
+
+        Args:
+            scenes_data (list[dict]): The scenes, in story order.
+            index (SceneIndex): Slots of their scene IDs.
+        """
+        scene_ids = array("i", (scene_data["scene_id"] for scene_data in scenes_data))
+        choice_start = array("i", [0])
+        targets = array("i")
+        effects = array("b")
+        for scene_data in scenes_data:
+            for choice in scene_data["interactive"]["choices"]:
+                target = choice["sceneReference"]
+                targets.append(index.slot(target) if target in index else -1)
+                effects.extend(choice["effect"])
+            choice_start.append(len(targets))
+        return cls(scene_ids, choice_start, targets, effects)
+
+    def __len__(self) -> int:
+        return len(self.scene_ids)
+
+    def followed_edges(self, ending_slots) -> tuple[array, array]:
+        """
+        Returns the edges a playthrough can take, as (start, targets) arrays in the same layout as the graph.
+
+        Choices of ending scenes and choices leading to missing scenes are left out.
+        """
+        start = array("i", [0])
+        targets = array("i")
+        for slot in range(len(self.scene_ids)):
+            if slot not in ending_slots:
+                for choice in range(self.choice_start[slot], self.choice_start[slot + 1]):
+                    if self.targets[choice] >= 0:
+                        targets.append(self.targets[choice])
+            start.append(len(targets))
+        return start, targets
+
+
+def _reverse(start: array, targets: array) -> tuple[array, array]:
+    """Returns the reversed edges, in the same layout, by counting sort."""
+    count = len(start) - 1
+    reverse_start = array("i", [0]) * (count + 1)
+    for target in targets:
+        reverse_start[target + 1] += 1
+    for slot in range(count):
+        reverse_start[slot + 1] += reverse_start[slot]
+    fill = array("i", reverse_start)
+    sources = array("i", [0]) * len(targets)
+    for slot in range(count):
+        for edge in range(start[slot], start[slot + 1]):
+            target = targets[edge]
+            sources[fill[target]] = slot
+            fill[target] += 1
+    return reverse_start, sources
+
+
+def _mark_reachable(start: array, targets: array, roots) -> bytearray:
+    """Returns a flag per slot, set for every slot reachable from the roots."""
+    seen = bytearray(len(start) - 1)
+    stack = []
+    for root in roots:
+        if not seen[root]:
+            seen[root] = 1
+            stack.append(root)
+    while stack:
+        slot = stack.pop()
+        for edge in range(start[slot], start[slot + 1]):
+            target = targets[edge]
+            if not seen[target]:
+                seen[target] = 1
+                stack.append(target)
+    return seen
+
+
+def find_cycles(start: array, targets: array) -> list[list[int]]:
+    """
+    Returns the slots of every cycle: each strongly connected component with more than one slot or a self-loop.
+
+    Iterative Tarjan, so deep stories do not hit the recursion limit.
+    """
+    count = len(start) - 1
+    order = array("i", [-1]) * count
+    low = array("i", [0]) * count
+    on_stack = bytearray(count)
+    component_stack = []
+    cycles = []
+    counter = 0
+
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        # (slot, next edge to look at)
+        work = [(root, start[root])]
+        order[root] = low[root] = counter
+        counter += 1
+        component_stack.append(root)
+        on_stack[root] = 1
+        while work:
+            slot, edge = work[-1]
+            if edge < start[slot + 1]:
+                work[-1] = (slot, edge + 1)
+                target = targets[edge]
+                if order[target] == -1:
+                    order[target] = low[target] = counter
+                    counter += 1
+                    component_stack.append(target)
+                    on_stack[target] = 1
+                    work.append((target, start[target]))
+                elif on_stack[target] and order[target] < low[slot]:
+                    low[slot] = order[target]
+                continue
+
+            work.pop()
+            if work and low[slot] < low[work[-1][0]]:
+                low[work[-1][0]] = low[slot]
+            if low[slot] == order[slot]:
+                component = []
+                while True:
+                    member = component_stack.pop()
+                    on_stack[member] = 0
+                    component.append(member)
+                    if member == slot:
+                        break
+                if len(component) > 1 or slot in targets[start[slot]:start[slot + 1]]:
+                    cycles.append(component[::-1])
+    return cycles
+
+
+class StoryCheckReport:
+    """
+    Findings of check_story. Scenes are given by scene ID.
+
+    Args:
+        errors (list[str]): Problems that break a playthrough.
+        unreachable (list[int]): Scenes no playthrough reaches.
+        cycles (list[list[int]]): Scenes a player can loop through forever, one list per loop.
+        trapped (list[int]): Scenes from which no ending can be reached.
+        scene_count (int): Number of scenes checked.
+        choice_count (int): Number of choices checked.
+    """
+
+    def __init__(self, errors, unreachable, cycles, trapped, scene_count: int, choice_count: int):
+        self.errors = errors
+        self.unreachable = unreachable
+        self.cycles = cycles
+        self.trapped = trapped
+        self.scene_count = scene_count
+        self.choice_count = choice_count
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __str__(self):
+        lines = [f"scenes: {self.scene_count}  choices: {self.choice_count}  errors: {len(self.errors)}"]
+        lines += [f"  error: {error}" for error in self.errors]
+        if self.unreachable:
+            lines.append(f"unreachable scenes: {self.unreachable}")
+        for cycle in self.cycles:
+            lines.append(f"cycle: {' -> '.join(map(str, cycle + cycle[:1]))}")
+        if self.trapped:
+            lines.append(f"scenes that cannot reach an ending: {self.trapped}")
+        return "\n".join(lines)
+
+
+def check_story(scenes_data, ending_scene_ids=ENDING_SCENE_IDS, image_dir: str = None, avatar_paths: dict = None):
+    """
+    Validates story JSON and analyzes its scene graph.
+
+    Args:
+        scenes_data (list[dict]): The story as loaded from scene.json.
+        ending_scene_ids (Iterable[int], optional): Scenes that end the game (defaults to 19 and 20).
+        image_dir (str, optional): Directory of the background images (defaults to 'resources/images').
+        avatar_paths (dict[str, str], optional): Avatar image of each speaker key (defaults to assetpaths.AVATAR_PATHS).
+
+    Returns:
+        tuple[StoryGraph | None, StoryCheckReport]: The graph of the well-formed scenes (None if the story is not a
+            list) and the findings.
+    """
+    image_dir = IMAGE_DIR if image_dir is None else image_dir
+    avatar_paths = AVATAR_PATHS if avatar_paths is None else avatar_paths
+
+    if not isinstance(scenes_data, list):
+        return None, StoryCheckReport(["story must be a list of scenes"], [], [], [], 0, 0)
+
+    errors = []
+    scenes = []
+    seen_ids = set()
+    for position, scene_data in enumerate(scenes_data):
+        try:
+            validate_scene(scene_data, position)
+        except ValueError as e:
+            errors.append(str(e))
+            continue
+        if scene_data["scene_id"] in seen_ids:
+            errors.append(f"scene {scene_data['scene_id']}: duplicate scene_id")
+            continue
+        seen_ids.add(scene_data["scene_id"])
+        scenes.append(scene_data)
+
+    index = SceneIndex([scene_data["scene_id"] for scene_data in scenes])
+    graph = StoryGraph.from_json(scenes, index)
+    ending_slots = {index.slot(scene_id) for scene_id in ending_scene_ids if scene_id in index}
+
+    # Every distinct file is checked once
+    checked_files: dict[str, bool] = {}
+
+    def exists(path: str) -> bool:
+        found = checked_files.get(path)
+        if found is None:
+            found = checked_files[path] = os.path.isfile(path)
+        return found
+
+    for slot, scene_data in enumerate(scenes):
+        scene_id = scene_data["scene_id"]
+        background = f"{image_dir}/{scene_data['setting']}"
+        if not exists(background):
+            errors.append(f"scene {scene_id}: setting image {background} does not exist")
+        for speaker in scene_data["speakers"].split(","):
+            avatar = avatar_paths.get(speaker)
+            if avatar is None:
+                errors.append(f"scene {scene_id}: speaker {speaker!r} has no avatar")
+            elif not exists(avatar):
+                errors.append(f"scene {scene_id}: avatar image {avatar} does not exist")
+        if slot in ending_slots:
+            continue
+        first = graph.choice_start[slot]
+        if first == graph.choice_start[slot + 1]:
+            errors.append(f"scene {scene_id}: not an ending but has no choices")
+        for number, choice in enumerate(range(first, graph.choice_start[slot + 1]), 1):
+            if graph.targets[choice] < 0:
+                reference = scene_data["interactive"]["choices"][number - 1]["sceneReference"]
+                errors.append(f"scene {scene_id} choice {number} references missing scene {reference}")
+
+    start, targets = graph.followed_edges(ending_slots)
+    scene_ids = graph.scene_ids
+    reachable = _mark_reachable(start, targets, [0] if scenes else [])
+    reaches_ending = _mark_reachable(*_reverse(start, targets), ending_slots)
+
+    report = StoryCheckReport(
+        errors,
+        [scene_ids[slot] for slot in range(len(scenes)) if not reachable[slot]],
+        [[scene_ids[slot] for slot in cycle] for cycle in find_cycles(start, targets)],
+        [scene_ids[slot] for slot in range(len(scenes)) if not reaches_ending[slot]],
+        len(scenes_data),
+        len(graph.targets),
+    )
+    return graph, report
+
+
+def adjacency_path(story_path: str) -> str:
+    return story_path + ADJ_SUFFIX
+
+
+def write_adjacency(path: str, graph: StoryGraph, source_path: str) -> None:
+    """
+    Writes the adjacency table of a story, stamped with the story file's size and mtime.
+
+    Args:
+        path (str): The adjacency file.
+        graph (StoryGraph): The story's graph.
+        source_path (str): The story file the graph was built from.
+    """
+    stat = os.stat(source_path)
+    header = ADJ_HEADER.pack(
+        ADJ_MAGIC, ADJ_VERSION, stat.st_mtime_ns, stat.st_size, len(graph.scene_ids), len(graph.targets)
+    )
+    with open(path + ".tmp", "wb") as file:
+        file.write(header)
+        for column in (graph.scene_ids, graph.choice_start, graph.targets, graph.effects):
+            column.tofile(file)
+    os.replace(path + ".tmp", path)
+
+
+def read_adjacency(path: str, source_path: str):
+    """
+    Loads an adjacency table if it is current for its story file.
+
+    Args:
+        path (str): The adjacency file.
+        source_path (str): The story file it was built from.
+
+    Returns:
+        StoryGraph | None: The graph, or None when the file is missing, stale or malformed.
+    """
+    try:
+        stat = os.stat(source_path)
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) < ADJ_HEADER.size:
+        return None
+    magic, version, mtime_ns, size, scene_count, choice_count = ADJ_HEADER.unpack_from(data)
+    if magic != ADJ_MAGIC or version != ADJ_VERSION or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+        return None
+
+    columns = []
+    offset = ADJ_HEADER.size
+    for typecode, length in (("i", scene_count), ("i", scene_count + 1), ("i", choice_count), ("b", 4 * choice_count)):
+        column = array(typecode)
+        end = offset + length * column.itemsize
+        if end > len(data):
+            return None
+        column.frombytes(data[offset:end])
+        columns.append(column)
+        offset = end
+    return StoryGraph(*columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a story and compile its adjacency table.")
+    parser.add_argument("story", nargs="?", default=STORY_PATH)
+    parser.add_argument("--adjacency", default=None, help="adjacency table to write (defaults to <story>.adj)")
+    args = parser.parse_args()
+
+    with open(args.story, "r") as file:
+        try:
+            scenes_data = json.load(file)
+        except json.JSONDecodeError as e:
+            print(f"error: {args.story} is not valid JSON: {e}")
+            sys.exit(1)
+    graph, report = check_story(scenes_data)
+    print(report)
+    if not report.ok:
+        sys.exit(1)
+    output = adjacency_path(args.story) if args.adjacency is None else args.adjacency
+    write_adjacency(output, graph, args.story)
+    print(f"wrote {output}")
@@ -1,27 +1,110 @@
+import re
+import threading
+from array import array
+
+# Speaker names are stored once in this table; dialogue lines keep only the ID
+_speaker_names: list[str] = []
+_speaker_ids: dict[str, int] = {}
+_speaker_lock = threading.Lock()
+
+
+def speaker_id(name: str) -> int:
+    """
+    Returns the ID of a speaker name, adding it to the speaker table on first use.
+
+    Args:
+        name (str): The speaker name as written in scene.json.
+    """
+    speaker = _speaker_ids.get(name)
+    if speaker is None:
+        with _speaker_lock:
+            speaker = _speaker_ids.get(name)
+            if speaker is None:
+                _speaker_names.append(name)
+                speaker = _speaker_ids[name] = len(_speaker_names) - 1
+    return speaker
+
+
+def speaker_name(speaker: int) -> str:
+    """Returns the speaker name of a speaker ID."""
+    return _speaker_names[speaker]
+
+
+NAME_PLACEHOLDER = re.compile(r"\[(?:Name|NAME)\]")
+
+
+class NameTemplate:
+    """
+    Story text split once, at load time, around its [Name]/[NAME] placeholders.
+
+    Rendering joins the literal parts with the player name, so a line costs one join when it is shown and nothing
+    before.
+    """
+
+    __slots__ = ("_source", "_parts")
+
+    def __init__(self, source: str, parts: tuple[str, ...]):
+        self._source = source
+        self._parts = parts
+
+    def render(self, name: str) -> str:
+        return name.join(self._parts)
+
+    def __str__(self):
+        return self._source
+
+
+def tokenize(text: str):
+    """
+    Returns text as is when it has no name placeholder, otherwise its NameTemplate.
+
+    Args:
+        text (str): Story text as written in scene.json.
+    """
+    if "[" not in text:
+        return text
+    parts = NAME_PLACEHOLDER.split(text)
+    return text if len(parts) == 1 else NameTemplate(text, tuple(parts))
+
+
+def fill_name(text, name: str) -> str:
+    """
+    Renders text returned by tokenize with the player name.
+
+    Args:
+        text (str | NameTemplate): The tokenized text.
+        name (str): The player name.
+    """
+    return text if text.__class__ is str else text.render(name)
+
+
 class Dialogue:
     """
     Class to represent non-interactive dialogue.
     """
 
+    __slots__ = ("_speaker_id", "_text")
+
     def __init__(self, speaker: str, text: str):
-        self._speaker = speaker
-        self._text = text
+        self._speaker_id = speaker_id(speaker)
+        self._text = tokenize(text)
 
     @property
     def speaker(self) -> str:
-        return self._speaker  # Return the backing field
+        return _speaker_names[self._speaker_id]
 
-    @speaker.setter
-    def speaker(self, value: str):
-        self._speaker = value  # Modify the backing field
+    @property
+    def speaker_id(self) -> int:
+        return self._speaker_id
 
     @property
     def text(self) -> str:
-        return self._text  # Return the backing field
+        """The text as written in the story, with its name placeholders."""
+        return str(self._text)
 
-    @text.setter
-    def text(self, value: str):
-        self._text = value  # Modify the backing field
+    def text_for(self, name: str) -> str:
+        """Returns the text with the placeholders filled in with the player name."""
+        return fill_name(self._text, name)
 
 
 class Interactive:
@@ -29,92 +112,75 @@ class Interactive:
     Class to represent interactive, choice-based dialogue.
     """
 
+    __slots__ = ("_speaker_id", "_prompt", "_choices")
+
     class Choice:
         """
         Class to represent a single choice in an interactive dialogue.
 
         Args:
             response (str): The text response of the choice.
-            effect (list[int]): The Myers-Briggs score effect of choosing this option, represented as a list of integers corresponding to [ie, sn, ft, pj].
+            effect (list[int] | array): The Myers-Briggs score effect of choosing this option, represented as a list of integers corresponding to [ie, sn, ft, pj], or a packed int8 block of effects holding it at offset.
             scene_reference (int): The reference to the next scene after this choice is made.
+            offset (int, optional): Position of this choice's effect in a packed effect block.
         """
 
-        def __init__(self, response: str, effect: list[int], scene_reference: int):
-            self._response = response
-            self._effect = effect
+        __slots__ = ("_response", "_effects", "_offset", "_scene_reference")
+
+        def __init__(self, response: str, effect, scene_reference: int, offset: int = 0):
+            self._response = tokenize(response)
+            # Loaders share one int8 block for the effects of a whole story
+            self._effects = effect if isinstance(effect, array) else array("b", effect)
+            self._offset = offset
             self._scene_reference = scene_reference
 
         @property
         def response(self) -> str:
-            return self._response
+            """The response as written in the story, with its name placeholders."""
+            return str(self._response)
 
-        @response.setter
-        def response(self, value: str):
-            self._response = value
+        def response_for(self, name: str) -> str:
+            """Returns the response with the placeholders filled in with the player name."""
+            return fill_name(self._response, name)
 
         @property
         def scene_reference(self) -> int:
             return self._scene_reference
 
-        @scene_reference.setter
-        def scene_reference(self, value: int):
-            self._scene_reference = value
-
         @property
-        def effect(self) -> list[int]:
-            return self._effect
+        def effect(self) -> array:
+            return self._effects[self._offset:self._offset + 4]
 
-        @effect.setter
-        def effect(self, value: list[int]):
-            self._effect = value
-            
         def __str__(self):
-            effect_str = ", ".join(map(str, self._effect))
-            return f"Response: {self._response}, Effect: [{effect_str}], Scene Reference: {self._scene_reference}"
+            effect_str = ", ".join(map(str, self.effect))
+            return f"Response: {self.response}, Effect: [{effect_str}], Scene Reference: {self._scene_reference}"
 
-    def __init__(self, speaker: str, prompt: str, choices: list[dict]):
+    def __init__(self, speaker: str, prompt: str, choices: list[Choice]):
         """
         Initializes the Interactive object with a speaker, a prompt, and choices.
 
         Args:
             speaker (str): The character who is speaking.
             prompt (str): The prompt presented to the player.
-            choices (list[dict]): A list of dictionaries, each representing a choice with 'response', 'effect', and 'scene_reference'.
+            choices (list[Choice]): The choices the player can pick from.
         """
-        self._speaker = speaker
-        self._prompt = prompt
-        # Initialize the choices attribute as an empty list
-        self._choices = choices
-        # for choice in choices:
-        #     # For each choice in the list, unpack its keys and values as arguments to the Choice class constructor
-        #     choice_obj = Interactive.Choice(
-        #         response=choice["response"],
-        #         effect=choice["effect"],
-        #         scene_reference=choice["scene_reference"],
-        #     )
-        #     # Append the newly created Choice object to the choices attribute
-        #     self.choices.append(choice_obj)
+        self._speaker_id = speaker_id(speaker)
+        self._prompt = tokenize(prompt)
+        self._choices = tuple(choices)
 
     @property
-    def choices(self) -> list[Choice]:
+    def choices(self) -> tuple[Choice, ...]:
         return self._choices
 
-    @choices.setter
-    def choices(self, value: list):
-        self._choices = value
-
     @property
     def speaker(self) -> str:
-        return self._speaker
-
-    @speaker.setter
-    def speaker(self, value: str):
-        self._speaker = value
+        return _speaker_names[self._speaker_id]
 
     @property
     def prompt(self) -> str:
-        return self._prompt
+        """The prompt as written in the story, with its name placeholders."""
+        return str(self._prompt)
 
-    @prompt.setter
-    def prompt(self, value: str):
-        self._prompt = value
+    def prompt_for(self, name: str) -> str:
+        """Returns the prompt with the placeholders filled in with the player name."""
+        return fill_name(self._prompt, name)
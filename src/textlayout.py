@@ -0,0 +1,173 @@
+import textwrap
+from collections import OrderedDict
+
+import pygame
+
+
+class FontRegistry:
+    """
+    Loads each font once and hands out the shared pygame font object afterwards.
+    """
+
+    def __init__(self):
+        self._fonts: dict[tuple, pygame.font.Font] = {}
+
+    def get(self, name: str = None, size: int = 27, sysfont: bool = False) -> pygame.font.Font:
+        """
+        Returns the font with the given name and size.
+
+        Args:
+            name (str, optional): Font file path or, with sysfont, a system font name. None selects pygame's default font.
+            size (int, optional): Point size (defaults to 27).
+            sysfont (bool, optional): Look the name up as a system font (defaults to False).
+        """
+        key = (name, size, sysfont)
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size) if sysfont else pygame.font.Font(name, size)
+            self._fonts[key] = font
+        return font
+
+
+class TextLayout:
+    """
+    Pre-rendered wrapped text: line surfaces with their offsets from the text origin, and the measured height.
+    """
+
+    __slots__ = ("lines", "height")
+
+    def __init__(self, lines: list[tuple[pygame.Surface, tuple[int, int]]], height: int):
+        self.lines = lines
+        self.height = height
+
+    def blit(self, surface: pygame.Surface, pos: tuple[int, int]) -> None:
+        """Draws the text with its origin at pos."""
+        x, y = pos
+        surface.blits([(line, (x + dx, y + dy)) for line, (dx, dy) in self.lines], False)
+
+
+class TextLayoutCache:
+    """
+    Bounded cache of wrapped-text layouts keyed on the text, font, wrap width and colors.
+
+    Keys hold the font object itself (fonts hash by identity), not id(font): the reference keeps the font alive, so a
+    freed font's id cannot be reused by another font and hit its layouts.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Constructor for the layout cache
+
+        Args:
+            max_entries (int, optional): Number of layouts to keep before evicting the least recently used (defaults to 256).
+        """
+        self._layouts: OrderedDict[tuple, TextLayout] = OrderedDict()
+        self._max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def wrap_chars(self, text: str, font: pygame.font.Font, max_chars: int, color) -> TextLayout:
+        """
+        Returns the layout of text wrapped at a number of characters, one rendered surface per line.
+
+        Args:
+            text (str): The text to lay out.
+            font (pygame.font.Font): The font to render with (from the font registry).
+            max_chars (int): Wrap width in characters.
+            color: Text color.
+        """
+        key = ("chars", text, font, max_chars, tuple(color))
+        layout = self._lookup(key)
+        if layout is None:
+            lines = []
+            y = 0
+            for line in textwrap.wrap(text, width=max_chars):
+                lines.append((font.render(line, True, color), (0, y)))
+                y += font.get_linesize()  # Move to the next line
+            layout = self._store(key, TextLayout(lines, y))
+        return layout
+
+    def wrap_words(self, text: str, font: pygame.font.Font, x: int, max_width: int, color, bg_color=None) -> TextLayout:
+        """
+        Returns the layout of text flowed word by word until a word would cross max_width.
+
+        Words are rendered separately so a background color highlights the words but not the gaps between them,
+        then composited into one surface per line.
+
+        Args:
+            text (str): The text to lay out.
+            font (pygame.font.Font): The font to render with (from the font registry).
+            x (int): Screen x position of the text, since max_width is a screen coordinate.
+            max_width (int): Screen x position no word may cross.
+            color: Text color.
+            bg_color (optional): Background color behind each word.
+        """
+        key = ("words", text, font, x, max_width, tuple(color), bg_color and tuple(bg_color))
+        layout = self._lookup(key)
+        if layout is None:
+            layout = self._store(key, self._flow_words(text, font, x, max_width, color, bg_color))
+        return layout
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, hit rate and entry count.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._layouts),
+        }
+
+    def clear(self) -> None:
+        self._layouts.clear()
+
+    @staticmethod
+    def _flow_words(text, font, start_x, max_width, color, bg_color) -> TextLayout:
+        space_width, line_height = font.size(' ')  # Width of a space and the height of a line of text.
+        rows: list[list[tuple[pygame.Surface, int]]] = [[]]
+        x = start_x
+        for word in text.split(' '):
+            word_surface = font.render(word, True, color, bg_color)
+            word_width = word_surface.get_width()
+            if x + word_width > max_width:
+                x = start_x  # Reset x to start of line.
+                rows.append([])  # Start on new line.
+            rows[-1].append((word_surface, x - start_x))
+            x += word_width + space_width  # Move x to start of next word.
+
+        lines = []
+        for row_index, row in enumerate(rows):
+            if not row:
+                continue
+            width = max(dx + word.get_width() for word, dx in row)
+            height = max(word.get_height() for word, _ in row)
+            line = pygame.Surface((width, height), pygame.SRCALPHA)
+            # Words never overlap, so a max blend copies them including their alpha
+            line.blits([(word, (dx, 0), None, pygame.BLEND_RGBA_MAX) for word, dx in row], False)
+            lines.append((line, (0, row_index * line_height)))
+        return TextLayout(lines, len(rows) * line_height)
+
+    def _lookup(self, key: tuple):
+        layout = self._layouts.get(key)
+        if layout is None:
+            self.misses += 1
+        else:
+            self._layouts.move_to_end(key)
+            self.hits += 1
+        return layout
+
+    def _store(self, key: tuple, layout: TextLayout) -> TextLayout:
+        self._layouts[key] = layout
+        if len(self._layouts) > self._max_entries:
+            self._layouts.popitem(last=False)
+        return layout
+
+
+# Shared by every renderer in the process
+fonts = FontRegistry()
+text_layouts = TextLayoutCache()
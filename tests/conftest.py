@@ -0,0 +1,18 @@
+"""
+Shared test setup: puts src/ on the import path and runs every test from the repository root, which the game reads
+resources/ relative to.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch) -> str:
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
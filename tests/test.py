@@ -1,5 +0,0 @@
-import pytest 
-from gamelogic import Game
-
-
-
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+from concurrent.futures import wait
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+import pytest  # noqa: E402
+
+import gui  # noqa: E402
+from assetbuild import BUILD_VERSION, MANIFEST_NAME, BakedImageStore, build_assets  # noqa: E402
+from assets import AVATAR_PATHS, AssetCache, AssetPrefetcher, background_path, scene_assets  # noqa: E402
+from story import load_story  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def screen():
+    pygame.display.init()
+    surface = pygame.display.set_mode((gui.screen_width, gui.screen_height))
+    yield surface
+    pygame.display.quit()
+
+
+def baseline_layer(scene) -> pygame.Surface:
+    """Draws a scene the way the game did before the asset cache: raw images blitted over the white fill."""
+    layer = pygame.Surface((gui.screen_width, gui.screen_height)).convert()
+    layer.fill(gui.WHITE)
+    layer.blit(pygame.image.load(background_path(scene.setting)), (0, 0))
+    avatars = [pygame.image.load(AVATAR_PATHS[speaker]) for speaker in scene.speakers]
+    x = (gui.screen_width - sum(avatar.get_width() for avatar in avatars) - 20 * (len(avatars) - 1)) // 2
+    for counter, avatar in enumerate(avatars):
+        if counter % 2 == 1:
+            avatar = pygame.transform.flip(avatar, True, False)
+        layer.blit(avatar, (x, gui.screen_height - avatar.get_height()))
+        x += avatar.get_width() + 20
+    return layer
+
+
+def assert_scenes_match_baseline(screen, monkeypatch, cache: AssetCache):
+    monkeypatch.setattr(gui, "asset_cache", cache)
+    renderer = gui.SceneRenderer(screen)
+    for scene in load_story().scenes:
+        expected = pygame.image.tobytes(baseline_layer(scene), "RGB")
+        assert pygame.image.tobytes(renderer.scene_layer(scene), "RGB") == expected, scene.setting
+
+
+def test_scene_layers_match_the_baseline_render(screen, monkeypatch, tmp_path):
+    # An empty baked cache, so every image is decoded from its source file
+    assert_scenes_match_baseline(screen, monkeypatch, AssetCache(baked=BakedImageStore(str(tmp_path))))
+
+
+def test_see_through_background_pixels_show_the_white_fill(screen, tmp_path):
+    cache = AssetCache(baked=BakedImageStore(str(tmp_path)))
+    jail = cache.get(background_path("jail.png"))
+    assert not jail.get_flags() & pygame.SRCALPHA
+    source = pygame.image.load(background_path("jail.png"))
+    transparent = next(
+        (x, y) for y in range(source.get_height()) for x in range(source.get_width()) if source.get_at((x, y)).a == 0
+    )
+    assert tuple(jail.get_at(transparent))[:3] == gui.WHITE
+
+
+def test_baked_scene_layers_match_the_baseline_render(screen, monkeypatch, tmp_path):
+    build_assets(cache_dir=str(tmp_path))
+    store = BakedImageStore(str(tmp_path))
+    assert store.load(background_path("jail.png")) is not None
+    assert_scenes_match_baseline(screen, monkeypatch, AssetCache(baked=store))
+
+
+def test_entries_of_an_older_build_are_not_used(tmp_path):
+    manifest = build_assets(cache_dir=str(tmp_path))
+    for entry in manifest.values():
+        entry["version"] = BUILD_VERSION - 1
+    with open(tmp_path / MANIFEST_NAME, "w") as file:
+        json.dump(manifest, file)
+    assert BakedImageStore(str(tmp_path)).load(background_path("jail.png")) is None
+
+
+@pytest.fixture
+def story():
+    return load_story()
+
+
+@pytest.fixture
+def cache(tmp_path) -> AssetCache:
+    return AssetCache(baked=BakedImageStore(str(tmp_path)))
+
+
+@pytest.fixture
+def prefetcher(cache):
+    prefetcher = AssetPrefetcher(cache)
+    yield prefetcher
+    prefetcher.shutdown()
+
+
+def gate_decodes(monkeypatch, cache: AssetCache) -> threading.Event:
+    """Makes every decode wait until the returned event is set."""
+    gate = threading.Event()
+    decode = cache.decode
+
+    def gated(path):
+        gate.wait(5)
+        return decode(path)
+
+    monkeypatch.setattr(cache, "decode", gated)
+    return gate
+
+
+def wait_for_decodes(prefetcher: AssetPrefetcher) -> None:
+    with prefetcher._lock:
+        futures = list(prefetcher._pending.values())
+    wait(futures)
+
+
+def test_a_prefetched_scene_is_a_hit(screen, story, cache, prefetcher):
+    prefetcher.prefetch_next(story, story.scene_by_id(1))
+    wait_for_decodes(prefetcher)
+    prefetcher.ensure_scene(story.scene_by_id(2))
+    assert (prefetcher.hits, prefetcher.stalls, prefetcher.misses) == (2, 0, 0)
+    assert all(key in cache for key in scene_assets(story.scene_by_id(2)))
+
+
+def test_a_decode_still_running_is_waited_for(screen, monkeypatch, story, cache, prefetcher):
+    gate = gate_decodes(monkeypatch, cache)
+    prefetcher.prefetch_next(story, story.scene_by_id(1))
+    threading.Timer(0.05, gate.set).start()
+    prefetcher.ensure_scene(story.scene_by_id(2))
+    # Both decodes run together, so the second may be done by the time the first one was waited for
+    assert prefetcher.stalls >= 1 and prefetcher.hits + prefetcher.stalls == 2 and prefetcher.misses == 0
+    assert prefetcher.stall_ms > 0
+    assert prefetcher.stats()["pending"] == 0
+
+
+def test_a_scene_never_prefetched_is_a_miss(screen, story, cache, prefetcher):
+    scene = story.scene_by_id(8)
+    prefetcher.ensure_scene(scene)
+    assert (prefetcher.hits, prefetcher.stalls, prefetcher.misses) == (0, 0, 3)
+    assert all(key in cache for key in scene_assets(scene))
+    prefetcher.ensure_scene(scene)
+    assert prefetcher.hits == 3
+
+
+def test_decodes_no_successor_uses_are_dropped(screen, monkeypatch, story, cache, prefetcher):
+    gate = gate_decodes(monkeypatch, cache)
+    # Scene 2 (downtown, boss) is next from scene 1; scene 3 (cafe, Max) is next from scene 30
+    prefetcher.prefetch_next(story, story.scene_by_id(1))
+    prefetcher.prefetch_next(story, story.scene_by_id(30))
+    with prefetcher._lock:
+        pending = set(prefetcher._pending)
+    assert pending == {(path, alpha) for path, alpha, _ in scene_assets(story.scene_by_id(3))}
+    assert prefetcher.stats()["dropped"] == 2
+    gate.set()
+
+
+def test_finished_decodes_count_against_the_cache_budget(screen, story, tmp_path):
+    # Room for a single surface
+    cache = AssetCache(budget_bytes=1, baked=BakedImageStore(str(tmp_path)))
+    prefetcher = AssetPrefetcher(cache)
+    prefetcher.prefetch_next(story, story.scene_by_id(2))
+    wait_for_decodes(prefetcher)
+    # Scene 3 uses the same images as scene 30, so the finished decodes move into the cache
+    prefetcher.prefetch_next(story, story.scene_by_id(30))
+    assert (cache.stats()["entries"], cache.evictions) == (1, 1)
+    prefetcher.shutdown()
+
+
+def test_a_failed_decode_is_loaded_again_on_the_render_thread(screen, monkeypatch, story, cache, prefetcher):
+    decode = cache.decode
+    failures = []
+
+    def flaky(path):
+        if not failures:
+            failures.append(path)
+            raise pygame.error("truncated file")
+        return decode(path)
+
+    monkeypatch.setattr(cache, "decode", flaky)
+    prefetcher.prefetch_next(story, story.scene_by_id(1))
+    wait_for_decodes(prefetcher)
+    prefetcher.ensure_scene(story.scene_by_id(2))
+    assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    assert all(key in cache for key in scene_assets(story.scene_by_id(2)))
+
+
+def test_an_image_that_cannot_be_loaded_ends_the_game(screen, monkeypatch, story, cache, prefetcher, capsys):
+    def missing(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(cache, "decode", missing)
+    prefetcher.prefetch_next(story, story.scene_by_id(1))
+    wait_for_decodes(prefetcher)
+    # prefetch_next keeps failed decodes out of the cache
+    prefetcher.prefetch_next(story, story.scene_by_id(30))
+    with pytest.raises(FileNotFoundError):
+        prefetcher.ensure_scene(story.scene_by_id(2))
+    with pytest.raises(SystemExit):
+        gui.ensure_scene_images(prefetcher, story.scene_by_id(2))
+    assert "Error loading image" in capsys.readouterr().out
@@ -0,0 +1,73 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+import pytest  # noqa: E402
+
+from dashboard import MyersBriggsDisplay, gradient_bar  # noqa: E402
+from engine import mbti_type  # noqa: E402
+from game import Game  # noqa: E402
+from textlayout import fonts  # noqa: E402
+
+BACKGROUND = (25, 20, 20)
+
+
+def baseline_spectrum(screen, position, score, text, color, font):
+    """draw_spectrum as it was before the cached gradients: one line per row of the bar."""
+    start_color = (68, 85, 90)
+    for ratio in range(100):
+        pygame.draw.line(
+            screen,
+            [start_color[j] + ((float(ratio) / 100) * (color[j] - start_color[j])) for j in range(3)],
+            (100, position + ratio),
+            (700, position + ratio),
+            1,
+        )
+    pygame.draw.circle(screen, (0, 255, 0), (int(400 + (score * 30)), position + 50), 15)
+    screen.blit(font.render(f"{text}: {score}", True, (255, 255, 255)), (10, position - 10))
+
+
+def baseline_draw(screen, game: Game, font):
+    """MyersBriggsDisplay.draw as it was before the static layer: everything drawn straight to the screen."""
+    screen.fill(BACKGROUND)
+    screen.blit(font.render("Detective Incognito Revealed!", True, (0, 206, 209)), (200, 20))
+    for (position, text, color), score in zip(MyersBriggsDisplay.SPECTRUMS, game.mb_score):
+        baseline_spectrum(screen, position, score, text, color, font)
+    result_text = fonts.get('Comic Sans MS', 48, sysfont=True).render(
+        mbti_type(game.mb_score), True, (255, 215, 0)
+    )
+    screen.blit(result_text, result_text.get_rect(center=(400, 550)))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    yield
+    pygame.display.quit()
+
+
+@pytest.mark.parametrize("scores", [(5, -3, 2, -7), (0, 0, 0, 0), (10, 10, -10, -10), (-10, 1, -1, 10)])
+def test_frames_match_the_uncached_drawing(scores):
+    game = Game(*scores)
+    dashboard = MyersBriggsDisplay(game)
+    # The first frame renders the static layer, the second is drawn from it
+    for _ in range(2):
+        dashboard.draw(BACKGROUND)
+        actual = pygame.image.tobytes(dashboard.screen, "RGB")
+        baseline_draw(dashboard.screen, game, dashboard.font)
+        assert actual == pygame.image.tobytes(dashboard.screen, "RGB")
+
+
+@pytest.mark.parametrize("color", [spectrum[2] for spectrum in MyersBriggsDisplay.SPECTRUMS] + [(0, 0, 0)])
+def test_gradient_bars_match_the_per_row_fill(color):
+    expected = pygame.Surface((800, 200))
+    expected.fill(BACKGROUND)
+    for ratio in range(100):
+        row_color = [(68, 85, 90)[j] + ((float(ratio) / 100) * (color[j] - (68, 85, 90)[j])) for j in range(3)]
+        pygame.draw.line(expected, row_color, (100, 50 + ratio), (700, 50 + ratio), 1)
+    actual = pygame.Surface((800, 200))
+    actual.fill(BACKGROUND)
+    actual.blit(gradient_bar(color), (100, 50))
+    assert pygame.image.tobytes(actual, "RGB") == pygame.image.tobytes(expected, "RGB")
+    assert gradient_bar(color) is gradient_bar(color)
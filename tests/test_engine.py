@@ -0,0 +1,133 @@
+import json
+import random
+
+import pytest
+
+import engine
+from engine import Engine, StoryTable, apply_effect, mbti_type
+from game import Game
+from story import ENDING_SCENE_IDS, STORY_PATH, load_story
+from storygraph import adjacency_path, check_story, write_adjacency
+
+
+def baseline_mbti(mb_score) -> str:
+    """The type as MyersBriggsDisplay.getMBTI computed it before the engine; a score of 0 counts as the first letter."""
+    pairs = ("IE", "SN", "FT", "PJ")
+    return "".join(second if score > 0 else first for score, (first, second) in zip(mb_score, pairs))
+
+
+def random_script(game: Game, rng: random.Random) -> list[int]:
+    """Plays random decisions through Game until an ending, and returns them."""
+    decisions = []
+    while game.get_current_scene_id() not in ENDING_SCENE_IDS:
+        decision = rng.randint(1, len(game.current_scene.interactive.choices))
+        game.process_scene(decision)
+        decisions.append(decision)
+    return decisions
+
+
+def play_through_game(decisions, scores=(0, 0, 0, 0), scene_id: int = None) -> tuple[Game, list[int]]:
+    game = Game(*scores)
+    if scene_id is not None:
+        game.current_scene_id = scene_id
+    path = [game.get_current_scene_id()]
+    for decision in decisions:
+        game.process_scene(decision)
+        path.append(game.get_current_scene_id())
+    return game, path
+
+
+@pytest.fixture(scope="module")
+def scripts() -> list[list[int]]:
+    rng = random.Random(7)
+    return [random_script(Game(), rng) for _ in range(200)]
+
+
+def test_play_matches_game(scripts):
+    engine_ = Engine()
+    for decisions in scripts:
+        game, path = play_through_game(decisions)
+        result = engine_.play(decisions)
+        assert list(result.mb_score) == game.mb_score
+        assert list(result.path) == path
+        assert mbti_type(result.mb_score) == baseline_mbti(game.mb_score)
+
+
+def test_play_batch_matches_game(scripts):
+    results = list(Engine().play_batch(scripts, record_path=True))
+    assert len(results) == len(scripts)
+    for decisions, result in zip(scripts, results):
+        game, path = play_through_game(decisions)
+        assert (list(result.mb_score), list(result.path)) == (game.mb_score, path)
+    assert all(result.path == () for result in Engine().play_batch(scripts[:3]))
+
+
+def test_play_game_starts_from_the_session_without_changing_it():
+    game = Game(9, -9, 10, -10)
+    game.process_scene(1)
+    before = (game.get_current_scene_id(), list(game.mb_score))
+    start = Game(*game.mb_score)
+    start.current_scene_id = game.get_current_scene_id()
+    decisions = random_script(start, random.Random(3))
+    result = Engine.for_game(game).play_game(game, decisions)
+    assert (game.get_current_scene_id(), game.mb_score) == before
+
+    expected, path = play_through_game(decisions, tuple(game.mb_score), game.get_current_scene_id())
+    assert (list(result.mb_score), list(result.path)) == (expected.mb_score, path)
+
+
+@pytest.mark.parametrize("score", range(-10, 11))
+@pytest.mark.parametrize("effect", [-20, -11, -3, -1, 0, 1, 3, 11, 20])
+def test_apply_effect_clamps_like_update_scores(score, effect):
+    game = Game(score, 0, 0, 0)
+    game.update_scores(type("Choice", (), {"effect": [effect, 0, 0, 0]})())
+    assert apply_effect(score, effect) == game.mb_score[0]
+
+
+def test_a_table_from_the_adjacency_sidecar_matches_the_walked_one(tmp_path, monkeypatch, scripts):
+    path = tmp_path / "scene.json"
+    path.write_bytes(open(STORY_PATH, "rb").read())
+    story = load_story(str(path))
+    # No sidecar yet, so the scenes are walked
+    walked = StoryTable(story)
+
+    with open(path, "r") as file:
+        graph, report = check_story(json.load(file))
+    assert report.ok
+    write_adjacency(adjacency_path(str(path)), graph, str(path))
+    loaded_graphs = []
+    read_adjacency = engine.read_adjacency
+
+    def spy(*args):
+        loaded_graphs.append(read_adjacency(*args))
+        return loaded_graphs[-1]
+
+    monkeypatch.setattr(engine, "read_adjacency", spy)
+    loaded = StoryTable(story)
+    assert loaded_graphs[0] is not None
+    for column in ("scene_ids", "choice_start", "targets", "effects"):
+        assert list(getattr(loaded, column)) == list(getattr(walked, column)), column
+
+    engine_ = Engine(story)
+    assert engine_.table.scene_ids is loaded_graphs[1].scene_ids
+    for decisions in scripts[:20]:
+        assert list(engine_.play(decisions).mb_score) == play_through_game(decisions)[0].mb_score
+
+
+def test_a_decision_that_is_not_a_choice_is_rejected():
+    engine_ = Engine()
+    for decision in (0, 3, -1):
+        with pytest.raises(ValueError, match=f"scene 1 has no choice {decision}"):
+            engine_.play([decision])
+
+
+def test_a_dangling_reference_is_rejected(tmp_path):
+    with open(STORY_PATH, "r") as file:
+        scenes_data = json.load(file)
+    # Choices of an ending are never followed in a game, so the story loads with a dangling one there
+    ending = next(scene_data for scene_data in scenes_data if scene_data["scene_id"] == ENDING_SCENE_IDS[0])
+    ending["interactive"]["choices"][0]["sceneReference"] = 999
+    path = tmp_path / "scene.json"
+    path.write_text(json.dumps(scenes_data))
+    with pytest.raises(ValueError, match=f"scene {ENDING_SCENE_IDS[0]} choice 1 leads to a missing scene"):
+        Engine(load_story(str(path))).play([1], start_scene_id=ENDING_SCENE_IDS[0])
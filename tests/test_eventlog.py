@@ -0,0 +1,173 @@
+import logging
+import os
+import struct
+import threading
+
+import pytest
+
+import eventlog
+from eventlog import FILE_HEADER, MAGIC, ChoiceLog, read_events, replay
+from game import Game
+from snapshot import read_snapshot, write_snapshot
+
+
+def play(log: ChoiceLog, session_id: int, decisions) -> Game:
+    """Plays decisions in a Game, logging each one, and returns the game; decisions past a scene's last choice take it."""
+    game = Game()
+    for decision in decisions:
+        decision = min(decision, len(game.current_scene.interactive.choices))
+        log.record(session_id, game.get_current_scene_id(), decision)
+        game.process_scene(decision)
+    return game
+
+
+def test_replay_rebuilds_sessions(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        first = play(log, 1, [1, 2, 1])
+        second = play(log, 2, [2, 2])
+        play(log, 3, [1])
+        log.end(3, first.get_current_scene_id())
+    states = replay(path, path + ".snapshot")
+    assert set(states) == {1, 2}
+    assert (states[1].scene_id, list(states[1].mb_score)) == (first.get_current_scene_id(), first.mb_score)
+    assert (states[2].scene_id, list(states[2].mb_score)) == (second.get_current_scene_id(), second.mb_score)
+
+
+def test_replay_rejects_events_that_do_not_follow_the_story(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        log.record(1, 12345, 1)
+    with pytest.raises(ValueError):
+        replay(path)
+
+
+def test_a_torn_last_event_is_cut_off(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        play(log, 1, [1, 1])
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02\x03")
+    assert len(list(read_events(path))) == 2
+    with ChoiceLog(path, compact_every=0) as log:
+        game = play(log, 2, [2])
+    assert [event[0] for event in read_events(path)] == [0, 1, 2]
+    assert replay(path)[2].scene_id == game.get_current_scene_id()
+
+
+def test_compaction_folds_the_log_into_the_snapshot(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        game = play(log, 1, [1, 2])
+        assert log.compact() == 1
+        assert log.sequence == 2
+        assert list(read_events(path)) == []
+        log.record(1, game.get_current_scene_id(), 1)
+        game.process_scene(1)
+    sequence, sessions = read_snapshot(path + ".snapshot")
+    assert sequence == 2 and 1 in sessions
+    state = replay(path, path + ".snapshot")[1]
+    assert (state.scene_id, list(state.mb_score)) == (game.get_current_scene_id(), game.mb_score)
+
+
+def test_a_new_log_continues_after_the_snapshot(tmp_path):
+    path = str(tmp_path / "choices.log")
+    game = Game()
+    write_snapshot(path + ".snapshot", {1: (game.get_current_scene_id(), (0, 0, 0, 0), "Detective")}, 1500)
+    with ChoiceLog(path, compact_every=0) as log:
+        assert log.sequence == 1500
+        log.record(1, game.get_current_scene_id(), 1)
+    game.process_scene(1)
+    assert replay(path, path + ".snapshot")[1].scene_id == game.get_current_scene_id()
+
+
+def test_a_log_ending_before_the_snapshot_is_refused(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        play(log, 1, [1])
+    write_snapshot(path + ".snapshot", {}, 1500)
+    with pytest.raises(ValueError):
+        ChoiceLog(path)
+    assert os.path.getsize(path) > 0
+
+
+def test_started_sessions_keep_their_name_through_compaction(tmp_path):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        log.start(1, Game().get_current_scene_id(), "Detective")
+        log.start(2, Game().get_current_scene_id(), "Ève")
+        play(log, 2, [1])
+        log.compact()
+    states = replay(path, path + ".snapshot")
+    assert {session_id: state.name for session_id, state in states.items()} == {1: "Detective", 2: "Ève"}
+    assert states[1].scene_id == Game().get_current_scene_id()
+
+
+def test_version_1_logs_are_still_read(tmp_path):
+    path = str(tmp_path / "choices.log")
+    scene_id = Game().get_current_scene_id()
+    with open(path, "wb") as file:
+        file.write(FILE_HEADER.pack(MAGIC, 1, 0) + struct.pack("<IiB3xd", 7, scene_id, 1, 0.0))
+    assert [event[1:4] for event in read_events(path)] == [(7, scene_id, 1)]
+    with ChoiceLog(path, compact_every=0) as log:
+        log.start(8, scene_id, "New")
+    assert set(replay(path)) == {7, 8}
+
+
+def test_compaction_does_not_block_recording(tmp_path, monkeypatch):
+    path = str(tmp_path / "choices.log")
+    entered, release = threading.Event(), threading.Event()
+    slow_replay = eventlog.replay
+
+    def blocked_replay(*args, **kwargs):
+        entered.set()
+        release.wait(5)
+        return slow_replay(*args, **kwargs)
+
+    monkeypatch.setattr(eventlog, "replay", blocked_replay)
+    with ChoiceLog(path, compact_every=4) as log:
+        game = play(log, 1, [1, 1, 1, 1])
+        # The fourth event started a compaction, which is now replaying; these must not wait for it
+        assert entered.wait(5)
+        for _ in range(3):
+            log.record(1, game.get_current_scene_id(), 1)
+            game.process_scene(1)
+        release.set()
+        log.wait_for_compaction()
+        assert log.sequence == 7
+        assert read_snapshot(path + ".snapshot")[0] == 4
+        assert [event[0] for event in read_events(path)] == [4, 5, 6]
+    state = replay(path, path + ".snapshot")[1]
+    assert (state.scene_id, list(state.mb_score)) == (game.get_current_scene_id(), game.mb_score)
+
+
+def test_a_failed_compaction_backs_off(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "choices.log")
+    attempts = []
+
+    def failing_write(*args, **kwargs):
+        attempts.append(args)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(eventlog, "write_snapshot", failing_write)
+    with ChoiceLog(path, compact_every=2) as log, caplog.at_level(logging.ERROR, logger="eventlog"):
+        game = Game()
+        for _ in range(5):
+            log.record(1, game.get_current_scene_id(), 1)
+            game.process_scene(1)
+            log.wait_for_compaction()
+        assert len(attempts) == 2
+        assert "compaction failed" in caplog.text
+    assert len(list(read_events(path))) == 5
+
+
+@pytest.mark.parametrize(
+    "session_id, scene_id, choice", [(-1, 1, 1), (2 ** 32, 1, 1), (1, 2 ** 31, 1), (1, 1, 256), (1, 1, -1)]
+)
+def test_decisions_that_do_not_fit_are_rejected(tmp_path, session_id, scene_id, choice):
+    path = str(tmp_path / "choices.log")
+    with ChoiceLog(path, compact_every=0) as log:
+        log.record(1, 1, 1)
+        with pytest.raises(ValueError, match="cannot be logged"):
+            log.record(session_id, scene_id, choice)
+    assert len(list(read_events(path))) == 1
@@ -0,0 +1,51 @@
+import pytest
+
+from game import Game
+from story import ENDING_SCENE_IDS
+from text import Interactive
+
+
+def test_game_starts_in_first_scene():
+    game = Game()
+    assert game.get_current_scene_id() == game.scenes[0].scene_id
+    assert game.mb_score == [0, 0, 0, 0]
+
+
+def test_process_scene_applies_effect_and_moves_on():
+    game = Game()
+    choice = game.current_scene.interactive.choices[0]
+    game.process_scene(1)
+    assert game.mb_score == list(choice.effect)
+    assert game.get_current_scene_id() == choice.scene_reference
+
+
+def test_scores_are_clamped():
+    game = Game(ie_score=10, sn_score=-10, tf_score=10, jp_score=-10)
+    game.update_scores(Interactive.Choice("", [5, -5, 5, -5], 1))
+    assert game.mb_score == [10, -10, 10, -10]
+
+
+def test_always_taking_the_first_choice_reaches_an_ending():
+    game = Game()
+    for _ in range(100):
+        if game.get_current_scene_id() in ENDING_SCENE_IDS:
+            break
+        game.process_scene(1)
+    assert game.get_current_scene_id() in ENDING_SCENE_IDS
+
+
+@pytest.mark.parametrize("name", ["MC", "Detective"])
+def test_replace_name_in_json(name):
+    data = {"text": "Hi [Name]!", "nested": [{"prompt": "[NAME]?"}]}
+    Game.replace_name_in_json(data, name)
+    assert data == {"text": f"Hi {name}!", "nested": [{"prompt": f"{name}?"}]}
+
+
+def test_process_scene_does_not_look_up_the_next_scene_without_debug_logging(monkeypatch):
+    game = Game()
+    game.current_scene
+    looked_up = []
+    scene_by_id = game.story.scene_by_id
+    monkeypatch.setattr(game.story, "scene_by_id", lambda scene_id: looked_up.append(scene_id) or scene_by_id(scene_id))
+    game.process_scene(1)
+    assert looked_up == [game.scenes[0].scene_id]
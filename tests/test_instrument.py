@@ -0,0 +1,93 @@
+import json
+import sys
+import threading
+import time
+
+from instrument import FRAME_SPAN, IDLE_SPAN, Profiler
+
+
+def test_a_disabled_profiler_records_nothing():
+    profiler = Profiler(capacity=16)
+    with profiler.frame(), profiler.span("draw"):
+        pass
+    assert len(profiler) == 0
+
+
+def test_frame_time_excludes_the_wait_between_frames():
+    profiler = Profiler(capacity=64)
+    profiler.enabled = True
+    for _ in range(3):
+        with profiler.frame():
+            with profiler.span("draw"):
+                time.sleep(0.002)
+        with profiler.span(IDLE_SPAN):
+            time.sleep(0.05)
+    summary = profiler.summary()
+    assert summary["frames"] == 3
+    assert 2 <= summary["frame_ms"] < 40
+    assert set(summary["spans"]) == {"draw"}
+    calls, ms = summary["spans"]["draw"]
+    assert calls == 1 and ms >= 2
+
+
+def test_the_ring_buffer_keeps_the_newest_spans():
+    profiler = Profiler(capacity=4)
+    profiler.enabled = True
+    for number in range(10):
+        profiler.record(profiler.name_id(f"span{number}"), number, number + 1)
+    assert len(profiler) == 4
+    assert [name for name, _, _ in profiler.spans()] == ["span6", "span7", "span8", "span9"]
+
+
+def test_timed_functions_are_recorded():
+    profiler = Profiler(capacity=16)
+
+    @profiler.timed("work")
+    def work(value):
+        return value * 2
+
+    assert work(2) == 4
+    assert len(profiler) == 0
+    profiler.enabled = True
+    assert work(3) == 6
+    assert [name for name, _, _ in profiler.spans()] == ["work"]
+
+
+def test_chrome_trace_export(tmp_path):
+    profiler = Profiler(capacity=16)
+    profiler.enabled = True
+    with profiler.frame():
+        with profiler.span("draw"):
+            pass
+    path = tmp_path / "trace.json"
+    assert profiler.export_chrome_trace(str(path)) == 2
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["draw", FRAME_SPAN]
+    assert all(event["ph"] == "X" for event in events)
+
+
+def test_spans_recorded_from_many_threads_are_all_kept():
+    profiler = Profiler(capacity=1 << 16)
+    names = [profiler.name_id(f"worker{number}") for number in range(4)]
+
+    def work(name_id):
+        for start in range(10_000):
+            profiler.record(name_id, start, start + name_id)
+
+    threads = [threading.Thread(target=work, args=(name_id,)) for name_id in names]
+    # Switch threads as often as possible, so unlocked slot claims would have the most chances to collide
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(profiler) == 40_000
+    spans = list(profiler.spans())
+    for number in range(4):
+        # Every span of a thread is there, whole
+        assert sorted(start for name, start, _ in spans if name == f"worker{number}") == list(range(10_000))
+    assert all(duration == profiler.name_id(name) for name, _, duration in spans)
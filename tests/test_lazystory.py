@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+import lazystory
+from lazystory import INDEX_SUFFIX, LazyJsonStory, scan_scene_offsets
+from story import STORY_PATH, Story, load_scenes_from_json
+from storygen import StoryShape, generate_scenes
+
+
+def tricky_scenes() -> list[dict]:
+    scenes = list(generate_scenes(StoryShape(scenes=6, seed=8)))
+    # Brackets, braces, escaped quotes and a scene_id key inside text or deeper objects must not confuse the scan
+    scenes[0]["dialogues"][0]["text"] = 'He said "}]{[" and \\"left\\" \\\\'
+    scenes[1]["dialogues"][0]["scene_id"] = 99
+    scenes[2]["interactive"]["prompt"] = '"scene_id": 77 ] } ['
+    scenes[3]["setting"] = "café ☃.jpg"
+    # scene_id after the nested objects
+    scenes[4]["scene_id"] = scenes[4].pop("scene_id")
+    return scenes
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_scan_finds_every_scene(indent):
+    scenes = tricky_scenes()
+    data = json.dumps(scenes, indent=indent, ensure_ascii=indent is None).encode("utf-8")
+    scene_ids, offsets, lengths, reference_start, references = scan_scene_offsets(data)
+    assert list(scene_ids) == [scene["scene_id"] for scene in scenes]
+    assert [json.loads(data[start:start + length]) for start, length in zip(offsets, lengths)] == scenes
+    assert [list(references[reference_start[slot]:reference_start[slot + 1]]) for slot in range(len(scenes))] == [
+        [choice["sceneReference"] for choice in scene["interactive"]["choices"]] for scene in scenes
+    ]
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b'{"scene_id": 1}', "JSON array"),
+        (b'[{"scene_id": 1}, [1]]', "story entry 1 is not a scene object"),
+        (b'[{"scene_id": 1}, {"setting": "x"}]', "no integer scene_id"),
+        (b'[{"scene_id": "1"}]', "no integer scene_id"),
+    ],
+)
+def test_scan_rejects_files_that_are_not_stories(data, message):
+    with pytest.raises(ValueError, match=message):
+        scan_scene_offsets(data)
+
+
+def test_the_real_story_reads_like_the_eager_loader(tmp_path):
+    path = tmp_path / "scene.json"
+    path.write_bytes(open(STORY_PATH, "rb").read())
+    story = LazyJsonStory(str(path))
+    expected = load_scenes_from_json(STORY_PATH)
+    assert len(story) == len(expected)
+    for slot, scene in enumerate(expected):
+        assert story.scene_id_at(slot) == scene.scene_id
+        lazy = story[slot]
+        assert (lazy.speakers, lazy.setting) == (scene.speakers, scene.setting)
+        assert [(d.speaker, d.text) for d in lazy.dialogues] == [(d.speaker, d.text) for d in scene.dialogues]
+        assert [(c.response, list(c.effect), c.scene_reference) for c in lazy.interactive.choices] == [
+            (c.response, list(c.effect), c.scene_reference) for c in scene.interactive.choices
+        ]
+    story.close()
+
+
+def test_decoded_scenes_are_kept_in_a_bounded_lru(tmp_path):
+    path = tmp_path / "scene.json"
+    path.write_text(json.dumps(list(generate_scenes(StoryShape(scenes=20, seed=1)))))
+    story = LazyJsonStory(str(path), cache_size=3)
+    first = story[0]
+    for slot in (1, 2, 0, 3):
+        story[slot]
+    assert story.cached_scenes == 3
+    # 0 was used again before 3 came in, so 1 was evicted instead
+    assert story[0] is first
+    assert (story.hits, story.misses) == (2, 4)
+    story[1]
+    assert story.misses == 5
+    assert story[-1].scene_id == story.scene_id_at(19)
+    with pytest.raises(IndexError):
+        story[20]
+    story.close()
+
+
+def test_the_sidecar_index_is_reused_until_the_story_changes(tmp_path, monkeypatch):
+    path = tmp_path / "scene.json"
+    scenes = list(generate_scenes(StoryShape(scenes=10, seed=2)))
+    path.write_text(json.dumps(scenes))
+    LazyJsonStory(str(path)).close()
+    assert (tmp_path / ("scene.json" + INDEX_SUFFIX)).exists()
+
+    scans = []
+    real_scan = lazystory.scan_scene_offsets
+    monkeypatch.setattr(lazystory, "scan_scene_offsets", lambda buffer: scans.append(1) or real_scan(buffer))
+    story = LazyJsonStory(str(path))
+    assert scans == [] and len(story) == 10
+    story.close()
+
+    # A different size (and mtime) makes the sidecar stale
+    path.write_text(json.dumps(scenes[:7]))
+    story = LazyJsonStory(str(path))
+    assert scans == [1] and len(story) == 7
+    assert story[6].scene_id == scenes[6]["scene_id"]
+    story.close()
+
+
+def test_an_empty_story_opens(tmp_path):
+    path = tmp_path / "scene.json"
+    path.write_text("[]")
+    story = LazyJsonStory(str(path))
+    assert len(story) == 0 and not story
+
+
+def test_references_are_checked_from_the_index(tmp_path, monkeypatch):
+    scenes = list(generate_scenes(StoryShape(scenes=12, seed=4)))
+    scenes[3]["interactive"]["choices"][-1]["sceneReference"] = 999
+    path = tmp_path / "scene.json"
+    path.write_text(json.dumps(scenes))
+    choice = len(scenes[3]["interactive"]["choices"])
+    message = f"scene {scenes[3]['scene_id']} choice {choice} references missing scene 999"
+    with pytest.raises(ValueError, match=message):
+        Story(str(path), LazyJsonStory(str(path)))
+    # Also when the index comes from the sidecar
+    monkeypatch.setattr(lazystory, "scan_scene_offsets", None)
+    with pytest.raises(ValueError, match=message):
+        Story(str(path), LazyJsonStory(str(path)))
+
+    # Choices of endings are never followed
+    scenes[3]["interactive"]["choices"][-1]["sceneReference"] = scenes[0]["scene_id"]
+    scenes[-1]["interactive"]["choices"][0]["sceneReference"] = 999
+    path.write_text(json.dumps(scenes))
+    monkeypatch.undo()
+    story = Story(str(path), LazyJsonStory(str(path)))
+    assert story.scenes.cached_scenes == 0
@@ -0,0 +1,66 @@
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+import pytest  # noqa: E402
+
+from loop import LoopDriver  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.display.init()
+    pygame.display.set_mode((80, 60))
+    pygame.event.clear()
+    yield
+    pygame.display.quit()
+
+
+def test_an_idle_loop_blocks_until_the_timeout():
+    driver = LoopDriver(idle_timeout_ms=50)
+    assert not driver.animating
+    started = time.perf_counter()
+    assert driver.events() == []
+    assert time.perf_counter() - started >= 0.04
+
+
+def test_an_idle_loop_returns_posted_events_at_once():
+    driver = LoopDriver(idle_timeout_ms=5000)
+    pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+    started = time.perf_counter()
+    assert [event.type for event in driver.events()] == [pygame.USEREVENT]
+    assert time.perf_counter() - started < 1
+
+
+def test_an_animation_runs_at_the_fps_cap_until_it_finishes():
+    driver = LoopDriver(fps=100, idle_timeout_ms=5000, update_step_ms=5)
+    steps = []
+
+    def update(step_ms: float) -> bool:
+        steps.append(step_ms)
+        return len(steps) < 6
+
+    driver.add_update(update)
+    assert driver.animating
+    frames = 0
+    started = time.perf_counter()
+    while driver.animating:
+        driver.events()
+        frames += 1
+        assert frames < 100
+    # Paced by the cap, not blocked by the idle timeout
+    assert time.perf_counter() - started < 2
+    assert steps == [5] * 6
+    assert frames >= 2
+
+
+def test_catch_up_steps_are_capped_after_a_slow_frame():
+    driver = LoopDriver(fps=1000, update_step_ms=1, max_updates_per_frame=3)
+    steps = []
+    driver.add_update(lambda step_ms: steps.append(step_ms) or True)
+    time.sleep(0.05)
+    driver.events()
+    assert len(steps) == 3
@@ -0,0 +1,58 @@
+from collections import Counter
+
+import pytest
+
+from game import Game
+from paths import enumerate_paths
+from story import ENDING_SCENE_IDS, STORY_PATH, load_story
+from storygen import StoryShape, write_story
+
+
+def brute_force(story_path: str, scene_id: int, scores) -> Counter:
+    """Counts the outcomes of every path by playing each decision through Game, with no memoization."""
+    game = Game(*scores, story_path=story_path)
+    game.current_scene_id = scene_id
+    choices = game.current_scene.interactive.choices
+    if scene_id in ENDING_SCENE_IDS or not choices:
+        return Counter({(scene_id, tuple(scores)): 1})
+    outcomes = Counter()
+    for decision in range(1, len(choices) + 1):
+        game = Game(*scores, story_path=story_path)
+        game.current_scene_id = scene_id
+        game.process_scene(decision)
+        outcomes.update(brute_force(story_path, game.current_scene_id, game.mb_score))
+    return outcomes
+
+
+@pytest.fixture
+def generated_path(tmp_path) -> str:
+    path = str(tmp_path / "generated.json")
+    write_story(path, StoryShape(scenes=14, branching=(1, 3), dialogues=(1, 1), words=(1, 2), seed=5))
+    return path
+
+
+def test_the_real_story_matches_brute_force():
+    report = enumerate_paths(load_story(STORY_PATH))
+    assert report.outcomes == brute_force(STORY_PATH, 1, (0, 0, 0, 0))
+    assert report.total_paths == sum(report.endings.values()) == sum(report.types.values())
+    # Shared states are expanded once
+    assert report.states < report.total_paths
+
+
+def test_a_generated_story_matches_brute_force(generated_path):
+    report = enumerate_paths(load_story(generated_path))
+    assert report.outcomes == brute_force(generated_path, 1, (0, 0, 0, 0))
+    assert set(report.endings) <= set(ENDING_SCENE_IDS)
+
+
+def test_clamped_start_scores_and_start_scenes_match_brute_force():
+    scores = (9, -9, 10, -10)
+    report = enumerate_paths(load_story(STORY_PATH), start_scene_id=10, start_scores=scores)
+    assert report.outcomes == brute_force(STORY_PATH, 10, scores)
+
+
+def test_a_cycle_is_rejected(tmp_path):
+    path = str(tmp_path / "cyclic.json")
+    write_story(path, StoryShape(scenes=30, shape="cyclic", back_probability=1.0, seed=2))
+    with pytest.raises(ValueError, match="cycle"):
+        enumerate_paths(load_story(path))
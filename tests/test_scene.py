@@ -0,0 +1,40 @@
+import json
+from array import array
+
+import pytest
+
+from scene import scene_from_json
+from story import STORY_PATH
+
+
+@pytest.fixture
+def scene_data() -> dict:
+    with open(STORY_PATH, "r") as file:
+        return json.load(file)[0]
+
+
+def test_effects_are_packed_four_per_choice(scene_data):
+    effects = array("b", [9, 9, 9, 9])
+    scene = scene_from_json(scene_data, effects)
+    choices = scene.interactive.choices
+    assert len(effects) == 4 + 4 * len(choices)
+    assert [list(choice.effect) for choice in choices] == [
+        choice["effect"] for choice in scene_data["interactive"]["choices"]
+    ]
+
+
+@pytest.mark.parametrize(
+    "effect",
+    [[1, 2, 3], [1, 2, 3, 4, 5], [], [128, 0, 0, 0], [0, 0, 0, -129], [0, 0.5, 0, 0], [0, "1", 0, 0]],
+)
+def test_a_malformed_effect_is_rejected(scene_data, effect):
+    scene_data["interactive"]["choices"][1]["effect"] = effect
+    effects = array("b")
+    with pytest.raises(ValueError, match=r"scene 1 choice 2: effect must be four integers in \[-128, 127\]"):
+        scene_from_json(scene_data, effects)
+
+
+def test_the_int8_bounds_are_accepted(scene_data):
+    scene_data["interactive"]["choices"][0]["effect"] = [-128, 127, 0, -1]
+    scene = scene_from_json(scene_data, array("b"))
+    assert list(scene.interactive.choices[0].effect) == [-128, 127, 0, -1]
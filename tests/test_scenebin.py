@@ -0,0 +1,127 @@
+import json
+import struct
+
+import pytest
+
+from scenebin import HEADER, HEADER_V1, CompiledStory, compile_story, compile_story_file
+from story import ENDING_SCENE_IDS, STORY_PATH, Story, load_scenes_from_json
+from storygen import StoryShape, generate_scenes
+from text import speaker_id
+
+
+def write_compiled(tmp_path, scenes_data) -> str:
+    path = str(tmp_path / "story.bin")
+    with open(path, "wb") as file:
+        file.write(compile_story(scenes_data, ENDING_SCENE_IDS))
+    return path
+
+
+def write_v1(tmp_path, scenes_data) -> str:
+    """Writes a story in format version 1: the version 2 file without its scene ID table."""
+    data = compile_story(scenes_data, ENDING_SCENE_IDS)
+    magic, _, *counts_and_offsets, id_table_offset = HEADER.unpack_from(data)
+    # The version 1 header is shorter, so every table starts that much earlier
+    shift = HEADER.size - HEADER_V1.size
+    counts, offsets = counts_and_offsets[:4], [offset - shift for offset in counts_and_offsets[4:]]
+    path = str(tmp_path / "story_v1.bin")
+    with open(path, "wb") as file:
+        file.write(HEADER_V1.pack(magic, 1, *counts, *offsets) + data[HEADER.size:id_table_offset])
+    return path
+
+
+@pytest.fixture
+def generated():
+    # 300 scenes; the endings 19 and 20 sit at the last positions, so IDs are not in story order
+    return list(generate_scenes(StoryShape(scenes=300, seed=3)))
+
+
+def assert_same_scene(scene, expected):
+    assert scene.scene_id == expected.scene_id
+    assert scene.speakers == expected.speakers
+    assert scene.setting == expected.setting
+    assert [(d.speaker, d.speaker_id, d.text) for d in scene.dialogues] == [
+        (d.speaker, d.speaker_id, d.text) for d in expected.dialogues
+    ]
+    assert scene.interactive.speaker == expected.interactive.speaker
+    assert scene.interactive.prompt == expected.interactive.prompt
+    assert [(c.response, list(c.effect), c.scene_reference) for c in scene.interactive.choices] == [
+        (c.response, list(c.effect), c.scene_reference) for c in expected.interactive.choices
+    ]
+
+
+def test_the_real_story_round_trips(tmp_path):
+    path = str(tmp_path / "scene.bin")
+    compile_story_file(STORY_PATH, path)
+    story = CompiledStory(path)
+    expected = load_scenes_from_json(STORY_PATH)
+    assert len(story) == len(expected)
+    for scene, original in zip(story, expected):
+        assert_same_scene(scene, original)
+    story.close()
+
+
+def test_effects_are_packed_and_speakers_share_ids(tmp_path, generated):
+    story = CompiledStory(write_compiled(tmp_path, generated))
+    scene = story[0]
+    choices = scene.interactive.choices
+    effects = [choice["effect"] for choice in generated[0]["interactive"]["choices"]]
+    assert [list(choice.effect) for choice in choices] == effects
+    # One int8 block per scene, four entries per choice
+    assert all(choice._effects is choices[0]._effects for choice in choices)
+    assert choices[0]._effects.typecode == "b" and len(choices[0]._effects) == 4 * len(choices)
+    for dialogue in scene.dialogues:
+        assert dialogue.speaker_id == speaker_id(dialogue.speaker)
+    story.close()
+
+
+def test_opening_builds_no_scene_and_lookups_use_the_id_table(tmp_path, generated):
+    story = Story("story.bin", CompiledStory(write_compiled(tmp_path, generated)))
+    assert story.scenes.cached_scenes == 0
+    for slot, scene_data in enumerate(generated):
+        assert story.slot_of(scene_data["scene_id"]) == slot
+    assert story.scenes.cached_scenes == 0
+    assert story.scene_by_id(19).scene_id == 19
+    for missing in (0, -5, 301, 10**6):
+        assert missing not in story.index
+        with pytest.raises(KeyError):
+            story.slot_of(missing)
+    story.scenes.close()
+
+
+def test_version_1_files_are_still_read(tmp_path, generated):
+    story = CompiledStory(write_v1(tmp_path, generated))
+    current = CompiledStory(write_compiled(tmp_path, generated))
+    assert [story.index.slot(data["scene_id"]) for data in generated] == list(range(len(generated)))
+    assert 0 not in story.index
+    assert_same_scene(story[150], current[150])
+    story.close()
+    current.close()
+
+
+def test_built_scenes_are_kept_in_a_bounded_lru(tmp_path, generated):
+    story = CompiledStory(write_compiled(tmp_path, generated), cache_size=3)
+    first = story[0]
+    for slot in (1, 2, 0, 3):
+        story[slot]
+    assert story.cached_scenes == 3
+    # 0 was used again before 3 came in, so 1 was evicted instead
+    assert story[0] is first
+    assert story.hits == 2
+    misses = story.misses
+    story[1]
+    assert story.misses == misses + 1
+    story.close()
+
+
+def test_unsupported_files_are_rejected(tmp_path, generated):
+    path = write_compiled(tmp_path, generated)
+    with open(path, "r+b") as file:
+        file.seek(4)
+        file.write(struct.pack("<H", 99))
+    with pytest.raises(ValueError, match="version 99"):
+        CompiledStory(path)
+
+    not_a_story = tmp_path / "scene.json"
+    not_a_story.write_text(json.dumps(generated))
+    with pytest.raises(ValueError, match="not a compiled story"):
+        CompiledStory(str(not_a_story))
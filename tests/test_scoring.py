@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from engine import MBTI_TYPES, SCORE_MAX, SCORE_MIN, Engine, mbti_type
+from game import Game
+from scoring import ScoreBatch, effect_matrix
+from story import ENDING_SCENE_IDS
+from text import Interactive
+
+
+def update_scores(scores, effects) -> list[int]:
+    """Applies effects one after the other through Game.update_scores."""
+    game = Game(*scores)
+    for effect in effects:
+        game.update_scores(Interactive.Choice("", effect, 0))
+    return game.mb_score
+
+
+@pytest.fixture
+def sequences() -> tuple[np.ndarray, list[list[list[int]]]]:
+    """Starting scores of 500 sessions and 30 effects for each, reaching the int8 bounds."""
+    rng = random.Random(11)
+    starts = np.array([[rng.randint(SCORE_MIN, SCORE_MAX) for _ in range(4)] for _ in range(500)], dtype=np.int8)
+    bounds = (-128, 127, SCORE_MIN, SCORE_MAX, 0)
+    effects = [
+        [[rng.choice(bounds) if rng.random() < 0.2 else rng.randint(-5, 5) for _ in range(4)] for _ in range(30)]
+        for _ in range(500)
+    ]
+    return starts, effects
+
+
+def test_apply_matches_update_scores(sequences):
+    starts, effects = sequences
+    batch = ScoreBatch(scores=starts)
+    for step in range(30):
+        batch.apply(np.array([session[step] for session in effects], dtype=np.int8))
+    expected = [update_scores(start.tolist(), session) for start, session in zip(starts, effects)]
+    assert batch.scores.tolist() == expected
+
+
+def test_one_effect_for_every_session():
+    batch = ScoreBatch(scores=[[10, -10, 0, 9], [-10, 10, 5, -9]])
+    batch.apply(np.array([127, -128, -128, 127], dtype=np.int8))
+    assert batch.scores.tolist() == [
+        update_scores([10, -10, 0, 9], [[127, -128, -128, 127]]),
+        update_scores([-10, 10, 5, -9], [[127, -128, -128, 127]]),
+    ]
+
+
+def test_types_match_mbti_type(sequences):
+    starts, _ = sequences
+    # Zero scores count as the first letter of each pair
+    batch = ScoreBatch(scores=np.vstack([starts, np.zeros((1, 4), dtype=np.int8)]))
+    expected = [mbti_type(row) for row in batch.scores.tolist()]
+    assert batch.types().tolist() == expected
+    assert [MBTI_TYPES[code] for code in batch.type_codes()] == expected
+    counts = batch.type_counts()
+    assert sum(counts.values()) == len(batch) and set(counts) == set(MBTI_TYPES)
+    assert all(counts[mbti] == expected.count(mbti) for mbti in MBTI_TYPES)
+
+
+@pytest.mark.parametrize("scores", [np.zeros((2, 3)), [[0, 0, 0, 11]], [[-11, 0, 0, 0]]])
+def test_scores_outside_the_scale_are_rejected(scores):
+    with pytest.raises(ValueError):
+        ScoreBatch(scores=scores)
+
+
+def test_score_batch_matches_play():
+    engine = Engine()
+    rng = random.Random(5)
+    scripts = []
+    for _ in range(300):
+        game, decisions = Game(), []
+        while game.get_current_scene_id() not in ENDING_SCENE_IDS:
+            decisions.append(rng.randint(1, len(game.current_scene.interactive.choices)))
+            game.process_scene(decisions[-1])
+        # Scripts of different lengths, including empty ones, stop at different steps
+        scripts.append(decisions[:rng.randint(0, len(decisions))])
+    batch = engine.score_batch(scripts, start_scores=(9, -9, 10, -10))
+    assert batch.scores.tolist() == [
+        list(result.mb_score) for result in engine.play_batch(scripts, start_scores=(9, -9, 10, -10))
+    ]
+    assert effect_matrix(engine.table).shape == (len(engine.table.targets), 4)
+
+
+def test_score_batch_rejects_what_play_rejects():
+    engine = Engine()
+    with pytest.raises(ValueError, match="scene 1 has no choice 3"):
+        engine.score_batch([[1], [3]])
+    with pytest.raises(ValueError, match=f"scene {ENDING_SCENE_IDS[0]} has no choice 0"):
+        engine.score_batch([[0]], start_scene_id=ENDING_SCENE_IDS[0])
+    assert len(engine.score_batch([])) == 0
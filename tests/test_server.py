@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from server import GameServer
+from snapshot import MAX_NAME_BYTES, SnapshotWriter, read_snapshot
+from story import ENDING_SCENE_IDS
+
+
+@pytest.fixture
+def server():
+    return GameServer()
+
+
+def start(server, **request) -> int:
+    response = server.handle({"op": "start", **request})
+    assert response["ok"], response
+    return response["session"]
+
+
+def test_a_session_plays_to_an_ending(server):
+    session = start(server, name="Detective")
+    assert "text" in server.handle({"op": "advance", "session": session})
+    ending = False
+    for _ in range(100):
+        response = server.handle({"op": "choose", "session": session, "choice": 1})
+        assert response["ok"], response
+        if response["ending"]:
+            ending = True
+            break
+    assert ending and response["scene"] in ENDING_SCENE_IDS
+    assert server.handle({"op": "result", "session": session})["ok"]
+    assert server.handle({"op": "end", "session": session}) == {"ok": True}
+    assert session not in server.sessions
+
+
+@pytest.mark.parametrize("name", [123, None, ["MC"], "x" * (MAX_NAME_BYTES + 1), "é" * (MAX_NAME_BYTES // 2 + 1)])
+def test_start_rejects_names_a_snapshot_cannot_hold(server, name):
+    response = server.handle({"op": "start", "name": name})
+    assert response["ok"] is False and response["error"]
+    assert not server.sessions
+
+
+def test_start_accepts_the_longest_name(server):
+    assert start(server, name="x" * MAX_NAME_BYTES)
+
+
+@pytest.mark.parametrize("choice", [True, False, "1", 1.0, None])
+def test_choose_rejects_choices_that_are_not_integers(server, choice):
+    session = start(server)
+    response = server.handle({"op": "choose", "session": session, "choice": choice})
+    assert response == {"ok": False, "error": "choice must be an integer"}
+    assert server.sessions[session].game.mb_score == [0, 0, 0, 0]
+
+
+def test_a_boolean_session_id_does_not_address_session_1(server):
+    start(server)
+    assert server.handle({"op": "result", "session": True}) == {"ok": False, "error": "session must be an integer"}
+
+
+@pytest.mark.parametrize("request_line", [{"op": "choose"}, {"op": "nope"}, ["start"]])
+def test_malformed_requests_get_an_error_reply(server, request_line):
+    response = server.handle(request_line)
+    assert response["ok"] is False and response["error"]
+
+
+def test_a_malformed_session_does_not_stop_checkpoints(server, tmp_path, caplog):
+    good, bad = start(server, name="Good"), start(server, name="Bad")
+    # A score outside int8 cannot be encoded
+    server.sessions[bad].game.mb_score = [500, 0, 0, 0]
+    path = str(tmp_path / "sessions.snapshot")
+    with SnapshotWriter(path) as writer, caplog.at_level(logging.ERROR, logger="server"):
+        assert server.checkpoint(writer) == 1
+        assert f"session {bad} was not checkpointed" in caplog.text
+        # Later changes are still saved
+        server.handle({"op": "choose", "session": good, "choice": 1})
+        assert server.checkpoint(writer) == 1
+    _, sessions = read_snapshot(path)
+    assert list(sessions) == [good]
+    assert sessions[good][0] == server.sessions[good].game.get_current_scene_id()
+
+
+def test_checkpoint_forever_survives_a_failed_checkpoint(server, tmp_path):
+    session = start(server)
+
+    class FailingOnceWriter(SnapshotWriter):
+        flushes = 0
+
+        def flush(self, sync: bool = True) -> None:
+            FailingOnceWriter.flushes += 1
+            if FailingOnceWriter.flushes == 1:
+                raise OSError("disk full")
+            super().flush(sync)
+
+    async def run(writer):
+        task = asyncio.create_task(server.checkpoint_forever(writer, interval_s=0.01))
+        while FailingOnceWriter.flushes < 2:
+            await asyncio.sleep(0.01)
+        assert not task.done()
+        task.cancel()
+
+    path = str(tmp_path / "sessions.snapshot")
+    writer = FailingOnceWriter(path)
+    asyncio.run(run(writer))
+    writer.close()
+    # Kept dirty after the failed flush, so the retry saved it
+    assert list(read_snapshot(path)[1]) == [session]
+
+
+def exchange(server, lines: list[bytes], limit: int = 1 << 20) -> list[dict]:
+    """Sends request lines to serve_client over a local connection and returns the replies, in order."""
+
+    async def run():
+        listener = await asyncio.start_server(server.serve_client, "127.0.0.1", 0, limit=limit)
+        async with listener:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            replies = []
+            for line in lines:
+                writer.write(line)
+                await writer.drain()
+                replies.append(json.loads(await reader.readline()))
+            writer.close()
+            await writer.wait_closed()
+            return replies
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("line", [b"{not json\n", b'{"op": "st\xffart"}\n', b"\xff\xfe\n"])
+def test_lines_that_are_not_json_get_an_error_reply(server, line):
+    bad, stats = exchange(server, [line, b'{"op": "stats"}\n'])
+    assert bad["ok"] is False and bad["error"].startswith("bad request")
+    # The connection keeps serving
+    assert stats["ok"]
+
+
+def test_a_line_over_the_stream_limit_gets_an_error_reply(server):
+    long_line = json.dumps({"op": "start", "name": "x" * 200}).encode("utf-8") + b"\n"
+    bad, started = exchange(server, [long_line, b'{"op": "start"}\n'], limit=64)
+    assert bad["ok"] is False and bad["error"].startswith("bad request")
+    assert started["ok"] and list(server.sessions) == [started["session"]]
+
+
+def test_ended_session_ids_are_not_reused_after_a_restore(server, tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    first, second = start(server), start(server)
+    server.handle({"op": "end", "session": second})
+    with SnapshotWriter(path) as writer:
+        server.checkpoint(writer)
+    # Only the first session is live, but the second must not be handed out again
+    restored = GameServer()
+    assert restored.restore(path) == 1
+    assert start(restored) == second + 1
+    assert list(restored.sessions) == [first, second + 1]
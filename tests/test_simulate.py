@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from eventlog import ChoiceLog
+from game import Game
+from simulate import AxisPolicy, Policy, ReplayPolicy, UniformPolicy, simulate
+from story import ENDING_SCENE_IDS, STORY_PATH
+
+
+def test_policy_is_abstract():
+    with pytest.raises(TypeError):
+        Policy()
+
+
+def test_every_run_reaches_an_ending():
+    outcomes = simulate(500, UniformPolicy(), workers=1, shard_size=100)
+    assert outcomes.runs == 500 and outcomes.truncated == 0
+    assert sum(outcomes.ending_counts.values()) == 500
+    assert sum(outcomes.type_counts.values()) == 500
+    assert all(sum(counts) == 500 for counts in outcomes.score_counts)
+
+
+def test_results_do_not_depend_on_the_number_of_workers():
+    alone = simulate(400, UniformPolicy(), workers=1, seed=3, shard_size=100)
+    pooled = simulate(400, UniformPolicy(), workers=2, seed=3, shard_size=100)
+    assert pooled.to_dict() == alone.to_dict()
+    assert simulate(400, UniformPolicy(), workers=1, seed=4, shard_size=100).to_dict() != alone.to_dict()
+
+
+def test_the_axis_policy_pushes_its_axis():
+    introverted = simulate(300, AxisPolicy("I", bias=1.0), workers=1).mean_scores()
+    extroverted = simulate(300, AxisPolicy("E", bias=1.0), workers=1).mean_scores()
+    assert introverted[0] < extroverted[0]
+
+
+def test_replay_reproduces_a_recorded_playthrough(tmp_path):
+    path = str(tmp_path / "choices.log")
+    game = Game()
+    with ChoiceLog(path, compact_every=0) as log:
+        log.start(1, game.get_current_scene_id(), "Recorded")
+        while game.get_current_scene_id() not in ENDING_SCENE_IDS:
+            decision = len(game.current_scene.interactive.choices)
+            log.record(1, game.get_current_scene_id(), decision)
+            game.process_scene(decision)
+    outcomes = simulate(20, ReplayPolicy.from_log(path), workers=1)
+    assert outcomes.ending_counts[game.get_current_scene_id()] == 20
+    assert outcomes.mean_scores() == game.mb_score
+
+
+@pytest.mark.parametrize("workers, shard_size", [(0, 100), (-1, 100), (1, 0)])
+def test_simulate_rejects_empty_pools_and_shards(workers, shard_size):
+    with pytest.raises(ValueError):
+        simulate(10, workers=workers, shard_size=shard_size)
+
+
+@pytest.mark.parametrize("policy", [UniformPolicy(), AxisPolicy("E")], ids=["uniform", "axis"])
+def test_a_dead_end_that_is_not_an_ending_is_named(tmp_path, policy):
+    with open(STORY_PATH, "r") as file:
+        scenes = json.load(file)
+    # Every playthrough goes through scene 2
+    next(scene for scene in scenes if scene["scene_id"] == 2)["interactive"]["choices"] = []
+    path = tmp_path / "scene.json"
+    path.write_text(json.dumps(scenes))
+    with pytest.raises(ValueError, match="scene 2 has no choices and is not an ending"):
+        simulate(10, policy, workers=1, story_path=str(path))
@@ -0,0 +1,133 @@
+import os
+
+import pytest
+
+from game import Game
+from snapshot import (
+    FILE_HEADER,
+    MAGIC,
+    VERSION,
+    SnapshotWriter,
+    compact,
+    encode_record,
+    load_sessions,
+    read_next_session,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+def make_game(scene_id: int, scores, name: str) -> Game:
+    game = Game(*scores, name=name)
+    game.current_scene_id = scene_id
+    return game
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "sessions.snapshot")
+
+
+def test_the_latest_record_of_a_session_wins(path):
+    with SnapshotWriter(path) as writer:
+        writer.save(1, make_game(2, (1, 2, 3, 4), "Ada"))
+        writer.save(2, make_game(3, (0, 0, 0, 0), "Bo"))
+        writer.save(1, make_game(5, (-10, 10, 0, 1), "Ada"))
+        writer.drop(2)
+    assert read_snapshot(path) == (0, {1: (5, (-10, 10, 0, 1), "Ada")})
+    game = load_sessions(path)[1]
+    assert (game.get_current_scene_id(), game.mb_score, game.name) == (5, [-10, 10, 0, 1], "Ada")
+
+
+def test_a_missing_file_has_no_sessions(path):
+    assert read_snapshot(path) == (0, {})
+    assert read_next_session(path) == 0
+    assert load_sessions(path) == {}
+    assert compact(path) == 0
+
+
+def test_every_torn_tail_is_cut_at_the_last_whole_record(path):
+    with SnapshotWriter(path) as writer:
+        writer.save(1, make_game(2, (1, 1, 1, 1), "Ada"))
+        writer.flush()
+        intact = os.path.getsize(path)
+        writer.save(2, make_game(4, (2, 2, 2, 2), "Bérénice"))
+    with open(path, "rb") as file:
+        data = file.read()
+
+    for cut in range(intact, len(data)):
+        with open(path, "wb") as file:
+            file.write(data[:cut])
+        assert read_snapshot(path)[1] == {1: (2, (1, 1, 1, 1), "Ada")}, cut
+        # Reopening cuts the tail off, so records appended after it are read back
+        with SnapshotWriter(path) as writer:
+            assert os.path.getsize(path) == intact
+            writer.save(3, make_game(6, (3, 3, 3, 3), "Cy"))
+        assert read_snapshot(path)[1] == {1: (2, (1, 1, 1, 1), "Ada"), 3: (6, (3, 3, 3, 3), "Cy")}, cut
+
+
+def test_reading_stops_at_a_corrupt_record(path):
+    with SnapshotWriter(path) as writer:
+        writer.save(1, make_game(2, (1, 1, 1, 1), "Ada"))
+        writer.flush()
+        corrupt_at = os.path.getsize(path) + 8
+        writer.save(2, make_game(4, (2, 2, 2, 2), "Bo"))
+        writer.save(3, make_game(6, (3, 3, 3, 3), "Cy"))
+    with open(path, "r+b") as file:
+        file.seek(corrupt_at)
+        file.write(b"\xff")
+    assert read_snapshot(path)[1] == {1: (2, (1, 1, 1, 1), "Ada")}
+
+
+def test_a_torn_header_is_rewritten(path):
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+    with SnapshotWriter(path) as writer:
+        writer.save(1, make_game(2, (0, 0, 0, 0), "Ada"))
+    assert read_snapshot(path) == (0, {1: (2, (0, 0, 0, 0), "Ada")})
+
+
+def test_other_files_are_rejected(path):
+    with open(path, "wb") as file:
+        file.write(FILE_HEADER.pack(b"NOPE", VERSION, 0, 0))
+    with pytest.raises(ValueError, match="not a session snapshot"):
+        read_snapshot(path)
+    with open(path, "wb") as file:
+        file.write(FILE_HEADER.pack(MAGIC, VERSION + 1, 0, 0))
+    with pytest.raises(ValueError, match="version"):
+        read_snapshot(path)
+
+
+def test_compact_keeps_the_latest_live_records_and_the_sequence(path):
+    write_snapshot(path, {1: (2, (1, 1, 1, 1), "Ada"), 2: (3, (0, 0, 0, 0), "Bo")}, sequence=42)
+    with SnapshotWriter(path) as writer:
+        for scene_id in range(4, 10):
+            writer.save(1, make_game(scene_id, (1, 1, 1, 1), "Ada"))
+        writer.drop(2)
+    size = os.path.getsize(path)
+    assert compact(path) == 1
+    assert os.path.getsize(path) < size
+    assert read_snapshot(path) == (42, {1: (9, (1, 1, 1, 1), "Ada")})
+
+
+@pytest.mark.parametrize(
+    "session_id, scene_id, scores, name",
+    [(-1, 1, (0, 0, 0, 0), "MC"), (1, 1, (128, 0, 0, 0), "MC"), (1, 1, (0, 0, 0, 0), 7)],
+)
+def test_fields_that_do_not_fit_are_rejected(session_id, scene_id, scores, name):
+    with pytest.raises(ValueError, match="cannot be snapshotted"):
+        encode_record(session_id, scene_id, scores, name)
+
+
+def test_the_next_session_id_survives_reopening_and_compaction(path):
+    with SnapshotWriter(path) as writer:
+        writer.save(1, make_game(2, (0, 0, 0, 0), "Ada"))
+        writer.set_next_session(3)
+        writer.save(2, make_game(3, (0, 0, 0, 0), "Bo"))
+        writer.drop(2)
+    assert read_next_session(path) == 3
+    assert read_snapshot(path) == (0, {1: (2, (0, 0, 0, 0), "Ada")})
+    with SnapshotWriter(path) as writer:
+        writer.set_next_session(7)
+    assert compact(path) == 1
+    assert read_next_session(path) == 7
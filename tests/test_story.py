@@ -0,0 +1,107 @@
+import json
+import os
+import random
+from array import array
+
+import pytest
+
+from game import Game
+from scene import scene_from_json
+from story import ENDING_SCENE_IDS, STORY_PATH, SceneIndex, Story, load_scenes_from_json, load_story
+
+
+@pytest.mark.parametrize(
+    "scene_ids",
+    [
+        [3, 1, 2],
+        [10, 12, 11, 15],
+        # Too sparse for the dense table
+        [5, 1_000_000, -7, 42],
+    ],
+)
+def test_index_maps_every_id_to_its_slot(scene_ids):
+    index = SceneIndex(scene_ids)
+    assert len(index) == len(scene_ids)
+    for slot, scene_id in enumerate(scene_ids):
+        assert index.slot(scene_id) == slot
+        assert scene_id in index
+    for missing in (0, 4, 13, min(scene_ids) - 1, max(scene_ids) + 1):
+        if missing not in scene_ids:
+            assert missing not in index
+            with pytest.raises(KeyError):
+                index.slot(missing)
+
+
+def test_sparse_ids_fall_back_to_a_dict():
+    assert SceneIndex([1, 2, 3])._sparse is None
+    assert SceneIndex([1, 10**9])._sparse is not None
+
+
+@pytest.mark.parametrize("scene_ids", [[1, 2, 1], [1, 10**9, 10**9]])
+def test_duplicate_ids_are_rejected(scene_ids):
+    with pytest.raises(ValueError, match="duplicate scene_id"):
+        SceneIndex(scene_ids)
+
+
+def test_an_empty_story_has_an_empty_index():
+    index = SceneIndex([])
+    assert len(index) == 0 and 1 not in index
+
+
+def test_a_dangling_reference_is_rejected_at_load():
+    with open(STORY_PATH, "r") as file:
+        scenes_data = json.load(file)
+    scenes_data[0]["interactive"]["choices"][0]["sceneReference"] = 99
+    effects = array("b")
+    with pytest.raises(ValueError, match="scene 1 choice 1 references missing scene 99"):
+        Story("scene.json", [scene_from_json(scene_data, effects) for scene_data in scenes_data])
+
+
+def test_transitions_do_not_depend_on_story_order(tmp_path):
+    with open(STORY_PATH, "r") as file:
+        scenes_data = json.load(file)
+    # The first scene stays first, since a game starts there
+    rest = scenes_data[1:]
+    random.Random(4).shuffle(rest)
+    shuffled_path = tmp_path / "shuffled.json"
+    shuffled_path.write_text(json.dumps(scenes_data[:1] + rest))
+
+    original, shuffled = Game(), Game(story_path=str(shuffled_path))
+    assert [scene.scene_id for scene in load_scenes_from_json(str(shuffled_path))] != [
+        scene.scene_id for scene in original.scenes
+    ]
+    for decision in (1, 2, 1, 2, 1, 1, 2, 1, 1, 1, 2, 1, 1, 1, 1):
+        if original.get_current_scene_id() in ENDING_SCENE_IDS:
+            break
+        decision = min(decision, len(original.current_scene.interactive.choices))
+        original.process_scene(decision)
+        shuffled.process_scene(decision)
+        assert shuffled.get_current_scene_id() == original.get_current_scene_id()
+        assert shuffled.mb_score == original.mb_score
+
+
+def test_an_unchanged_story_file_is_loaded_once(tmp_path):
+    path = tmp_path / "scene.json"
+    path.write_bytes(open(STORY_PATH, "rb").read())
+    story = load_story(str(path))
+    assert load_story(str(path)) is story
+    # The same file through another path spelling
+    assert load_story(str(tmp_path / "." / "scene.json")) is story
+
+
+def test_editing_the_story_file_reloads_it(tmp_path):
+    path = tmp_path / "scene.json"
+    with open(STORY_PATH, "r") as file:
+        scenes_data = json.load(file)
+    path.write_text(json.dumps(scenes_data))
+    story = load_story(str(path))
+
+    scenes_data[0]["interactive"]["prompt"] = "Edited?"
+    path.write_text(json.dumps(scenes_data))
+    stat = os.stat(path)
+    # Make sure the mtime moves even on filesystems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded = load_story(str(path))
+    assert reloaded is not story
+    assert reloaded.first_scene.interactive.prompt == "Edited?"
+    assert load_story(str(path)) is reloaded
@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+from array import array
+
+import pytest
+
+from storygraph import (
+    adjacency_path,
+    check_story,
+    find_cycles,
+    read_adjacency,
+    write_adjacency,
+)
+from story import STORY_PATH
+from conftest import REPO_ROOT
+
+
+def scene(scene_id: int, *references: int) -> dict:
+    return {
+        "scene_id": scene_id,
+        "speakers": "BOSSP",
+        "setting": "downtown_chicago.jpg",
+        "dialogues": [{"dialogue_id": 1, "speaker": "BOSSP", "text": "BOSS P: ..."}],
+        "interactive": {
+            "speaker": "BOSSP",
+            "prompt": "BOSS P: ?",
+            "choices": [
+                {"response": str(reference), "effect": [1, -1, 0, 0], "sceneReference": reference}
+                for reference in references
+            ],
+        },
+    }
+
+
+def check(scenes_data):
+    return check_story(scenes_data, ending_scene_ids=(9,))
+
+
+@pytest.fixture
+def real_story():
+    with open(STORY_PATH, "r") as file:
+        return json.load(file)
+
+
+def test_the_real_story_has_no_errors(real_story):
+    graph, report = check_story(real_story)
+    assert report.ok, report
+    assert report.unreachable == [7]
+    assert len(graph) == report.scene_count == len(real_story)
+
+
+def test_a_loop_is_reported_as_one_cycle():
+    # 1 -> 2 -> 3 -> 2, 3 -> 9
+    _, report = check([scene(1, 2), scene(2, 3), scene(3, 2, 9), scene(9)])
+    assert report.ok, report
+    assert report.cycles == [[2, 3]]
+    assert report.unreachable == report.trapped == []
+
+
+def test_a_self_loop_is_a_cycle_and_a_dead_end_is_trapped():
+    # 4 loops on itself and never reaches the ending; 5 is never reached
+    _, report = check([scene(1, 4, 9), scene(4, 4), scene(5, 9), scene(9)])
+    assert report.cycles == [[4]]
+    assert report.trapped == [4]
+    assert report.unreachable == [5]
+
+
+def test_choices_of_endings_are_not_followed():
+    # Without the ending rule, 9 -> 1 would close a loop
+    _, report = check([scene(1, 9), scene(9, 1)])
+    assert report.ok, report
+    assert report.cycles == []
+
+
+def test_broken_stories_report_errors():
+    _, report = check([scene(1, 2), scene(2), scene(2, 9), scene(9), {"scene_id": 3}])
+    assert not report.ok
+    text = "\n".join(report.errors)
+    assert "scene 1 choice 1" not in text
+    assert "not an ending but has no choices" in text
+    assert "duplicate scene_id" in text
+    assert len(report.errors) == 3
+
+    _, report = check([scene(1, 42)])
+    assert report.errors == ["scene 1 choice 1 references missing scene 42"]
+
+
+def test_unknown_speakers_and_missing_images_are_errors():
+    missing = scene(1, 9)
+    missing["speakers"] = "NOBODY"
+    missing["setting"] = "nowhere.png"
+    _, report = check([missing, scene(9)])
+    assert sorted(report.errors) == [
+        "scene 1: setting image resources/images/nowhere.png does not exist",
+        "scene 1: speaker 'NOBODY' has no avatar",
+    ]
+
+
+def test_find_cycles_on_a_deep_chain_does_not_recurse():
+    count = 50_000
+    # i -> i + 1, and the last slot back to the first
+    start = array("i", range(count + 1))
+    targets = array("i", [*range(1, count), 0])
+    cycles = find_cycles(start, targets)
+    assert len(cycles) == 1 and sorted(cycles[0]) == list(range(count))
+
+
+def test_adjacency_round_trip(real_story, tmp_path):
+    story_path = tmp_path / "scene.json"
+    story_path.write_text(json.dumps(real_story))
+    graph, _ = check_story(real_story)
+    path = adjacency_path(str(story_path))
+    write_adjacency(path, graph, str(story_path))
+
+    loaded = read_adjacency(path, str(story_path))
+    assert loaded is not None
+    for column in ("scene_ids", "choice_start", "targets", "effects"):
+        assert getattr(loaded, column) == getattr(graph, column)
+
+
+def test_stale_or_damaged_adjacency_is_not_loaded(real_story, tmp_path):
+    story_path = tmp_path / "scene.json"
+    story_path.write_text(json.dumps(real_story))
+    graph, _ = check_story(real_story)
+    path = adjacency_path(str(story_path))
+    write_adjacency(path, graph, str(story_path))
+
+    data = open(path, "rb").read()
+    with open(path, "wb") as file:
+        file.write(data[:-1])
+    assert read_adjacency(path, str(story_path)) is None
+
+    write_adjacency(path, graph, str(story_path))
+    story_path.write_text(json.dumps(real_story) + "\n")
+    assert read_adjacency(path, str(story_path)) is None
+    assert read_adjacency(str(tmp_path / "missing.adj"), str(story_path)) is None
+
+
+def test_checking_a_story_does_not_import_pygame():
+    code = (
+        "import json, sys; import storygraph; "
+        "storygraph.check_story(json.load(open(storygraph.STORY_PATH))); "
+        "print('pygame' in sys.modules)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.join(REPO_ROOT, "src"))
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert output.stdout.strip() == "False", output.stderr
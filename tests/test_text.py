@@ -0,0 +1,58 @@
+import pytest
+
+from story import load_story
+from text import Dialogue, Interactive, NameTemplate, tokenize
+
+
+def replace_name(text: str, name: str) -> str:
+    """How replace_name_in_json filled the placeholders before they were tokenized at load time."""
+    return text.replace("[Name]", name).replace("[NAME]", name)
+
+
+TEXTS = [
+    # No placeholder, also with brackets that are not one
+    "Good evening, detective.",
+    "",
+    "[Detective] walks in. [name] is not a placeholder, nor is [ Name ].",
+    # One placeholder, at either end or alone
+    "Welcome, [Name].",
+    "[NAME], is that you?",
+    "[Name]",
+    # Several, mixed and back to back
+    "[Name]? [NAME]! Is it really you, [Name]?",
+    "[Name][NAME][Name]",
+]
+
+
+def interactive(text: str) -> Interactive:
+    return Interactive("Max", text, [Interactive.Choice(text, [0, 0, 0, 0], 2)])
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("name", ["Ada", "", "[Name]", "Zoë \\1"])
+def test_placeholders_are_filled_like_replace(text, name):
+    prompt = interactive(text)
+    assert Dialogue("Max", text).text_for(name) == replace_name(text, name)
+    assert prompt.prompt_for(name) == replace_name(text, name)
+    assert prompt.choices[0].response_for(name) == replace_name(text, name)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_the_written_text_keeps_its_placeholders(text):
+    prompt = interactive(text)
+    assert Dialogue("Max", text).text == prompt.prompt == prompt.choices[0].response == text
+
+
+def test_only_text_with_a_placeholder_is_tokenized():
+    assert tokenize(TEXTS[0]) is TEXTS[0]
+    assert tokenize(TEXTS[2]) is TEXTS[2]
+    assert isinstance(tokenize(TEXTS[3]), NameTemplate)
+
+
+def test_every_story_line_is_filled_like_replace():
+    for scene in load_story().scenes:
+        for dialogue in scene.dialogues:
+            assert dialogue.text_for("Sherlock") == replace_name(dialogue.text, "Sherlock")
+        assert scene.interactive.prompt_for("Sherlock") == replace_name(scene.interactive.prompt, "Sherlock")
+        for choice in scene.interactive.choices:
+            assert choice.response_for("Sherlock") == replace_name(choice.response, "Sherlock")
@@ -0,0 +1,123 @@
+import gc
+import os
+import textwrap
+import weakref
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+import pytest  # noqa: E402
+
+import gui  # noqa: E402
+from story import load_story  # noqa: E402
+from textlayout import TextLayoutCache, fonts  # noqa: E402
+
+LIGHT_PINK = (255, 182, 193)
+LIGHT_BLUE = (173, 216, 230)
+
+
+def uncached_text_wrapped(surface, text, pos, font, max_width, color):
+    """draw_text_wrapped as it was before the layout cache: every line rendered and blitted on every call."""
+    x, y = pos
+    for line in textwrap.wrap(text, width=max_width):
+        surface.blit(font.render(line, True, color), (x, y))
+        y += font.get_linesize()
+
+
+def uncached_text_wrapped_2(surface, text, pos, font, max_width, color, bg_color=None):
+    """draw_text_wrapped_2 as it was before the layout cache: every word rendered and blitted on every call."""
+    space_width, line_height = font.size(' ')
+    x, initial_y = pos
+    y = initial_y
+    for word in text.split(' '):
+        word_surface = font.render(word, True, color, bg_color)
+        word_width = word_surface.get_width()
+        if x + word_width > max_width:
+            x = pos[0]
+            y += line_height
+        surface.blit(word_surface, (x, y))
+        x += word_width + space_width
+    return y + line_height - initial_y
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((gui.screen_width, gui.screen_height))
+    yield
+    pygame.display.quit()
+
+
+@pytest.fixture
+def layouts(monkeypatch) -> TextLayoutCache:
+    cache = TextLayoutCache()
+    monkeypatch.setattr(gui, "text_layouts", cache)
+    return cache
+
+
+def story_texts() -> list[str]:
+    texts = []
+    for scene in load_story().scenes:
+        texts += [dialogue.text_for("Detective") for dialogue in scene.dialogues]
+        texts.append(scene.interactive.prompt_for("Detective"))
+        texts += [choice.response_for("Detective") for choice in scene.interactive.choices]
+    return texts
+
+
+def blank() -> pygame.Surface:
+    surface = pygame.Surface((gui.screen_width, gui.screen_height)).convert()
+    surface.fill(LIGHT_PINK)
+    return surface
+
+
+def test_wrapped_lines_match_the_uncached_render(layouts):
+    font = fonts.get(None, 27)
+    texts = story_texts()
+    for text in texts:
+        expected = blank()
+        uncached_text_wrapped(expected, text, (15, 495), font, 80, gui.BLACK)
+        # Once to fill the cache, once from it
+        for _ in range(2):
+            actual = blank()
+            gui.draw_text_wrapped(actual, text, (15, 495), font, 80, gui.BLACK)
+            assert pygame.image.tobytes(actual, "RGB") == pygame.image.tobytes(expected, "RGB"), text
+    assert layouts.misses == len(set(texts))
+
+
+@pytest.mark.parametrize("bg_color", [None, LIGHT_BLUE])
+def test_flowed_words_match_the_uncached_render(layouts, bg_color):
+    # The words of a line are composited with BLEND_RGBA_MAX, so the anti-aliased edges must come out the same
+    font = fonts.get(None, 25)
+    for text in story_texts():
+        expected = blank()
+        expected_height = uncached_text_wrapped_2(expected, text, (25, 460), font, 760, gui.BLACK, bg_color)
+        for _ in range(2):
+            actual = blank()
+            assert gui.draw_text_wrapped_2(actual, text, (25, 460), font, 760, gui.BLACK, bg_color) == expected_height
+            assert pygame.image.tobytes(actual, "RGB") == pygame.image.tobytes(expected, "RGB"), text
+
+
+def test_a_new_font_never_hits_the_layouts_of_a_freed_one():
+    cache = TextLayoutCache()
+    small = pygame.font.Font(None, 20)
+    small_height = cache.wrap_chars("Hello there", small, 80, gui.BLACK).height
+    freed = weakref.ref(small)
+    del small
+    gc.collect()
+    # The cache keeps the font alive, so its id cannot be handed to the next font
+    assert freed() is not None
+    large = pygame.font.Font(None, 40)
+    layout = cache.wrap_chars("Hello there", large, 80, gui.BLACK)
+    assert cache.misses == 2
+    assert layout.height == large.get_linesize() != small_height
+
+
+def test_the_layout_cache_is_bounded():
+    cache = TextLayoutCache(max_entries=2)
+    font = fonts.get(None, 27)
+    for text in ("a", "b", "c", "a"):
+        cache.wrap_chars(text, font, 80, gui.BLACK)
+    assert cache.stats()["entries"] == 2
+    assert (cache.hits, cache.misses) == (0, 4)